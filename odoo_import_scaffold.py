@@ -12,41 +12,47 @@ import socket
 from odoo_csv_tools.lib import conf_lib
 
 module_version = '1.4.2'
-offline = False
-dbname = ''
-hostname = ''
+module_name = os.path.basename(sys.argv[0])
+conf_dir_name = 'conf'
+orig_dir_name = 'origin'
+orig_raw_dir_name = os.path.join(orig_dir_name, 'binary')
+data_dir_name = 'data'
+log_dir_name = 'log'
+selection_sep = ': '
+default_base_dir = os.path.join('.','')
+# Comodels of one2many fields never generated as separate models
+split_o2m_excluded = ['mail.message', 'mail.followers', 'mail.activity']
+# Context keys disabling the costly features of inherited models, detected by one of their fields
+load_context_features = [
+    ('message_ids', ["'tracking_disable': True", "'mail_create_nolog': True", "'mail_create_nosubscribe': True", "'mail_notrack': True"]),
+]
+# Context keys disabling the costly features of specific models
+load_context_models = {
+    'res.users': ["'no_reset_password': True"],
+    'account.move': ["'check_move_validity': False"],
+    'account.move.line': ["'check_move_validity': False"],
+}
+# Metadata fields excluded without the option --with-metadata
+metadata_fields = ['create_uid', 'write_uid', 'create_date', 'write_date', 'active']
+# Attributes of ir.model.fields read to build a ModelField
+model_field_attributes = ['name', 'ttype', 'required', 'readonly', 'field_description', 'store',
+                          'track_visibility', 'related', 'relation', 'depends', 'compute', 'translate']
 
 ##############################################################################
-# FUNCTIONS FOR DIRECTORY STRUCTURE
+# HELPERS
 ##############################################################################
 
-def create_folder(path):
-    """
-    Create a folder only if it doesn't exist or if the flag "force" is set.
-    """
-    if os.path.exists(path) and not force:
-        if verbose: sys.stdout.write('Folder %s already exists.\n' % path)
-        return
-
-    if verbose: sys.stdout.write('Create folder %s\n' % path)
-    try:
-        os.makedirs(path)
-    except OSError as exception:
-        if exception.errno != errno.EEXIST:
-            raise
-
 def check_file_exists(func):
     """
-    Decorator avoiding to overwrite a file if it already exists
-    but still allowing it if the flag "force" is set.
+    Decorator of Scaffold methods avoiding to overwrite a file if it already exists
+    but still allowing it if the flag "force" of the session is set.
     """
-    def wrapper(*args, **kwargs):
-        file = args[0]
-        if os.path.isfile(file) and not force:
-            if verbose: sys.stdout.write('File %s already exists.\n' % file)
+    def wrapper(self, file, *args, **kwargs):
+        if os.path.isfile(file) and not self.force:
+            if self.verbose: sys.stdout.write('File %s already exists.\n' % file)
             return
-        if verbose: sys.stdout.write('Create file %s\n' % file)
-        func(*args, **kwargs)
+        if self.verbose: sys.stdout.write('Create file %s\n' % file)
+        func(self, file, *args, **kwargs)
     return wrapper
 
 
@@ -59,546 +65,31 @@ def is_remote_host(hostname):
     if any(hostname in x for x in [my_host_name, my_host_ip, socket.getfqdn(), 'localhost', '127.0.0.1']):
         return False
     return True
-    
-
-@check_file_exists
-def create_connection_file_local(file):
-    """
-    Enforce encrypted connection on remote hosts. 
-    Leave unencrypted for local databases.
-    """
-    is_remote = is_remote_host(host)
-    protocol = 'jsonrpcs' if is_remote else 'jsonrpc'
-    port = '443' if is_remote else '8069'
-    with open(file, 'w') as f:
-        f.write("[Connection]\n")
-        f.write("hostname = %s\n" % host)
-        f.write("database = %s\n" % dbname)
-        f.write("login = admin\n")
-        f.write("password = admin\n")
-        f.write("protocol = %s\n" % protocol)
-        f.write("port = %s\n" % port)
-        f.write("uid = %s\n" % userid)
-
-
-@check_file_exists
-def create_connection_file_remote(file, hostname):
-    """
-    Just a preset for encrypted connection.
-    """
-    with open(file, 'w') as f:
-        f.write("[Connection]\n")
-        f.write("hostname = %s\n" % hostname)
-        f.write("database = \n")
-        f.write("login = \n")
-        f.write("password = \n")
-        f.write("protocol = jsonrpcs\n")
-        f.write("port = 443\n")
-        f.write("uid = %s\n" % userid)
-
-
-@check_file_exists
-def create_cleanup_script(file):
-    """
-    Create the shell script to empty the folder "data".
-    """
-    if platform.system() == 'Windows':
-        with open(file, 'w') as f:
-            f.write("@echo off\n\n")
-            f.write("set DIR=%s\n" % data_dir_name)
-            f.write("del /F /S /Q %DIR%\*\n")
-    else:
-        with open(file, 'w') as f:
-            f.write("#!/usr/bin/env bash\n\n")
-            f.write("DIR=%s%s\n" % (data_dir_name, os.sep))
-            f.write("rm -rf --interactive=never $DIR\n")
-            f.write("mkdir -p $DIR\n")
-        os.chmod(file, 0o755)
 
 
-@check_file_exists
-def create_transform_script(file):
+def insert_before_last_line(file, text):
     """
-    Create the shell script skeleton that launches all transform commands.
-    """
-    if platform.system() == 'Windows':
-        with open(file, 'w') as f:
-            f.write("@echo off\n\n")
-            f.write("set LOGDIR=%s\n" % log_dir_name)
-            f.write("set DATADIR=%s\n\n" % data_dir_name)
-            f.write("call cleanup_data_dir.cmd\n\n")
-            f.write("REM Add here all transform commands\n")
-            f.write("REM python my_model.py > %LOGDIR%\\transform_$1_out.log 2> %LOGDIR%\\transform_$1_err.log\n")
-    else:
-        with open(file, 'w') as f:
-            f.write("#!/usr/bin/env bash\n\n")
-            f.write("LOGDIR=%s\n" % log_dir_name)
-            f.write("DATADIR=%s\n\n" % data_dir_name)
-            f.write("COLOR='\\033[1;32m'\n")
-            f.write("NC='\\033[0m'\n\n")
-            f.write("msg() {\n")
-            f.write("    start=$(date +%s.%3N)\n")
-            f.write("    PID=$!\n")
-            f.write("    printf \"($PID) Transform ${COLOR}$1${NC} [\"\n")
-            f.write("    while kill -0 $PID 2> /dev/null; do\n")
-            f.write("        printf  \"▓\"\n")
-            f.write("        sleep 1\n")
-            f.write("    done\n")
-            f.write("    end=$(date +%s.%3N)\n")
-            f.write("    runtime=$(python -c \"print '%u:%02u' % ((${end} - ${start})/60, (${end} - ${start})%60)\")\n")
-            f.write("    printf \"] $runtime \\n\"\n")
-            f.write("}\n\n")
-            f.write("load_script() {\n")
-            f.write("    #rm -f $DATADIR/*$1*.csv*\n")
-            f.write("    rm -f $LOGDIR/transform_$1_*.log\n")
-            f.write("    python $1.py > $LOGDIR/transform_$1_out.log 2> $LOGDIR/transform_$1_err.log &\n")
-            f.write("    msg \"$1\"\n")
-            f.write("}\n\n")
-            f.write("./cleanup_data_dir.sh\n\n")
-            f.write("# Add here all transform commands\n")
-            f.write("# load_script python_script (without extension)\n")
-            f.write("chmod +x *.sh\n")
-        os.chmod(file, 0o755)
-    
-
-@check_file_exists
-def create_load_script(file):
-    """
-    Create the shell script skeleton that launches all load commands.
-    """
-    if platform.system() == 'Windows':
-        with open(file, 'w') as f:
-            f.write("@echo off\n\n")
-            f.write("set LOGDIR=%s\n\n" % log_dir_name)
-            f.write("REM Add here all load commands\n")
-            f.write("REM my_model.cmd > %LOGDIR%\\load_$1_out.log 2> %LOGDIR%\\load_$1_err.log\n")
-    else:
-        with open(file, 'w') as f:
-            f.write("#!/usr/bin/env bash\n\n")
-            f.write("LOGDIR=%s\n\n" % log_dir_name)
-            f.write("COLOR='\\033[1;32m'\n")
-            f.write("NC='\\033[0m'\n\n")
-            f.write("user_interrupt() {\n")
-            f.write("    echo -e \"\\n\\nKeyboard Interrupt detected.\"\n")
-            f.write("    echo -e \"\\nKill import tasks...\"\n")
-            f.write("    # Kill the current import\n")
-            f.write("    killall odoo-import-thread.py\n")
-            f.write("    sleep 2\n")
-            f.write("    # Kill the next launched import (--fail)\n")
-            f.write("    killall odoo-import-thread.py\n")
-            f.write("    exit\n")
-            f.write("}\n\n")
-            f.write("msg() {\n")
-            f.write("    start=$(date +%s.%3N)\n")
-            f.write("    PID=$!\n")
-            f.write("    printf \"($PID) Load ${COLOR}$1${NC} [\"\n")
-            f.write("    while kill -0 $PID 2> /dev/null; do\n")
-            f.write("        printf  \"▓\"\n")
-            f.write("        sleep 1\n")
-            f.write("    done\n")
-            f.write("    end=$(date +%s.%3N)\n")
-            f.write("    runtime=$(python -c \"print '%u:%02u' % ((${end} - ${start})/60, (${end} - ${start})%60)\")\n")
-            f.write("    printf \"] $runtime \\n\"\n")
-            f.write("}\n\n")
-            f.write("load_script() {\n")
-            f.write("    # rm -f \$LOGDIR/load_$1_*.log\n")
-            f.write("    ./$1.sh > $LOGDIR/load_$1_out.log 2> $LOGDIR/load_$1_err.log &\n")
-            f.write("    msg \"$1\"\n")
-            f.write("}\n\n")
-            f.write("trap user_interrupt SIGINT\n")
-            f.write("trap user_interrupt SIGTSTP\n\n")
-            f.write("# Add here all load commands\n")
-            f.write("# load_script shell_script (without extension)\n")
-        os.chmod(file, 0o755)
-
-
-@check_file_exists
-def create_file_prefix(file):
-    """
-    Create the skeleton of prefix.py.
+    Insert a text in a file just before its last line.
     """
+    with open(file, 'r') as f:
+        lines = f.readlines()
+    lines[-1:-1] = [text]
     with open(file, 'w') as f:
-        f.write("# -*- coding: utf-8 -*-\n\n")
-        f.write("# This file defines xml_id prefixes and projectwise variables.\n\n")
-        f.write("# Defines here a identifier used in the created XML_ID.\n")
-        f.write("project_name = '%s'\n" % project_name)
-        f.write("\n")
-        f.write("DEFAULT_WORKER = 1\n")
-        f.write("DEFAULT_BATCH_SIZE = 20\n")
-        f.write("\n")
-        f.write("# CONSTANTS\n")
-        f.write("COMPANY_ID = 'base.main_company'\n")
-        f.write("\n")
-        f.write("# Define here all values in client files considered as TRUE value.\n")
-        f.write("true_values = ['TRUE', 'True', 'true', 'YES', 'Yes', 'yes', 'Y', 'y', '1', '1,0', '1.0']\n")
-        f.write("# Define here all values in client files considered as FALSE value.\n")
-        f.write("false_values = ['FALSE', 'False', 'false', 'NO', 'No', 'no', 'N', 'n', '0', '0,0', '0.0']\n")
-        f.write("\n")
-        f.write("# Define the languages used in the import.\n")
-        f.write("# These will be installed by calling install_lang.py\n")
-        f.write("# Key: language code used in the client file\n")
-        f.write("# Value: the Odoo lang code\n")
-        f.write("res_lang_map = {\n")
-        f.write("#    'E': 'en_US',\n")
-        f.write("}\n\n")
-        f.write("# XML ID PREFIXES\n")
-    
-
-@check_file_exists
-def create_file_mapping(file):
-    """
-    Create the skeleton of mapping.py.
-    """
-    with open(file, 'w') as f:
-        f.write("# -*- coding: utf-8 -*-\n\n")
-        f.write("# This file defines mapping dictionaries.\n\n")
-        f.write("# MAPPING DICTIONARIES\n")
-        f.write("# Use odoo_import_scaffold with option --map-selection to\n")
-        f.write("# automatically build dictionaries of selection fields.\n\n")
+        f.writelines(lines)
 
 
-@check_file_exists
-def create_file_files(file):
-    """
-    Create the skeleton of files.py.
-    """
-    with open(file, 'w') as f:
-        f.write("# -*- coding: utf-8 -*-\n\n")
-        f.write("# This file defines the names of all used files.\n\n")
-        f.write("import os\n")
-        f.write("\n")
-        f.write("# Folders\n")
-        f.write("conf_dir = '%s'\n" % conf_dir_name)
-        f.write("data_src_dir = '%s'\n" % orig_dir_name)
-        f.write("data_raw_dir = '%s%sbinary%s' % (data_src_dir,os.sep, os.sep)\n")
-        f.write("data_dest_dir = '%s'\n" % data_dir_name)
-        f.write("\n")
-        f.write("# Configuration\n")
-        f.write("config_file = os.path.join(conf_dir,'connection.conf')\n")
-        f.write("\n")
-        f.write("# Declare here all data files\n")
-
-        if not model:
-            f.write("# Client file: src_my_model = os.path.join(data_src_dir, 'my_model.csv')\n")
-            f.write("# Import file: dest_my_model = os.path.join(data_dest_dir, 'my.model.csv')\n")
-        
-        f.write("\n")
-
-
-@check_file_exists
-def create_file_lib(file):
-    """
-    Create the skeleton of funclib.py.
-    """
-    with open(file, 'w') as f:
-        f.write("# -*- coding: utf-8 -*-\n\n")
-        f.write("# This file defines common functions.\n\n")
-        f.write("from odoo_csv_tools.lib import mapper\n")
-        f.write("from odoo_csv_tools.lib.transform import Processor\n")
-        f.write("from prefix import *\n")
-        f.write("from mapping import *\n")
-        f.write("from datetime import datetime\n")
-        f.write("\n\n")
-        f.write("nvl = lambda a, b: a or b\n")
-        f.write("\n\n")
-        f.write("def keep_numbers(val):\n")
-        f.write("    return filter(lambda x: x.isdigit(), val)\n")
-        f.write("\n\n")
-        f.write("def keep_letters(val):\n")
-        f.write("    return filter(lambda x: x.isalpha(), val)\n")
-        f.write("\n\n")
-        f.write("def remove_accents(val):\n")
-        f.write("    replacements = [\n")
-        f.write("                   (u'\%s', 'a'),\n" % 'xe0')
-        f.write("                   (u'\%s', 'a'),\n" % 'xe1')
-        f.write("                   (u'\%s', 'a'),\n" % 'xe2')
-        f.write("                   (u'\%s', 'a'),\n" % 'xe3')
-        f.write("                   (u'\%s', 'a'),\n" % 'xe4')
-        f.write("                   (u'\%s', 'a'),\n" % 'xe5')
-        f.write("                   (u'\%s', 'A'),\n" % 'xc0')
-        f.write("                   (u'\%s', 'A'),\n" % 'xc1')
-        f.write("                   (u'\%s', 'A'),\n" % 'xc2')
-        f.write("                   (u'\%s', 'A'),\n" % 'xc3')
-        f.write("                   (u'\%s', 'A'),\n" % 'xc4')
-        f.write("                   (u'\%s', 'A'),\n" % 'xc5')
-        f.write("                   (u'\%s', 'e'),\n" % 'xe8')
-        f.write("                   (u'\%s', 'e'),\n" % 'xe9')
-        f.write("                   (u'\%s', 'e'),\n" % 'xea')
-        f.write("                   (u'\%s', 'e'),\n" % 'xeb')
-        f.write("                   (u'\%s', 'E'),\n" % 'xc8')
-        f.write("                   (u'\%s', 'E'),\n" % 'xc9')
-        f.write("                   (u'\%s', 'E'),\n" % 'xca')
-        f.write("                   (u'\%s', 'E'),\n" % 'xcb')
-        f.write("                   (u'\%s', 'i'),\n" % 'xec')
-        f.write("                   (u'\%s', 'i'),\n" % 'xed')
-        f.write("                   (u'\%s', 'i'),\n" % 'xee')
-        f.write("                   (u'\%s', 'i'),\n" % 'xef')
-        f.write("                   (u'\%s', 'I'),\n" % 'xcc')
-        f.write("                   (u'\%s', 'I'),\n" % 'xcd')
-        f.write("                   (u'\%s', 'I'),\n" % 'xce')
-        f.write("                   (u'\%s', 'I'),\n" % 'xcf')
-        f.write("                   (u'\%s', 'o'),\n" % 'xf2')
-        f.write("                   (u'\%s', 'o'),\n" % 'xf3')
-        f.write("                   (u'\%s', 'o'),\n" % 'xf4')
-        f.write("                   (u'\%s', 'o'),\n" % 'xf5')
-        f.write("                   (u'\%s', 'o'),\n" % 'xf6')
-        f.write("                   (u'\%s', 'O'),\n" % 'xd2')
-        f.write("                   (u'\%s', 'O'),\n" % 'xd3')
-        f.write("                   (u'\%s', 'O'),\n" % 'xd4')
-        f.write("                   (u'\%s', 'O'),\n" % 'xd5')
-        f.write("                   (u'\%s', 'O'),\n" % 'xd6')
-        f.write("                   (u'\%s', 'c'),\n" % 'xe7')
-        f.write("                   ]\n")
-        f.write("    for a, b in replacements:\n")
-        f.write("        val = val.replace(a, b)\n")
-        f.write("    return val\n")
-        f.write("\n\n")
-        f.write("def keep_column_value(val, column):\n")
-        f.write("    def keep_column_value_fun(line):\n")
-        f.write("        if line[column] != val:\n")
-        f.write("            raise SkippingException(\"Column %s with wrong value %s\" % (column, val))\n")
-        f.write("        return line[column]\n")
-        f.write("    return keep_column_value_fun\n")
-        f.write("\n")
-
-
-@check_file_exists
-def create_file_clean_data(file):
-    """
-    Create the skeleton of clean_data.py.
-    """
-    with open(file, 'w') as f:
-        f.write("# -*- coding: utf-8 -*-\n\n")
-        f.write("# This script remove the data created by the import.\n\n")
-        f.write("import odoolib\n")
-        f.write("from odoo_csv_tools.lib import conf_lib\n")
-        f.write("from prefix import *\n")
-        f.write("from files import *\n\n")
-        f.write("connection = conf_lib.get_server_connection(config_file)\n\n")
-        f.write("def delete_model_data(connection, model, demo = False):\n")
-        f.write("    model_model = connection.get_model(model)\n")
-        f.write("    record_ids = model_model.search([])\n")
-        f.write("    if demo:\n")
-        f.write("        print 'Will remove %s records from %s' % (len(record_ids), model)\n")
-        f.write("    else:\n")
-        f.write("        print 'Remove %s records from %s' % (len(record_ids), model)\n")
-        f.write("        model_model.unlink(record_ids)\n")
-        f.write("\n\n")
-        f.write("def delete_xml_id(connection, model, module, demo = False):\n")
-        f.write("    data_model = connection.get_model('ir.model.data')\n")
-        f.write("    data_ids = data_model.search([('module', '=', module), ('model', '=', model)])\n")
-        f.write("    records = data_model.read(data_ids, ['res_id'])\n")
-        f.write("    record_ids = []\n")
-        f.write("    for rec in records:\n")
-        f.write("        record_ids.append(rec['res_id'])\n")
-        f.write("    if demo:\n")
-        f.write("        print 'Will remove %s xml_id %s from %s' % (len(record_ids), module, model)\n")
-        f.write("    else:\n")
-        f.write("        print 'Remove %s xml_id %s from %s' % (len(record_ids), module, model)\n")
-        f.write("        connection.get_model(model).unlink(record_ids)\n")
-        f.write("\n\n")
-        f.write("demo = True\n\n")
-
-
-@check_file_exists
-def create_file_install_lang(file):
-    """
-    Create the skeleton of install_lang.py.
-    """
-    with open(file, 'w') as f:
-        f.write("# -*- coding: utf-8 -*-\n\n")
-        f.write("import odoolib\n")
-        f.write("from prefix import *\n")
-        f.write("from files import *\n")
-        f.write("from odoo_csv_tools.lib import conf_lib\n\n")
-        f.write("connection = conf_lib.get_server_connection(config_file)\n\n")
-        f.write("model_lang = connection.get_model('base.language.install')\n\n")
-        f.write("for key in res_lang_map.keys():\n")
-        f.write("    lang = res_lang_map[key]\n")
-        f.write("    res = model_lang.create({'lang': lang})\n")
-        f.write("    model_lang.lang_install(res)\n")
-
-
-@check_file_exists
-def create_file_install_modules(file):
-    """
-    Create the skeleton of install_modules.py.
-    """
-    with open(file, 'w') as f:
-        f.write("# -*- coding: utf-8 -*-\n\n")
-        f.write("import sys\n")
-        f.write("import odoolib\n")
-        f.write("from prefix import *\n")
-        f.write("from files import *\n")
-        f.write("from odoo_csv_tools.lib import conf_lib\n")
-        f.write("from odoo_csv_tools.lib.internal.rpc_thread import RpcThread\n")
-        f.write("from files import config_file\n\n")
-        f.write("connection = conf_lib.get_server_connection(config_file)\n\n")
-        f.write("model_module = connection.get_model('ir.module.module')\n")
-        f.write("model_module.update_list()\n\n")
-        f.write("# Set the modules to install\n")
-        f.write("module_names = []\n\n")
-        f.write("module_ids = model_module.search_read([['name', 'in', module_names]])\n\n")
-        f.write("rpc_thread = RpcThread(1)\n\n")
-        f.write("for module in module_ids:\n")
-        f.write("    if module['state'] == 'installed':\n")
-        f.write("        rpc_thread.spawn_thread(model_module.button_immediate_upgrade, [module['id']])\n")
-        f.write("    else:\n")
-        f.write("        rpc_thread.spawn_thread(model_module.button_immediate_install, [module['id']])\n")
-
-
-@check_file_exists
-def create_file_uninstall_modules(file):
-    """
-    Create the skeleton of uninstall_modules.py.
-    """
-    with open(file, 'w') as f:
-        f.write("# -*- coding: utf-8 -*-\n\n")
-        f.write("import sys\n")
-        f.write("import odoolib\n")
-        f.write("from prefix import *\n")
-        f.write("from files import *\n")
-        f.write("from odoo_csv_tools.lib import conf_lib\n")
-        f.write("from odoo_csv_tools.lib.internal.rpc_thread import RpcThread\n")
-        f.write("from files import config_file\n\n")
-        f.write("connection = conf_lib.get_server_connection(config_file)\n\n")
-        f.write("model_module = connection.get_model('ir.module.module')\n")
-        f.write("model_module.update_list()\n\n")
-        f.write("# Set the modules to uninstall\n")
-        f.write("module_names = []\n\n")
-        f.write("module_ids = model_module.search_read([['name', 'in', module_names]])\n\n")
-        f.write("rpc_thread = RpcThread(1)\n\n")
-        f.write("for module in module_ids:\n")
-        f.write("    if module['state'] == 'installed':\n")
-        f.write("        rpc_thread.spawn_thread(model_module.button_immediate_uninstall, [module['id']])\n")
-
-
-@check_file_exists
-def create_file_init_map(file):
-    """
-    Create the skeleton of init_map.py.
-    """
-    with open(file, 'w') as f:
-        f.write("# -*- coding: utf-8 -*-\n\n")
-        f.write("import odoolib\n")
-        f.write("from prefix import *\n")
-        f.write("from files import *\n")
-        f.write("from odoo_csv_tools.lib import conf_lib\n")
-        f.write("import json\n")
-        f.write("import io\n\n")
-        f.write("connection = conf_lib.get_server_connection(config_file)\n\n")
-        f.write("def build_map_product_category_id(filename=''):\n")
-        f.write("    # Build a dictionary {product_category : xml_id} of all existing product_category.\n")
-        f.write("    model_data = connection.get_model('ir.model.data')\n")
-        f.write("    model_product_category = connection.get_model('product.category')\n")
-        f.write("    recs = model_product_category.search_read([], ['id', 'name'])\n\n")
-        f.write("    res_map = {}\n")
-        f.write("    for rec in recs:\n")
-        f.write("        data = model_data.search_read([('res_id', '=', rec['id']), ('model', '=', 'product.category')], ['module', 'name'])\n")
-        f.write("        if len(data):\n")
-        f.write("            key = rec['name'].strip()\n")
-        f.write("            val = '.'.join([data[0]['module'], data[0]['name'] ])\n")
-        f.write("            res_map[key] = val.strip()\n")
-        f.write("        # else:\n")
-        f.write("        #     print 'Product category %s has no XML_ID (id: %s)' % (rec['name'], rec['id'])\n\n")
-        f.write("    if filename:\n")
-        f.write("        with open(filename, 'w') as fp:\n")
-        f.write("            json.dump(res_map, fp)\n\n")
-        f.write("    return res_map\n\n")
-        f.write("# Execute mapping\n")
-        f.write("# dummy = build_map_product_category_id(work_map_product_category_id)\n\n")
-        f.write("# Add in files.py\n")
-        f.write("# work_map_product_category_id = os.path.join(data_src_dir, 'work_map_product_category_id.json')\n\n")
-        f.write("# Add in transformation script\n")
-        f.write("# map_product_category_id = {}\n")
-        f.write("# with io.open(work_map_product_category_id, 'r') as fp:\n")
-        f.write("#     map_product_category_id = json.load(fp, encoding='utf-8')\n\n")
-        f.write("# Add in transformation script to map 'id' column. REVIEW COLUNM NAME and PREFIX\n")
-        f.write("# def handle_product_category_id(line):\n")
-        f.write("#     categ_name = line['Product Category']\n")
-        f.write("#     try:\n")
-        f.write("#         categ_xml_id = map_product_category_id[categ_name]\n")
-        f.write("#     except:\n")
-        f.write("#         categ_xml_id = mapper.m2o(PREFIX_PRODUCT_CATEGORY, 'Product Category')(line)\n")
-        f.write("#     return categ_xml_id\n\n")
-        f.write("##################################################################################################\n\n")
-        f.write("def build_account_map(company_id, filename=''):\n")
-        f.write("    # Build a dictionary {account_code : xml_id} of all existing accounts of a company.\n")
-        f.write("    model_data = connection.get_model('ir.model.data')\n")
-        f.write("    model_account = connection.get_model('account.account')\n")
-        f.write("    recs = model_account.search_read([('company_id', '=', company_id)], ['id', 'code'])\n\n")
-        f.write("    res_map = {}\n")
-        f.write("    for rec in recs:\n")
-        f.write("        data = model_data.search_read([('res_id', '=', rec['id']), ('model', '=', 'account.account')], ['module', 'name'])\n")
-        f.write("        if len(data):\n")
-        f.write("            key = rec['code'].strip()\n")
-        f.write("            val = '.'.join([data[0]['module'], data[0]['name'] ])\n")
-        f.write("            res_map[key] = val.strip()\n")
-        f.write("        # else:\n")
-        f.write("        #     print 'Account %s has no XML_ID' % rec['code']\n\n")
-        f.write("    if filename:\n")
-        f.write("        with open(filename, 'w') as fp:\n")
-        f.write("            json.dump(res_map, fp)\n\n")
-        f.write("    return res_map\n\n")
-        f.write("# Execute mapping\n")
-        f.write("# dummy = build_account_map(1, work_map_account_code_id)\n\n")
-        f.write("# Add in files.py\n")
-        f.write("# work_map_account_code_id = os.path.join(data_src_dir, 'work_map_account_code_id.json')\n\n")
-        f.write("# Add in transformation script\n")
-        f.write("# map_account_code_id = {}\n")
-        f.write("# with io.open(work_map_account_code_id, 'r') as fp:\n")
-        f.write("#     map_account_code_id = json.load(fp, encoding='utf-8')\n\n")
-        f.write("# Add in transformation script to map 'id' column. REVIEW COLUNM NAME and PREFIX\n")
-        f.write("# def handle_account_account_id_map(line):\n")
-        f.write("#     code = line['Accounts']\n")
-        f.write("#     try:\n")
-        f.write("#         val = map_account_code_id[code]\n")
-        f.write("#     except:\n")
-        f.write("#         val = mapper.m2o(PREFIX_ACCOUNT_ACCOUNT, 'Accounts')(line)\n")
-        f.write("#     return val\n\n")
-        f.write("##################################################################################################\n\n")
-
-
-def scaffold_dir():
-    """
-    Create the whole directory structure and the basic project files.
-    """
-    create_folder(conf_dir)
-    create_folder(orig_dir)
-    create_folder(orig_raw_dir)
-    create_folder(data_dir)
-    create_folder(log_dir)
-
-    create_connection_file_local(os.path.join(conf_dir, 'connection.conf'))
-    create_connection_file_local(os.path.join(conf_dir, 'connection.local'))
-    create_connection_file_remote(os.path.join(conf_dir, 'connection.staging'), '.dev.odoo.com')
-    create_connection_file_remote(os.path.join(conf_dir, 'connection.master'), '.odoo.com')
-
-    create_cleanup_script(os.path.join(base_dir, '%s%s' % ('cleanup_data_dir', script_extension)))
-    create_transform_script(os.path.join(base_dir, '%s%s' % ('transform', script_extension)))
-    create_load_script(os.path.join(base_dir, '%s%s' % ('load', script_extension)))
-    create_file_prefix(os.path.join(base_dir, 'prefix.py'))
-    create_file_mapping(os.path.join(base_dir, 'mapping.py'))
-    create_file_files(os.path.join(base_dir, 'files.py'))
-    create_file_lib(os.path.join(base_dir, 'funclib.py'))
-    create_file_clean_data(os.path.join(base_dir, 'clean_data.py'))
-    create_file_install_lang(os.path.join(base_dir, 'install_lang.py'))
-    create_file_install_modules(os.path.join(base_dir, 'install_modules.py'))
-    create_file_uninstall_modules(os.path.join(base_dir, 'uninstall_modules.py'))
-    create_file_init_map(os.path.join(base_dir, 'init_map.py'))
-
-    sys.stdout.write("Project created in %s\n" % os.path.abspath(base_dir))
-
 ##############################################################################
-# FUNCTIONS FOR MODEL SKELETON CODE
+# MODEL FIELDS
 ##############################################################################
 
 class ModelField:
     """
     - manage how to get a suited mapper function (get_mapper_command)
     - manage how to document itself (get_info)
+    The options of the generation are read from the scaffolding session.
     """
-    def __init__(self, connection, properties):
+    def __init__(self, scaffold, connection, properties):
+        self.scaffold = scaffold
         self.connection = connection
         self.properties = properties
         self.import_warn_msg = []
@@ -613,6 +104,7 @@ class ModelField:
         self.related = properties.get('related')
         self.relation = properties.get('relation')
         self.depends = properties.get('depends')
+        self.translate = properties.get('translate')
         self.compute = self.__get_compute()
         self.selection = self.__get_selection()
         self.default_value = self.__get_default()
@@ -633,7 +125,7 @@ class ModelField:
         or an emplty list if no selection exists.
         """
         l = []
-        model_model = self.connection.get_model(model)
+        model_model = self.connection.get_model(self.scaffold.model)
         try:
             vals = model_model.fields_get([self.name]).get(self.name).get('selection')
             if not vals:
@@ -650,7 +142,7 @@ class ModelField:
         Return a list of strings (because the default value can be a multiline value)
         or an emplty list if no default value exists.
         """
-        model_model = self.connection.get_model(model)
+        model_model = self.connection.get_model(self.scaffold.model)
         val = model_model.default_get([self.name]).get(self.name, '')
         l = []
 
@@ -662,8 +154,8 @@ class ModelField:
         for line in val.splitlines():
             l.append(line)
 
-        if maxdescr > -1 and len(l) > max(1, maxdescr):
-            l = l[:maxdescr] + ['[truncated...]']
+        if self.scaffold.maxdescr > -1 and len(l) > max(1, self.scaffold.maxdescr):
+            l = l[:self.scaffold.maxdescr] + ['[truncated...]']
 
         return l
 
@@ -680,8 +172,8 @@ class ModelField:
         for line in val.splitlines():
             l.append(line)
 
-        if maxdescr > -1 and len(l) > maxdescr:
-            l = l[:maxdescr] + ['[truncated...]']
+        if self.scaffold.maxdescr > -1 and len(l) > self.scaffold.maxdescr:
+            l = l[:self.scaffold.maxdescr] + ['[truncated...]']
 
         return l
 
@@ -689,10 +181,11 @@ class ModelField:
         """
         Build the complete block of text describing a field.
         """
-        self.info = "%s (#%s): %s%s%s%s%s," % ( self.string, self.id,
+        self.info = "%s (#%s): %s%s%s%s%s%s," % ( self.string, self.id,
                                     'stored' if self.store else 'non stored',
                                     ', required' if self.required else ', optional',
                                     ', readonly' if self.readonly else '',
+                                    ', translate' if self.translate else '',
                                     ', track_visibility (%s)' % self.track_visibility if self.track_visibility else '',
                                     ', related (=%s)' % self.related if self.related else '',
                                     )
@@ -721,6 +214,9 @@ class ModelField:
         if len(self.compute) > 1:
             self.info = '%s\n    # COMPUTE: depends on %s\n    # %s' % (self.info, self.depends, '\n    # '.join(self.compute))
 
+        if self.is_parent_link():
+            self.info = "%s\n    # PARENT: xml_id of the %s record, built like its 'id' column" % (self.info, self.scaffold.parent_link[1])
+
         if self.import_warn_msg:
             self.info = "%s\n%s %s" % (self.info, '    # AVOID THIS FIELD:', ', '.join(self.import_warn_msg))
         
@@ -730,7 +226,7 @@ class ModelField:
             return u''.join((self.info)).encode('utf-8')
 
     def get_name(self):
-        return self.name if fieldname=='tech' else self.string
+        return self.name if self.scaffold.fieldname=='tech' else self.string
 
     def get_mapping_name(self):
         """
@@ -743,10 +239,12 @@ class ModelField:
         Return a suited mapper function according to the field properties and skeleton options.
         """
         if self.name == 'id':
-            if wxmlid:
+            if self.scaffold.wxmlid:
                 return "mapper.val('%s')" % self.name
             else:
                 return "mapper.m2o_map(OBJECT_XMLID_PREFIX, mapper.concat('_', 'CSV_COLUMN1','CSV_COLUMN2'))"
+        elif self.is_parent_link() and not self.scaffold.wxmlid:
+            return "mapper.m2o_map(PREFIX_%s, mapper.concat('_', 'CSV_COLUMN1','CSV_COLUMN2'))" % self.scaffold.parent_link[1].replace('.', '_').upper()
         
         elif self.type in ('integer', 'float', 'monetary'):
             return "mapper.num('%s')" % self.get_name()
@@ -757,326 +255,3253 @@ class ModelField:
         elif self.type in ('binary'):
             return "mapper.binary('%s', data_raw_dir)" % self.get_name()
         elif self.type in ('selection'):
-            if mapsel:
-                return "mapper.map_val('%s', %s_%s_map)" % (self.get_name(), model_mapped_name, self.name)
+            if self.scaffold.mapsel:
+                return "mapper.map_val('%s', %s_%s_map)" % (self.get_name(), self.scaffold.model_mapped_name, self.name)
             else:
                 return "mapper.val('%s')" % self.get_name()
-        elif self.type in ('many2many') and not wxmlid:
+        elif self.uses_name_map():
+            return "m2o_name(%s, PREFIX_%s, '%s')" % (self.get_name_map(), self.relation.replace('.', '_').upper(), self.get_name())
+        elif self.type in ('many2many') and not self.scaffold.wxmlid:
             return "mapper.m2m(PREFIX_%s, '%s')" % (self.relation.replace('.', '_').upper(), self.get_name())
-        elif self.type in ('many2one', 'one2many', 'many2many') and not wxmlid:
+        elif self.type in ('many2one', 'one2many', 'many2many') and not self.scaffold.wxmlid:
             return "mapper.m2o(PREFIX_%s, '%s')" % (self.relation.replace('.', '_').upper(), self.get_name())
 
         else:
             return "mapper.val('%s')" % self.get_name()
     
+    def get_columns(self):
+        """
+        Return the client file columns read by the mapper of the field.
+        """
+        if (self.name == 'id' or self.is_parent_link()) and not self.scaffold.wxmlid:
+            return ['CSV_COLUMN1', 'CSV_COLUMN2']
+        return [self.name if self.name == 'id' else self.get_name()]
+
+    def get_column_vars(self):
+        """
+        Return the names of the variables holding the column positions used by get_row_command.
+        """
+        columns = self.get_columns()
+        if len(columns) == 1:
+            return ['COL_%s' % self.name.upper()]
+        return ['COL_%s_%s' % (self.name.upper(), i + 1) for i in range(len(columns))]
+
+    def get_row_command(self):
+        """
+        Return an inlined expression computing the same value as get_mapper_command
+        from a line given as a list of cells.
+        Return None if the field must be computed by its mapper function (see write_row_function).
+        """
+        cells = ['line[%s]' % c for c in self.get_column_vars()]
+        if self.name == 'id':
+            if self.scaffold.wxmlid:
+                return cells[0]
+            else:
+                return "mapper.to_m2o(OBJECT_XMLID_PREFIX, '_'.join([v for v in (%s) if v]))" % ', '.join(cells)
+        elif self.is_parent_link() and not self.scaffold.wxmlid:
+            return "mapper.to_m2o(PREFIX_%s, '_'.join([v for v in (%s) if v]))" % (self.scaffold.parent_link[1].replace('.', '_').upper(), ', '.join(cells))
+
+        elif self.type in ('integer', 'float', 'monetary'):
+            return "(%s or '0.0').replace(',', '.')" % cells[0]
+        elif self.type in ('boolean'):
+            return "'1' if %s in true_values else '0' if %s in false_values else '1' if %s else '0'" % (cells[0], cells[0], cells[0])
+        elif self.type in ('datetime'):
+            return "datetime.strptime(%s, 'CSV_DATE_FORMAT').strftime('%%Y-%%m-%%d 00:00:00')" % cells[0]
+        elif self.type in ('binary'):
+            return None
+        elif self.type in ('selection'):
+            if self.scaffold.mapsel:
+                return "%s_%s_map.get(%s, '')" % (self.scaffold.model_mapped_name, self.name, cells[0])
+            else:
+                return cells[0]
+        elif self.uses_name_map():
+            return "%s.get(%s.strip()) or mapper.to_m2o(PREFIX_%s, %s)" % (self.get_name_map(), cells[0], self.relation.replace('.', '_').upper(), cells[0])
+        elif self.type in ('many2many') and not self.scaffold.wxmlid:
+            return None
+        elif self.type in ('many2one', 'one2many', 'many2many') and not self.scaffold.wxmlid:
+            return "mapper.to_m2o(PREFIX_%s, %s)" % (self.relation.replace('.', '_').upper(), cells[0])
+
+        else:
+            return cells[0]
+
     def is_required(self):
         return self.required and len(self.default_value) == 0
 
+    def uses_name_map(self):
+        """
+        Return True if the many2one column holds the names of existing records (option --m2o-by-name).
+        """
+        return self.scaffold.m2o_by_name and self.type == 'many2one' and not self.scaffold.wxmlid and self.name != 'id' and not self.is_parent_link()
 
-def load_fields():
-    """
-    Build the model fields list, fetched as defined in the target database.
-    """
-    global has_tracked_fields
-    global has_computed_fields
-    has_tracked_fields, has_computed_fields =  False, False
-    connection = conf_lib.get_server_connection(config)
-    model_fields = connection.get_model('ir.model.fields')
-
-    field_ids = model_fields.search([('model', '=', model)])
-    fields = model_fields.read(field_ids)
-    ret = []
-    for field in fields:
-        f = ModelField(connection, field)
-        has_tracked_fields = has_tracked_fields or f.track_visibility
-        has_computed_fields = has_computed_fields or len(f.compute) > 1
-        ret.append(f)
-    return ret
-    
+    def get_name_map(self):
+        """
+        Return the name of the variable holding the prefetched {name: xml_id} of the related model.
+        """
+        return 'name_map_%s' % self.relation.replace('.', '_')
 
-def write_begin(file):
-    """
-    Write the beginning of the generated python script.
-    """
-    file.write("# -*- coding: utf-8 -*-\n")
-    file.write("\n")
-    file.write("from odoo_csv_tools.lib import mapper\n")
-    file.write("from odoo_csv_tools.lib.transform import Processor\n")
-    file.write("from prefix import *\n")
-    file.write("from mapping import *\n")
-    file.write("from files import *\n")
-    file.write("from funclib import *\n")
-    file.write("from datetime import datetime\n")
-    file.write("\n")
-    file.write("# Needed for RPC calls\n")
-    file.write("# import odoolib\n")
-    file.write("# from odoo_csv_tools.lib import conf_lib\n")
-    file.write("# connection = conf_lib.get_server_connection(config_file)\n")
-    file.write("\n")
-    file.write("def preprocess_%s(header, data):\n" % model_class_name)
-    file.write("    # Do nothing\n")
-    file.write("    return header, data\n")
-    file.write("    #\n")
-    file.write("    # Add a column\n")
-    file.write("    # header.append('NEW_COLUMN')\n")
-    file.write("    # for i, j in enumerate(data):\n")
-    file.write("    #     data[i].append(NEW_VALUE)\n")
-    file.write("    #\n")
-    file.write("    # Keep lines that match a criteria\n")
-    file.write("    # data_new = []\n")
-    file.write("    # for i, j in enumerate(data):\n")
-    file.write("    #     line = dict(zip(header, j))\n")
-    file.write("    #     if line['CSV_COLUMN'].....\n")
-    file.write("    #         data_new.append(j)\n")
-    file.write("    # return header, data_new\n")
-    file.write("\n")
-    file.write("processor = Processor(src_%s, delimiter='%s', preprocess=preprocess_%s)\n" % (model_mapped_name, csv_delimiter, model_class_name))
-    file.write("\n")
-
-
-def write_end(file):
+    def is_parent_link(self):
+        """
+        Return True if the field links a split one2many line to its parent (option --split-o2m).
+        """
+        return bool(self.scaffold.parent_link) and self.name == self.scaffold.parent_link[0]
+
+    def is_commented(self):
+        """
+        Return True if the mapping of the field must be commented.
+        """
+        return (self.scaffold.required and not self.is_required() and self.name != 'id' and not self.is_parent_link()) or bool(self.import_warn_msg)
+
+
+##############################################################################
+# SCAFFOLDING SESSION
+##############################################################################
+
+class Scaffold(object):
     """
-    Write the end of the generated python script.
+    Scaffolding session of an import project and of its models.
+    The options and the state of the generation are attributes of the session instead of module
+    globals, so that several sessions can be used in the same process (e.g. one per thread).
+    - scaffold_project: create the folders structure and the basic project files
+    - create_model: create the python script of a model (and add it to the project files with append)
+    - skeleton_code: return the generated files of a model as strings, by filename
+    - list_models: print the models of the target database
+    The keyword arguments are the options of the command line (see -h|--help).
     """
-    ctx = ''
-    ctx_opt = []
+    def __init__(self, base_dir=default_base_dir, dbname='', host='localhost', userid=2,
+                 config=os.path.join(conf_dir_name, 'connection.conf'), outfile=None, required=False,
+                 skeleton='dict', fieldname='user', wstored=False, wo2m=False, split_o2m=False,
+                 wmetadata=False, mapsel=False, wxmlid=False, m2o_by_name=False, sharded=False,
+                 wtranslations=False, wextractor=False, wloadlib=False, compression=None, maxdescr=10,
+                 offline=False, append=False, force=False, verbose=False):
+        self.base_dir = base_dir
+        self.dbname = dbname
+        self.host = host
+        self.userid = userid
+        self.config = os.path.join(base_dir, config)
+        self.required = required
+        self.skeleton = skeleton
+        self.fieldname = fieldname
+        self.wstored = wstored
+        self.wo2m = wo2m
+        self.split_o2m = split_o2m
+        self.wmetadata = wmetadata
+        self.mapsel = mapsel
+        self.wxmlid = wxmlid
+        self.m2o_by_name = m2o_by_name
+        self.sharded = sharded
+        self.wtranslations = wtranslations
+        self.wextractor = wextractor
+        self.wloadlib = wloadlib
+        self.compression = '.%s' % compression if compression else ''
+        self.maxdescr = int(maxdescr)
+        self.offline = offline
+        self.append = append
+        self.force = force
+        self.verbose = verbose
+
+        self.script_extension = '.cmd' if platform.system() == 'Windows' else '.sh'
+        self.csv_delimiter = ';'
+        self.default_python_exe = 'python loadlib.py' if wloadlib else ''
+        self.default_path = ''
+
+        # Project structure
+        if base_dir == default_base_dir:
+            self.project_name = os.path.basename(os.path.normpath(os.getcwd()))
+        else:
+            self.project_name = os.path.basename(os.path.normpath(base_dir))
+        self.conf_dir = os.path.join(base_dir, conf_dir_name)
+        self.orig_dir = os.path.join(base_dir, orig_dir_name)
+        self.orig_raw_dir = os.path.join(base_dir, orig_raw_dir_name)
+        self.data_dir = os.path.join(base_dir, data_dir_name)
+        self.log_dir = os.path.join(base_dir, log_dir_name)
+
+        # Model being generated (set by set_model and load_fields)
+        self.model = None
+        self.outfile = outfile
+        self.model_mapped_name = None
+        self.model_class_name = None
+        self.model_mapping_name = None
+        self.self_ref_fields = []
+        self.computed_fields = []
+        self.translated_fields = []
+        self.o2m_children = []
+        # (inverse field, parent model) of a one2many comodel being generated (option --split-o2m)
+        self.parent_link = None
+        self.inherited_features = set()
+        self.has_tracked_fields = False
+        self.has_computed_fields = False
+
+    def scaffold_project(self):
+        """
+        Create the folders structure and the basic project files.
+        """
+        # If database is omitted, get the first part of the hostname
+        if is_remote_host(self.host) and not self.dbname:
+            self.dbname = self.host.split('.')[:1][0]
+            sys.stdout.write('Database is set by default to %s.\n' % self.dbname)
 
-    if dbname and not offline:
-        if has_tracked_fields:
-            ctx_opt.append("'tracking_disable': True")
-        if has_computed_fields:
-            ctx_opt.append("'defer_fields_computation': True")
-        if wmetadata:
-            ctx_opt.append("'write_metadata': True")
+        self.scaffold_dir()
 
-    if len(ctx_opt):
-        ctx = "'context': \"{%s}\", " % ', '.join(ctx_opt)
+    def create_model(self, model, outfile=None):
+        """
+        Create the python script of a model. The option outfile of the session is used by default.
+        """
+        self.set_model(model, outfile or self.outfile)
+        self.scaffold_model()
 
-    # file.write("processor.process(%s, dest_%s, {'model': '%s', %s'groupby': '', 'ignore': '', 'worker': %s, 'batch_size': %s}, 'set', verbose=False)\n\n" % (model_mapping_name, model_mapped_name, model, ctx, default_worker, default_batch_size))
-    file.write("processor.process(%s, dest_%s, {'model': '%s', %s'groupby': '', 'worker': DEFAULT_WORKER, 'batch_size': DEFAULT_BATCH_SIZE}, 'set', verbose=False)\n\n" % (model_mapping_name, model_mapped_name, model, ctx))
-    file.write("processor.write_to_file('%s%s', python_exe='%s', path='%s')\n\n" % (model_mapped_name, script_extension, default_python_exe, default_path))
+    def skeleton_code(self, model):
+        """
+        Return the generated files of a model as {filename: code}, without writing them:
+        the python script and, according to the options, the mapping module of its selection fields,
+        its extractor and the files of its one2many comodels (option split_o2m).
+        Raise ValueError if the model is not found in the target database.
+        """
+        self.set_model(model)
+        self.read_config()
+        if not self.dbname:
+            self.offline = True
+        elif not self.model_exists(self.model):
+            raise ValueError('Model %s not found' % self.model)
+        new_stream = lambda: io.StringIO() if sys.version_info >= (3, 0, 0) else io.BytesIO()
+        code = new_stream()
+        self.write_begin(code)
+        model_fields = self.write_mapping(code)
+        self.write_end(code)
+        result = {os.path.basename(self.outfile): code.getvalue()}
+        if self.mapsel and model_fields is not None:
+            mapsel = new_stream()
+            self.write_mapsel(mapsel, model_fields)
+            result['%s.py' % self.mapsel_module()] = mapsel.getvalue()
+        if self.wextractor and self.dbname and not self.offline:
+            extractor = new_stream()
+            self.write_extractor(extractor, model_fields)
+            result['extract_%s.py' % self.model_mapped_name] = extractor.getvalue()
+        if self.o2m_children and not self.parent_link:
+            parent = self.model
+            for name, relation, relation_field in self.o2m_children:
+                self.parent_link = (relation_field, parent)
+                try:
+                    result.update(self.skeleton_code(relation))
+                finally:
+                    self.parent_link = None
+            self.set_model(parent)
+        return result
+
+    ##############################################################################
+    # FUNCTIONS FOR DIRECTORY STRUCTURE
+    ##############################################################################
+
+    def create_folder(self, path):
+        """
+        Create a folder only if it doesn't exist or if the flag "force" is set.
+        """
+        if os.path.exists(path) and not self.force:
+            if self.verbose: sys.stdout.write('Folder %s already exists.\n' % path)
+            return
 
+        if self.verbose: sys.stdout.write('Create folder %s\n' % path)
+        try:
+            os.makedirs(path)
+        except OSError as exception:
+            if exception.errno != errno.EEXIST:
+                raise
 
-def write_mapping(file):
-    """
-    Write the fields mapping of the generated python script.
-    """
-    if not dbname or offline:
-        file.write("%s = {\n    'id': ,\n}\n\n" % model_mapping_name)
-        return
-
-    fields = load_fields()
-    filtering = "lambda f: f.name != '__last_update'"
-    if wstored:
-        filtering = "%s and f.store" % filtering
-    if not wo2m:
-        filtering = "%s and f.type != 'one2many'" % filtering
-    if not wmetadata:
-        filtering = "%s and f.name not in ('create_uid', 'write_uid', 'create_date', 'write_date', 'active')" % filtering
-    fields = filter(eval(filtering), fields)
-    fields = sorted(fields, key=lambda f: ((f.name != 'id'), not f.is_required(), f.name))
-    
-    if skeleton == 'dict':
-        file.write('%s = {\n' % model_mapping_name)
+
+
+
+    @check_file_exists
+    def create_connection_file_local(self, file):
+        """
+        Enforce encrypted connection on remote hosts. 
+        Leave unencrypted for local databases.
+        """
+        is_remote = is_remote_host(self.host)
+        protocol = 'jsonrpcs' if is_remote else 'jsonrpc'
+        port = '443' if is_remote else '8069'
+        with open(file, 'w') as f:
+            f.write("[Connection]\n")
+            f.write("hostname = %s\n" % self.host)
+            f.write("database = %s\n" % self.dbname)
+            f.write("login = admin\n")
+            f.write("password = admin\n")
+            f.write("protocol = %s\n" % protocol)
+            f.write("port = %s\n" % port)
+            f.write("uid = %s\n" % self.userid)
+
+
+    @check_file_exists
+    def create_connection_file_remote(self, file, hostname):
+        """
+        Just a preset for encrypted connection.
+        """
+        with open(file, 'w') as f:
+            f.write("[Connection]\n")
+            f.write("hostname = %s\n" % hostname)
+            f.write("database = \n")
+            f.write("login = \n")
+            f.write("password = \n")
+            f.write("protocol = jsonrpcs\n")
+            f.write("port = 443\n")
+            f.write("uid = %s\n" % self.userid)
+
+
+    @check_file_exists
+    def create_cleanup_script(self, file):
+        """
+        Create the shell script to empty the folder "data".
+        """
+        if platform.system() == 'Windows':
+            with open(file, 'w') as f:
+                f.write("@echo off\n\n")
+                f.write("set DIR=%s\n" % data_dir_name)
+                f.write("del /F /S /Q %DIR%\*\n")
+        else:
+            with open(file, 'w') as f:
+                f.write("#!/usr/bin/env bash\n\n")
+                f.write("DIR=%s%s\n" % (data_dir_name, os.sep))
+                f.write("rm -rf --interactive=never $DIR\n")
+                f.write("mkdir -p $DIR\n")
+            os.chmod(file, 0o755)
+
+
+    @check_file_exists
+    def create_transform_script(self, file):
+        """
+        Create the shell script skeleton that launches all transform commands.
+        """
+        if platform.system() == 'Windows':
+            with open(file, 'w') as f:
+                f.write("@echo off\n\n")
+                f.write("set LOGDIR=%s\n" % log_dir_name)
+                f.write("set DATADIR=%s\n\n" % data_dir_name)
+                f.write("call cleanup_data_dir.cmd\n\n")
+                f.write("REM Add here all transform commands\n")
+                f.write("REM python my_model.py > %LOGDIR%\\transform_$1_out.log 2> %LOGDIR%\\transform_$1_err.log\n")
+        else:
+            with open(file, 'w') as f:
+                f.write("#!/usr/bin/env bash\n\n")
+                f.write("LOGDIR=%s\n" % log_dir_name)
+                f.write("DATADIR=%s\n\n" % data_dir_name)
+                f.write("COLOR='\\033[1;32m'\n")
+                f.write("NC='\\033[0m'\n\n")
+                f.write("msg() {\n")
+                f.write("    start=$(date +%s.%3N)\n")
+                f.write("    PID=$!\n")
+                f.write("    printf \"($PID) Transform ${COLOR}$1${NC} [\"\n")
+                f.write("    while kill -0 $PID 2> /dev/null; do\n")
+                f.write("        printf  \"▓\"\n")
+                f.write("        sleep 1\n")
+                f.write("    done\n")
+                f.write("    end=$(date +%s.%3N)\n")
+                f.write("    runtime=$(python -c \"print '%u:%02u' % ((${end} - ${start})/60, (${end} - ${start})%60)\")\n")
+                f.write("    printf \"] $runtime \\n\"\n")
+                f.write("}\n\n")
+                f.write("# With --incremental, only the models whose inputs changed are transformed (see build.py)\n")
+                f.write("INCREMENTAL=\n")
+                f.write("if [ \"$1\" = \"--incremental\" ]; then\n")
+                f.write("    INCREMENTAL=1\n")
+                f.write("fi\n\n")
+                f.write("load_script() {\n")
+                f.write("    if [ -n \"$INCREMENTAL\" ] && python build.py check transform $1; then\n")
+                f.write("        echo \"Transform $1 up to date\"\n")
+                f.write("        return\n")
+                f.write("    fi\n")
+                f.write("    #rm -f $DATADIR/*$1*.csv*\n")
+                f.write("    rm -f $LOGDIR/transform_$1_*.log\n")
+                f.write("    python $1.py > $LOGDIR/transform_$1_out.log 2> $LOGDIR/transform_$1_err.log &\n")
+                f.write("    msg \"$1\"\n")
+                f.write("    wait $PID && python build.py record transform $1\n")
+                f.write("}\n\n")
+                f.write("if [ -z \"$INCREMENTAL\" ]; then\n")
+                f.write("    ./cleanup_data_dir.sh\n")
+                f.write("fi\n\n")
+                f.write("# Add here all transform commands\n")
+                f.write("# load_script python_script (without extension)\n")
+                f.write("python check_duplicates.py; chmod +x *.sh\n")
+            os.chmod(file, 0o755)
+
+
+    @check_file_exists
+    def create_load_script(self, file):
+        """
+        Create the shell script skeleton that launches all load commands.
+        """
+        if platform.system() == 'Windows':
+            with open(file, 'w') as f:
+                f.write("@echo off\n\n")
+                f.write("set LOGDIR=%s\n\n" % log_dir_name)
+                f.write("del /q %LOGDIR%\\metrics_*.jsonl 2> nul\n")
+                f.write("python pre_load.py\n\n")
+                f.write("REM Add here all load commands, before the restore of the features disabled by pre_load.py (last line)\n")
+                f.write("REM my_model.cmd > %LOGDIR%\\load_$1_out.log 2> %LOGDIR%\\load_$1_err.log\n")
+                f.write("python post_load.py\n")
+        else:
+            with open(file, 'w') as f:
+                f.write("#!/usr/bin/env bash\n\n")
+                f.write("LOGDIR=%s\n\n" % log_dir_name)
+                f.write("COLOR='\\033[1;32m'\n")
+                f.write("NC='\\033[0m'\n\n")
+                f.write("user_interrupt() {\n")
+                f.write("    echo -e \"\\n\\nKeyboard Interrupt detected.\"\n")
+                f.write("    echo -e \"\\nKill import tasks...\"\n")
+                f.write("    # Kill the current import\n")
+                f.write("    killall odoo-import-thread.py\n")
+                f.write("    sleep 2\n")
+                f.write("    # Kill the next launched import (--fail)\n")
+                f.write("    killall odoo-import-thread.py\n")
+                f.write("    exit\n")
+                f.write("}\n\n")
+                f.write("msg() {\n")
+                f.write("    start=$(date +%s.%3N)\n")
+                f.write("    PID=$!\n")
+                f.write("    printf \"($PID) Load ${COLOR}$1${NC} [\"\n")
+                f.write("    while kill -0 $PID 2> /dev/null; do\n")
+                f.write("        printf  \"▓\"\n")
+                f.write("        sleep 1\n")
+                f.write("    done\n")
+                f.write("    end=$(date +%s.%3N)\n")
+                f.write("    runtime=$(python -c \"print '%u:%02u' % ((${end} - ${start})/60, (${end} - ${start})%60)\")\n")
+                f.write("    printf \"] $runtime \\n\"\n")
+                f.write("}\n\n")
+                f.write("# With --incremental, only the models transformed since their last load are loaded (see build.py)\n")
+                f.write("INCREMENTAL=\n")
+                f.write("if [ \"$1\" = \"--incremental\" ]; then\n")
+                f.write("    INCREMENTAL=1\n")
+                f.write("fi\n\n")
+                f.write("load_script() {\n")
+                f.write("    if [ -n \"$INCREMENTAL\" ] && python build.py check load $1; then\n")
+                f.write("        echo \"Load $1 up to date\"\n")
+                f.write("        return\n")
+                f.write("    fi\n")
+                f.write("    # rm -f \$LOGDIR/load_$1_*.log\n")
+                f.write("    ./$1.sh > $LOGDIR/load_$1_out.log 2> $LOGDIR/load_$1_err.log &\n")
+                f.write("    msg \"$1\"\n")
+                f.write("    wait $PID && python build.py record load $1\n")
+                f.write("}\n\n")
+                f.write("load_translations() {\n")
+                f.write("    # Load the translation scripts of a model (my_model.<lang>.sh), all languages in parallel\n")
+                f.write("    if [ -n \"$INCREMENTAL\" ] && python build.py check translations $1; then\n")
+                f.write("        echo \"Load $1 translations up to date\"\n")
+                f.write("        return\n")
+                f.write("    fi\n")
+                f.write("    (\n")
+                f.write("    for script in ./$1.*.sh; do\n")
+                f.write("        [ -e \"$script\" ] || continue\n")
+                f.write("        lang=$(basename $script .sh)\n")
+                f.write("        $script > $LOGDIR/load_${lang}_out.log 2> $LOGDIR/load_${lang}_err.log &\n")
+                f.write("    done\n")
+                f.write("    wait\n")
+                f.write("    ) &\n")
+                f.write("    msg \"$1 translations\"\n")
+                f.write("    wait $PID && python build.py record translations $1\n")
+                f.write("}\n\n")
+                f.write("trap user_interrupt SIGINT\n")
+                f.write("trap user_interrupt SIGTSTP\n\n")
+                f.write("# Reset the metrics of loadlib.py (see load_report.py)\n")
+                f.write("rm -f $LOGDIR/metrics_*.jsonl\n\n")
+                f.write("# Disable the crons and other costly features during the load, restore them at exit\n")
+                f.write("python pre_load.py\n")
+                f.write("trap \"python post_load.py\" EXIT\n\n")
+                f.write("# Add here all load commands\n")
+                f.write("# load_script shell_script (without extension)\n")
+            os.chmod(file, 0o755)
+
+
+    @check_file_exists
+    def create_file_prefix(self, file):
+        """
+        Create the skeleton of prefix.py.
+        """
+        with open(file, 'w') as f:
+            f.write("# -*- coding: utf-8 -*-\n\n")
+            f.write("# This file defines xml_id prefixes and projectwise variables.\n\n")
+            f.write("# Defines here a identifier used in the created XML_ID.\n")
+            f.write("project_name = '%s'\n" % self.project_name)
+            f.write("\n")
+            f.write("# With loadlib.py (option --with-loadlib), the load starts with DEFAULT_WORKER concurrent batches\n")
+            f.write("# and adapts to the server up to DEFAULT_MAX_WORKER.\n")
+            f.write("DEFAULT_WORKER = 1\n")
+            f.write("DEFAULT_MAX_WORKER = 8\n")
+            f.write("DEFAULT_BATCH_SIZE = 20\n")
+            f.write("# Size limit of the load batches, applied by loadlib.py (option --with-loadlib).\n")
+            f.write("# The batches of DEFAULT_BATCH_MAX_ROWS rows (DEFAULT_BATCH_SIZE if 0) are split in parts of at most\n")
+            f.write("# DEFAULT_BATCH_BYTES serialized bytes, but of at least DEFAULT_BATCH_MIN_ROWS rows.\n")
+            f.write("DEFAULT_BATCH_BYTES = 2 * 1024 * 1024\n")
+            f.write("DEFAULT_BATCH_MIN_ROWS = 1\n")
+            f.write("DEFAULT_BATCH_MAX_ROWS = 200\n")
+            f.write("# Size limits by model: (bytes, min rows[, max rows]), ex: 'product.template': (512 * 1024, 5)\n")
+            f.write("BATCH_BYTES = {\n")
+            f.write("}\n")
+            f.write("\n")
+            f.write("# CONSTANTS\n")
+            f.write("COMPANY_ID = 'base.main_company'\n")
+            f.write("\n")
+            f.write("# Define here all values in client files considered as TRUE value.\n")
+            f.write("true_values = ['TRUE', 'True', 'true', 'YES', 'Yes', 'yes', 'Y', 'y', '1', '1,0', '1.0']\n")
+            f.write("# Define here all values in client files considered as FALSE value.\n")
+            f.write("false_values = ['FALSE', 'False', 'false', 'NO', 'No', 'no', 'N', 'n', '0', '0,0', '0.0']\n")
+            f.write("\n")
+            f.write("# Define the languages used in the import.\n")
+            f.write("# These will be installed by calling install_lang.py\n")
+            f.write("# Key: language code used in the client file\n")
+            f.write("# Value: the Odoo lang code\n")
+            f.write("res_lang_map = {\n")
+            f.write("#    'E': 'en_US',\n")
+            f.write("}\n\n")
+            f.write("# XML ID PREFIXES\n")
+
+
+    @check_file_exists
+    def create_file_mapping(self, file):
+        """
+        Create the skeleton of mapping.py.
+        """
+        with open(file, 'w') as f:
+            f.write("# -*- coding: utf-8 -*-\n\n")
+            f.write("# This file defines mapping dictionaries.\n\n")
+            f.write("# MAPPING DICTIONARIES\n")
+            f.write("# The option --map-selection of odoo_import_scaffold builds the dictionaries\n")
+            f.write("# of the selection fields of a model in its own module map_my_model.py.\n\n")
+
+
+    @check_file_exists
+    def create_file_files(self, file):
+        """
+        Create the skeleton of files.py.
+        """
+        with open(file, 'w') as f:
+            f.write("# -*- coding: utf-8 -*-\n\n")
+            f.write("# This file defines the names of all used files.\n\n")
+            f.write("import os\n")
+            f.write("\n")
+            f.write("# Folders\n")
+            f.write("conf_dir = '%s'\n" % conf_dir_name)
+            f.write("data_src_dir = '%s'\n" % orig_dir_name)
+            f.write("data_raw_dir = '%s%sbinary%s' % (data_src_dir,os.sep, os.sep)\n")
+            f.write("data_dest_dir = '%s'\n" % data_dir_name)
+            f.write("\n")
+            f.write("# Configuration\n")
+            f.write("config_file = os.path.join(conf_dir,'connection.conf')\n")
+            f.write("\n")
+            f.write("# Declare here all data files\n")
+            f.write("# Files with the extension .csv.gz or .csv.zst are read and written compressed\n")
+
+            if not self.model:
+                f.write("# Client file: src_my_model = os.path.join(data_src_dir, 'my_model.csv')\n")
+                f.write("# Import file: dest_my_model = os.path.join(data_dest_dir, 'my.model.csv')\n")
+
+            f.write("\n")
+
+
+    @check_file_exists
+    def create_file_lib(self, file):
+        """
+        Create the skeleton of funclib.py.
+        """
+        with open(file, 'w') as f:
+            f.write("# -*- coding: utf-8 -*-\n\n")
+            f.write("# This file defines common functions.\n\n")
+            f.write("import sys\n")
+            f.write("import os\n")
+            f.write("import io\n")
+            f.write("import re\n")
+            f.write("import csv\n")
+            f.write("import importlib\n")
+            f.write("import functools\n")
+            f.write("import types\n")
+            f.write("import multiprocessing\n")
+            f.write("import gzip\n")
+            f.write("import shutil\n")
+            f.write("from odoo_csv_tools.lib import mapper\n")
+            f.write("from odoo_csv_tools.lib.transform import Processor\n")
+            f.write("from odoo_csv_tools.lib.internal.exceptions import SkippingException\n")
+            f.write("from odoo_csv_tools.lib.internal.io import is_string\n")
+            f.write("from prefix import *\n")
+            f.write("from mapping import *\n")
+            f.write("from datetime import datetime\n")
+            f.write("\n\n")
+            f.write("nvl = lambda a, b: a or b\n")
+            f.write("\n\n")
+            f.write("def keep_numbers(val):\n")
+            f.write("    return filter(lambda x: x.isdigit(), val)\n")
+            f.write("\n\n")
+            f.write("def keep_letters(val):\n")
+            f.write("    return filter(lambda x: x.isalpha(), val)\n")
+            f.write("\n\n")
+            f.write("def remove_accents(val):\n")
+            f.write("    replacements = [\n")
+            f.write("                   (u'\%s', 'a'),\n" % 'xe0')
+            f.write("                   (u'\%s', 'a'),\n" % 'xe1')
+            f.write("                   (u'\%s', 'a'),\n" % 'xe2')
+            f.write("                   (u'\%s', 'a'),\n" % 'xe3')
+            f.write("                   (u'\%s', 'a'),\n" % 'xe4')
+            f.write("                   (u'\%s', 'a'),\n" % 'xe5')
+            f.write("                   (u'\%s', 'A'),\n" % 'xc0')
+            f.write("                   (u'\%s', 'A'),\n" % 'xc1')
+            f.write("                   (u'\%s', 'A'),\n" % 'xc2')
+            f.write("                   (u'\%s', 'A'),\n" % 'xc3')
+            f.write("                   (u'\%s', 'A'),\n" % 'xc4')
+            f.write("                   (u'\%s', 'A'),\n" % 'xc5')
+            f.write("                   (u'\%s', 'e'),\n" % 'xe8')
+            f.write("                   (u'\%s', 'e'),\n" % 'xe9')
+            f.write("                   (u'\%s', 'e'),\n" % 'xea')
+            f.write("                   (u'\%s', 'e'),\n" % 'xeb')
+            f.write("                   (u'\%s', 'E'),\n" % 'xc8')
+            f.write("                   (u'\%s', 'E'),\n" % 'xc9')
+            f.write("                   (u'\%s', 'E'),\n" % 'xca')
+            f.write("                   (u'\%s', 'E'),\n" % 'xcb')
+            f.write("                   (u'\%s', 'i'),\n" % 'xec')
+            f.write("                   (u'\%s', 'i'),\n" % 'xed')
+            f.write("                   (u'\%s', 'i'),\n" % 'xee')
+            f.write("                   (u'\%s', 'i'),\n" % 'xef')
+            f.write("                   (u'\%s', 'I'),\n" % 'xcc')
+            f.write("                   (u'\%s', 'I'),\n" % 'xcd')
+            f.write("                   (u'\%s', 'I'),\n" % 'xce')
+            f.write("                   (u'\%s', 'I'),\n" % 'xcf')
+            f.write("                   (u'\%s', 'o'),\n" % 'xf2')
+            f.write("                   (u'\%s', 'o'),\n" % 'xf3')
+            f.write("                   (u'\%s', 'o'),\n" % 'xf4')
+            f.write("                   (u'\%s', 'o'),\n" % 'xf5')
+            f.write("                   (u'\%s', 'o'),\n" % 'xf6')
+            f.write("                   (u'\%s', 'O'),\n" % 'xd2')
+            f.write("                   (u'\%s', 'O'),\n" % 'xd3')
+            f.write("                   (u'\%s', 'O'),\n" % 'xd4')
+            f.write("                   (u'\%s', 'O'),\n" % 'xd5')
+            f.write("                   (u'\%s', 'O'),\n" % 'xd6')
+            f.write("                   (u'\%s', 'c'),\n" % 'xe7')
+            f.write("                   ]\n")
+            f.write("    for a, b in replacements:\n")
+            f.write("        val = val.replace(a, b)\n")
+            f.write("    return val\n")
+            f.write("\n\n")
+            f.write("def keep_column_value(val, column):\n")
+            f.write("    def keep_column_value_fun(line):\n")
+            f.write("        if line[column] != val:\n")
+            f.write("            raise SkippingException(\"Column %s with wrong value %s\" % (column, val))\n")
+            f.write("        return line[column]\n")
+            f.write("    return keep_column_value_fun\n")
+            f.write("\n")
+            f.write("\n")
+            f.write("name_maps = {}\n")
+            f.write("\n")
+            f.write("\n")
+            f.write("def build_name_map(connection, model, field='name', domain=None, page_size=10000):\n")
+            f.write("    # Return {name: xml_id} of the existing records of a model, read by pages of page_size records.\n")
+            f.write("    # Each page needs one search_read on the model and one on ir.model.data.\n")
+            f.write("    # The records without xml_id are ignored. When a name is not unique, the first record is kept.\n")
+            f.write("    # The maps are kept in name_maps, so that the processes of a sharded transformation reuse them.\n")
+            f.write("    key = (model, field, repr(domain))\n")
+            f.write("    if key in name_maps:\n")
+            f.write("        return name_maps[key]\n")
+            f.write("    model_model = connection.get_model(model)\n")
+            f.write("    model_data = connection.get_model('ir.model.data')\n")
+            f.write("    res_map = {}\n")
+            f.write("    offset = 0\n")
+            f.write("    while True:\n")
+            f.write("        recs = model_model.search_read(domain or [], [field], order='id', offset=offset, limit=page_size, context={'active_test': False})\n")
+            f.write("        xml_ids = {}\n")
+            f.write("        for data in model_data.search_read([('model', '=', model), ('res_id', 'in', [rec['id'] for rec in recs])], ['module', 'name', 'res_id'], order='id'):\n")
+            f.write("            xml_ids.setdefault(data['res_id'], '%s.%s' % (data['module'], data['name']))\n")
+            f.write("        for rec in recs:\n")
+            f.write("            name = (rec[field] or '').strip()\n")
+            f.write("            if name and rec['id'] in xml_ids:\n")
+            f.write("                res_map.setdefault(name, xml_ids[rec['id']])\n")
+            f.write("        if len(recs) < page_size:\n")
+            f.write("            name_maps[key] = res_map\n")
+            f.write("            return res_map\n")
+            f.write("        offset += page_size\n")
+            f.write("\n")
+            f.write("\n")
+            f.write("def m2o_name(name_map, prefix, field):\n")
+            f.write("    # Mapper of a many2one column holding names: the xml_id of the existing record found in name_map\n")
+            f.write("    # (see build_name_map), else the xml_id built by mapper.m2o.\n")
+            f.write("    m2o = mapper.m2o(prefix, field)\n")
+            f.write("    def m2o_name_fun(line):\n")
+            f.write("        return name_map.get(line[field].strip()) or m2o(line)\n")
+            f.write("    return m2o_name_fun\n")
+            f.write("\n")
+            f.write("\n")
+            f.write("def open_data_file(filename, mode='rb'):\n")
+            f.write("    # Open a data file in binary mode, compressed according to its extension (.gz, .zst) or not.\n")
+            f.write("    if filename.endswith('.gz'):\n")
+            f.write("        return gzip.open(filename, mode)\n")
+            f.write("    if filename.endswith('.zst'):\n")
+            f.write("        import zstandard\n")
+            f.write("        if 'r' in mode:\n")
+            f.write("            return zstandard.ZstdDecompressor().stream_reader(open(filename, 'rb'), closefd=True)\n")
+            f.write("        return zstandard.ZstdCompressor().stream_writer(open(filename, 'wb'), closefd=True)\n")
+            f.write("    return io.open(filename, mode)\n")
+            f.write("\n\n")
+            f.write("def uncompressed_name(filename):\n")
+            f.write("    # Name of a data file without its compression extension, if any.\n")
+            f.write("    return os.path.splitext(filename)[0] if filename.endswith(('.gz', '.zst')) else filename\n")
+            f.write("\n\n")
+            f.write("def command_file(line):\n")
+            f.write("    # Import file of a load command of odoo_import_thread.py, None if the line has none.\n")
+            f.write("    match = re.search(r'--file=(\\S+)', line)\n")
+            f.write("    return match.group(1) if match else None\n")
+            f.write("\n\n")
+            f.write("def imports_file(line, filename):\n")
+            f.write("    # True if the line is a load command of the import file filename (compressed or not).\n")
+            f.write("    # The processor writes the absolute path of the import files in the load scripts.\n")
+            f.write("    used = command_file(line)\n")
+            f.write("    path = lambda name: os.path.normcase(os.path.abspath(name))\n")
+            f.write("    return used is not None and path(used) == path(uncompressed_name(filename))\n")
+            f.write("\n\n")
+            f.write("def referenced_columns(header, *mappings):\n")
+            f.write("    # Return the columns of the header referenced by mappings (dicts of mappers) or functions:\n")
+            f.write("    # the column names found in the constants and closures of their code, and in the functions\n")
+            f.write("    # of the same module they call. The column names built at runtime are not found.\n")
+            f.write("    columns = set(header)\n")
+            f.write("    found = set()\n")
+            f.write("    seen = set()\n\n")
+            f.write("    def code_names(code):\n")
+            f.write("        names = list(code.co_names)\n")
+            f.write("        for const in code.co_consts:\n")
+            f.write("            if isinstance(const, types.CodeType):\n")
+            f.write("                names.extend(code_names(const))\n")
+            f.write("        return names\n\n")
+            f.write("    def walk(obj):\n")
+            f.write("        if is_string(obj):\n")
+            f.write("            if obj in columns:\n")
+            f.write("                found.add(obj)\n")
+            f.write("            return\n")
+            f.write("        if id(obj) in seen:\n")
+            f.write("            return\n")
+            f.write("        seen.add(id(obj))\n")
+            f.write("        if isinstance(obj, dict):\n")
+            f.write("            for value in obj.values():\n")
+            f.write("                walk(value)\n")
+            f.write("        elif isinstance(obj, (list, tuple, set, frozenset)):\n")
+            f.write("            for value in obj:\n")
+            f.write("                walk(value)\n")
+            f.write("        elif isinstance(obj, types.CodeType):\n")
+            f.write("            for const in obj.co_consts:\n")
+            f.write("                walk(const)\n")
+            f.write("        elif isinstance(obj, functools.partial):\n")
+            f.write("            walk(obj.func)\n")
+            f.write("            walk(obj.args)\n")
+            f.write("            walk(obj.keywords or {})\n")
+            f.write("        elif isinstance(obj, types.FunctionType):\n")
+            f.write("            walk(obj.__code__)\n")
+            f.write("            walk(obj.__defaults__ or ())\n")
+            f.write("            for cell in obj.__closure__ or ():\n")
+            f.write("                try:\n")
+            f.write("                    walk(cell.cell_contents)\n")
+            f.write("                except ValueError:\n")
+            f.write("                    pass\n")
+            f.write("            for name in code_names(obj.__code__):\n")
+            f.write("                value = obj.__globals__.get(name)\n")
+            f.write("                if isinstance(value, types.FunctionType) and value.__module__ == obj.__module__:\n")
+            f.write("                    walk(value)\n\n")
+            f.write("    for mapping in mappings:\n")
+            f.write("        walk(mapping)\n")
+            f.write("    return found\n")
+            f.write("\n\n")
+            f.write("def projection_indexes(header, projection):\n")
+            f.write("    # Positions of the columns of the header referenced by the projection (see referenced_columns)\n")
+            f.write("    columns = referenced_columns(header, *projection)\n")
+            f.write("    return [i for i, column in enumerate(header) if column in columns]\n")
+            f.write("\n\n")
+            f.write("def project_line(line, indexes):\n")
+            f.write("    return [line[i] if i < len(line) else '' for i in indexes]\n")
+            f.write("\n\n")
+            f.write("def read_csv(filename, delimiter=';', encoding='utf-8-sig', projection=None):\n")
+            f.write("    # Return the header and the lines of a CSV file, compressed or not.\n")
+            f.write("    # With a projection (list of mappings and functions), only the columns they reference are kept.\n")
+            f.write("    with io.TextIOWrapper(open_data_file(filename, 'rb'), encoding=encoding, newline='') as f:\n")
+            f.write("        reader = csv.reader(f, delimiter=delimiter)\n")
+            f.write("        header = next(reader)\n")
+            f.write("        if projection is None:\n")
+            f.write("            data = [line for line in reader]\n")
+            f.write("        else:\n")
+            f.write("            indexes = projection_indexes(header, projection)\n")
+            f.write("            header = [header[i] for i in indexes]\n")
+            f.write("            data = [project_line(line, indexes) for line in reader]\n")
+            f.write("    return header, data\n")
+            f.write("\n\n")
+            f.write("def translation_file(filename, lang, field=None):\n")
+            f.write("    # Name of the translation file of a language and of a field:\n")
+            f.write("    # my.model.csv -> my.model.fr_FR.csv, or my.model.fr_FR.name.csv with the field name\n")
+            f.write("    plain = uncompressed_name(filename)\n")
+            f.write("    base, ext = os.path.splitext(plain)\n")
+            f.write("    suffix = '.'.join([lang] + ([field] if field else []))\n")
+            f.write("    return '%s.%s%s%s' % (base, suffix, ext, filename[len(plain):])\n")
+            f.write("\n\n")
+            f.write("def open_processor(filename, delimiter=';', preprocess=lambda header, data: (header, data), projection=None):\n")
+            f.write("    # Create the processor of a client file, compressed or not.\n")
+            f.write("    # With a projection (list of mappings and functions), only the columns they reference are read.\n")
+            f.write("    if uncompressed_name(filename) == filename and projection is None:\n")
+            f.write("        return Processor(filename, delimiter=delimiter, preprocess=preprocess)\n")
+            f.write("    header, data = read_csv(filename, delimiter=delimiter, projection=projection)\n")
+            f.write("    return new_processor(header, data, preprocess=preprocess)\n")
+            f.write("\n\n")
+            f.write("def new_processor(header, data, preprocess=lambda header, data: (header, data)):\n")
+            f.write("    # Create the processor of lines already read. Processor raises when there is no line,\n")
+            f.write("    # so it is created with a placeholder line and gets the actual lines afterwards.\n")
+            f.write("    processor = Processor(header=header or [''], data=data or [['']])\n")
+            f.write("    processor.header, processor.data = preprocess(header, data)\n")
+            f.write("    return processor\n")
+            f.write("\n\n")
+            f.write("def uncompress_data_file(filename):\n")
+            f.write("    # Write the uncompressed copy of a data file, used by the load scripts.\n")
+            f.write("    with open_data_file(filename, 'rb') as src, io.open(uncompressed_name(filename), 'wb') as dest:\n")
+            f.write("        shutil.copyfileobj(src, dest, 1024 * 1024)\n")
+            f.write("\n\n")
+            f.write("def write_import_files(processor, script, dests, python_exe='', path=''):\n")
+            f.write("    # Write the import files of a processor and their load script.\n")
+            f.write("    # The import files declared compressed in files.py (dests) are written compressed by streaming,\n")
+            f.write("    # without plain copy. As odoo_import_thread.py only reads plain files, the load script uncompresses\n")
+            f.write("    # each of them just before its import and removes the uncompressed copy after it,\n")
+            f.write("    # leaving the .fail files uncompressed.\n")
+            f.write("    compressed = [(uncompressed_name(d), d) for d in dests if uncompressed_name(d) != d and uncompressed_name(d) in processor.file_to_write]\n")
+            f.write("    for plain, filename in compressed:\n")
+            f.write("        info = processor.file_to_write[plain]\n")
+            f.write("        with io.TextIOWrapper(open_data_file(filename, 'wb'), encoding='utf-8', newline='') as f:\n")
+            f.write("            writer = csv.writer(f, delimiter=info.get('sep', ';'), quoting=csv.QUOTE_ALL)\n")
+            f.write("            writer.writerow(info['header'])\n")
+            f.write("            writer.writerows(info['data'])\n")
+            f.write("        # Only the header is written by the processor in the plain file, removed below\n")
+            f.write("        info['data'] = []\n")
+            f.write("    processor.write_to_file(script, python_exe=python_exe, path=path)\n")
+            f.write("    if not compressed:\n")
+            f.write("        return\n")
+            f.write("    with open(script, 'r') as f:\n")
+            f.write("        lines = f.readlines()\n")
+            f.write("    for plain, filename in compressed:\n")
+            f.write("        os.remove(plain)\n")
+            f.write("        used = [i for i, line in enumerate(lines) if imports_file(line, plain)] or [0, len(lines) - 1]\n")
+            f.write("        lines.insert(used[-1] + 1, 'python -c \"import os; os.remove(%s)\"\\n' % repr(plain))\n")
+            f.write("        lines.insert(used[0], 'python -c \"from funclib import uncompress_data_file; uncompress_data_file(%s)\"\\n' % repr(filename))\n")
+            f.write("    with open(script, 'w') as f:\n")
+            f.write("        f.writelines(lines)\n")
+            f.write("\n\n")
+            f.write("def column_index(header, column):\n")
+            f.write("    # Position of a column in a line given as a list of cells.\n")
+            f.write("    # A missing column points to the empty cell added at the end of the lines by transform_rows.\n")
+            f.write("    return header.index(column) if column in header else len(header)\n")
+            f.write("\n\n")
+            f.write("def clean_line(line, null_values=['NULL']):\n")
+            f.write("    line = [s.strip() if s.strip() not in null_values else '' for s in line]\n")
+            f.write("    line.append('')\n")
+            f.write("    return line\n")
+            f.write("\n\n")
+            f.write("def unique_records(header, rows):\n")
+            f.write("    # Remove the repeated records of the rows, keeping their order and the first occurrence of each record.\n")
+            f.write("    # A record is a line with an id followed by its lines without id (one2many lines).\n")
+            f.write("    index = header.index('id') if 'id' in header else None\n")
+            f.write("    result, seen, record = [], set(), []\n")
+            f.write("    for row in list(rows) + [None]:\n")
+            f.write("        if record and (row is None or index is None or row[index]):\n")
+            f.write("            key = tuple(tuple(r) for r in record)\n")
+            f.write("            if key not in seen:\n")
+            f.write("                seen.add(key)\n")
+            f.write("                result.extend(record)\n")
+            f.write("            record = []\n")
+            f.write("        if row is not None:\n")
+            f.write("            record.append(list(row))\n")
+            f.write("    return result\n\n\n")
+            f.write("def report_skipped(count, filename_out=None):\n")
+            f.write("    # Report the lines of the client file skipped by the mapping (SkippingException) on stderr,\n")
+            f.write("    # in the format of transform_sharded read by build.py.\n")
+            f.write("    if count:\n")
+            f.write("        sys.stderr.write('%s line(s) of the client file not transformed%s\\n' % (count, ' in %s' % filename_out if filename_out else ''))\n")
+            f.write("\n\n")
+            f.write("def process_ordered(processor, mapping, filename_out, import_args, required=None):\n")
+            f.write("    # Same as processor.process(mapping, filename_out, import_args, 'set') but keeping the order of the client\n")
+            f.write("    # file, so that the lines without id stay after their record and the first and last rows of a duplicate\n")
+            f.write("    # xml_id are the ones of the client file (see check_duplicates.py).\n")
+            f.write("    # With required (list of columns), only the rows having a value in one of these columns are kept.\n")
+            f.write("    # The lines skipped by the mapping are reported, so that build.py doesn't record the transformation.\n")
+            f.write("    header, rows = processor.process(mapping, filename_out, import_args, 'list', verbose=False)\n")
+            f.write("    report_skipped(len(processor.data) - len(rows), filename_out)\n")
+            f.write("    rows = unique_records(header, rows)\n")
+            f.write("    if required:\n")
+            f.write("        indexes = [header.index(c) for c in required if c in header]\n")
+            f.write("        rows = [row for row in rows if any(row[i] for i in indexes)]\n")
+            f.write("    processor._add_data(header, rows, filename_out, import_args)\n")
+            f.write("    return header, rows\n")
+            f.write("\n\n")
+            f.write("def transform_rows(data, transform_row, header):\n")
+            f.write("    # Apply a flat transformation (skeleton type 'row') to all lines of a client file.\n")
+            f.write("    # The repeated records are removed and the order of the client file is kept (see unique_records).\n")
+            f.write("    rows = []\n")
+            f.write("    for line in data:\n")
+            f.write("        try:\n")
+            f.write("            rows.append(transform_row(clean_line(line)))\n")
+            f.write("        except SkippingException:\n")
+            f.write("            continue\n")
+            f.write("    report_skipped(len(data) - len(rows))\n")
+            f.write("    return unique_records(header, rows)\n")
+            f.write("\n\n")
+            f.write("def check_transform_row(processor, mapping, header, transform_row, sample=1000):\n")
+            f.write("    # Raise an error if a flat transformation doesn't give the same result as the mapping dictionary.\n")
+            f.write("    for i, line in enumerate(processor.data[:sample]):\n")
+            f.write("        line = clean_line(line)\n")
+            f.write("        line_dict = dict(zip(processor.header, line))\n")
+            f.write("        try:\n")
+            f.write("            expected = tuple(mapping[column](line_dict) for column in header)\n")
+            f.write("        except SkippingException:\n")
+            f.write("            expected = None\n")
+            f.write("        try:\n")
+            f.write("            result = transform_row(line)\n")
+            f.write("        except SkippingException:\n")
+            f.write("            result = None\n")
+            f.write("        if result != expected:\n")
+            f.write("            diff = [column for column, a, b in zip(header, result or [], expected or []) if a != b]\n")
+            f.write("            raise ValueError('Line %s: flat transformation differs from the mapping on %s' % (i + 1, ', '.join(diff) or 'skipped line'))\n")
+            f.write("\n")
+            f.write("\n")
+            f.write("def split_columns(header, data, columns):\n")
+            f.write("    # Move some columns to a second file identified by the 'id' column.\n")
+            f.write("    # Return (header, data) without these columns and (header, data) of the lines having a value in them,\n")
+            f.write("    # or None if the columns are not in the header.\n")
+            f.write("    moved = [header.index(c) for c in columns if c in header]\n")
+            f.write("    if not moved:\n")
+            f.write("        return (header, data), None\n")
+            f.write("    kept = [i for i in range(len(header)) if i not in moved]\n")
+            f.write("    id_index = header.index('id')\n")
+            f.write("    data = [list(line) for line in data]\n")
+            f.write("    first = ([header[i] for i in kept], [[line[i] for i in kept] for line in data])\n")
+            f.write("    second = (['id'] + [header[i] for i in moved], [[line[id_index]] + [line[i] for i in moved] for line in data if any(line[i] for i in moved)])\n")
+            f.write("    return first, second\n")
+            f.write("\n\n")
+            f.write("def shard_offsets(filename, shards):\n")
+            f.write("    # Split a file in byte ranges starting on a line boundary, the header line excluded.\n")
+            f.write("    # Quoted values must not contain line breaks.\n")
+            f.write("    size = os.path.getsize(filename)\n")
+            f.write("    with open(filename, 'rb') as f:\n")
+            f.write("        f.readline()\n")
+            f.write("        offsets = [f.tell()]\n")
+            f.write("        for i in range(1, shards):\n")
+            f.write("            f.seek(max(offsets[-1], offsets[0] + (size - offsets[0]) * i // shards))\n")
+            f.write("            f.readline()\n")
+            f.write("            if f.tell() >= size:\n")
+            f.write("                break\n")
+            f.write("            offsets.append(f.tell())\n")
+            f.write("    offsets.append(size)\n")
+            f.write("    return [(offsets[i], offsets[i + 1]) for i in range(len(offsets) - 1) if offsets[i] < offsets[i + 1]]\n")
+            f.write("\n\n")
+            f.write("def transform_shard(args):\n")
+            f.write("    # Apply the mapping of a model script to one shard of its client file.\n")
+            f.write("    # Return the number of lines of the shard, the transformed lines, the failures as (position in the shard, error)\n")
+            f.write("    # and the number of lines skipped by the mapping.\n")
+            f.write("    module_name, mapping_name, preprocess_name, keys, indexes, filename, delimiter, encoding, start, end = args\n")
+            f.write("    module = importlib.import_module(module_name)\n")
+            f.write("    mapping = getattr(module, mapping_name)\n")
+            f.write("    preprocess = getattr(module, preprocess_name)\n")
+            f.write("    with open(filename, 'rb') as f:\n")
+            f.write("        header = next(csv.reader([f.readline().decode(encoding)], delimiter=delimiter))\n")
+            f.write("        f.seek(start)\n")
+            f.write("        text = f.read(end - start).decode(encoding.replace('-sig', ''))\n")
+            f.write("    data = [line for line in csv.reader(io.StringIO(text, newline=''), delimiter=delimiter)]\n")
+            f.write("    if indexes is not None:\n")
+            f.write("        header = [header[i] for i in indexes]\n")
+            f.write("        data = [project_line(line, indexes) for line in data]\n")
+            f.write("    count = len(data)\n")
+            f.write("    header, data = preprocess(header, data)\n")
+            f.write("    rows, failures, skipped = [], [], 0\n")
+            f.write("    for i, line in enumerate(data):\n")
+            f.write("        line_dict = dict(zip(header, clean_line(line)))\n")
+            f.write("        try:\n")
+            f.write("            rows.append(tuple(mapping[k](line_dict) for k in keys))\n")
+            f.write("        except SkippingException:\n")
+            f.write("            skipped += 1\n")
+            f.write("        except Exception as e:\n")
+            f.write("            failures.append((i, repr(e)))\n")
+            f.write("    return count, rows, failures, skipped\n")
+            f.write("\n\n")
+            f.write("def transform_sharded(filename, module_name, mapping_name, preprocess_name, delimiter=';', encoding='utf-8-sig', shards=1, projection=True):\n")
+            f.write("    # Transform a client file on a pool of processes and merge the shards in the original order.\n")
+            f.write("    # With projection, only the columns referenced by the mapping and the preprocess function are kept.\n")
+            f.write("    # The failures are reported with their line number in the client file.\n")
+            f.write("    # The preprocess function is applied to each shard: keep the lines in place to get exact line numbers.\n")
+            f.write("    if uncompressed_name(filename) != filename:\n")
+            f.write("        raise ValueError('Uncompress %s to transform it by shards' % filename)\n")
+            f.write("    mapping = getattr(sys.modules['__main__'], mapping_name)\n")
+            f.write("    keys = list(mapping.keys())\n")
+            f.write("    indexes = None\n")
+            f.write("    if projection:\n")
+            f.write("        with open(filename, 'rb') as f:\n")
+            f.write("            header = next(csv.reader([f.readline().decode(encoding)], delimiter=delimiter))\n")
+            f.write("        indexes = projection_indexes(header, [mapping, getattr(sys.modules['__main__'], preprocess_name)])\n")
+            f.write("    tasks = [(module_name, mapping_name, preprocess_name, keys, indexes, filename, delimiter, encoding, start, end) for start, end in shard_offsets(filename, shards)]\n")
+            f.write("    pool = multiprocessing.Pool(max(1, min(shards, len(tasks))))\n")
+            f.write("    data, failures, skipped = [], 0, 0\n")
+            f.write("    line_number = 2\n")
+            f.write("    try:\n")
+            f.write("        for count, rows, errors, skipped_lines in pool.imap(transform_shard, tasks):\n")
+            f.write("            data.extend(rows)\n")
+            f.write("            for i, error in errors:\n")
+            f.write("                sys.stderr.write('Line %s: %s\\n' % (line_number + i, error))\n")
+            f.write("            failures += len(errors)\n")
+            f.write("            skipped += skipped_lines\n")
+            f.write("            line_number += count\n")
+            f.write("    finally:\n")
+            f.write("        pool.close()\n")
+            f.write("        pool.join()\n")
+            f.write("    if failures or skipped:\n")
+            f.write("        sys.stderr.write('%s line(s) of %s not transformed (%s skipped)\\n' % (failures + skipped, filename, skipped))\n")
+            f.write("    return keys, unique_records(keys, data)\n")
+            f.write("\n")
+
+
+    @check_file_exists
+    def create_file_clean_data(self, file):
+        """
+        Create the skeleton of clean_data.py.
+        """
+        with open(file, 'w') as f:
+            f.write("# -*- coding: utf-8 -*-\n\n")
+            f.write("# This script remove the data created by the import.\n\n")
+            f.write("import odoolib\n")
+            f.write("from odoo_csv_tools.lib import conf_lib\n")
+            f.write("from prefix import *\n")
+            f.write("from files import *\n\n")
+            f.write("connection = conf_lib.get_server_connection(config_file)\n\n")
+            f.write("def delete_model_data(connection, model, demo = False):\n")
+            f.write("    model_model = connection.get_model(model)\n")
+            f.write("    record_ids = model_model.search([])\n")
+            f.write("    if demo:\n")
+            f.write("        print 'Will remove %s records from %s' % (len(record_ids), model)\n")
+            f.write("    else:\n")
+            f.write("        print 'Remove %s records from %s' % (len(record_ids), model)\n")
+            f.write("        model_model.unlink(record_ids)\n")
+            f.write("\n\n")
+            f.write("def delete_xml_id(connection, model, module, demo = False):\n")
+            f.write("    data_model = connection.get_model('ir.model.data')\n")
+            f.write("    data_ids = data_model.search([('module', '=', module), ('model', '=', model)])\n")
+            f.write("    records = data_model.read(data_ids, ['res_id'])\n")
+            f.write("    record_ids = []\n")
+            f.write("    for rec in records:\n")
+            f.write("        record_ids.append(rec['res_id'])\n")
+            f.write("    if demo:\n")
+            f.write("        print 'Will remove %s xml_id %s from %s' % (len(record_ids), module, model)\n")
+            f.write("    else:\n")
+            f.write("        print 'Remove %s xml_id %s from %s' % (len(record_ids), module, model)\n")
+            f.write("        connection.get_model(model).unlink(record_ids)\n")
+            f.write("\n\n")
+            f.write("demo = True\n\n")
+
+
+    @check_file_exists
+    def create_file_install_lang(self, file):
+        """
+        Create the skeleton of install_lang.py.
+        """
+        with open(file, 'w') as f:
+            f.write("# -*- coding: utf-8 -*-\n\n")
+            f.write("import odoolib\n")
+            f.write("from prefix import *\n")
+            f.write("from files import *\n")
+            f.write("from odoo_csv_tools.lib import conf_lib\n\n")
+            f.write("connection = conf_lib.get_server_connection(config_file)\n\n")
+            f.write("model_lang = connection.get_model('base.language.install')\n\n")
+            f.write("for key in res_lang_map.keys():\n")
+            f.write("    lang = res_lang_map[key]\n")
+            f.write("    res = model_lang.create({'lang': lang})\n")
+            f.write("    model_lang.lang_install(res)\n")
+
+
+    @check_file_exists
+    def create_file_install_modules(self, file):
+        """
+        Create the skeleton of install_modules.py.
+        """
+        with open(file, 'w') as f:
+            f.write("# -*- coding: utf-8 -*-\n\n")
+            f.write("import sys\n")
+            f.write("import time\n")
+            f.write("import odoolib\n")
+            f.write("from prefix import *\n")
+            f.write("from files import *\n")
+            f.write("from odoo_csv_tools.lib import conf_lib\n")
+            f.write("from files import config_file\n\n")
+            f.write("connection = conf_lib.get_server_connection(config_file)\n\n")
+            f.write("model_module = connection.get_model('ir.module.module')\n")
+            f.write("start = time.time()\n")
+            f.write("model_module.update_list()\n")
+            f.write("print('Update module list: %.1fs' % (time.time() - start))\n\n")
+            f.write("# Set the modules to install\n")
+            f.write("module_names = []\n\n")
+            f.write("modules = model_module.search_read([['name', 'in', module_names]], ['name', 'state'])\n")
+            f.write("missing = set(module_names) - set(m['name'] for m in modules)\n")
+            f.write("if missing:\n")
+            f.write("    sys.stderr.write('Modules not found: %s\\n' % ', '.join(sorted(missing)))\n\n")
+            f.write("# All modules are marked at once and processed by a single call,\n")
+            f.write("# so that the registry is reloaded once per phase instead of once per module.\n")
+            f.write("to_install = [m['id'] for m in modules if m['state'] != 'installed']\n")
+            f.write("to_upgrade = [m['id'] for m in modules if m['state'] == 'installed']\n\n")
+            f.write("if to_install:\n")
+            f.write("    start = time.time()\n")
+            f.write("    model_module.button_immediate_install(to_install)\n")
+            f.write("    print('Install %s module(s): %.1fs' % (len(to_install), time.time() - start))\n")
+            f.write("if to_upgrade:\n")
+            f.write("    start = time.time()\n")
+            f.write("    model_module.button_immediate_upgrade(to_upgrade)\n")
+            f.write("    print('Upgrade %s module(s): %.1fs' % (len(to_upgrade), time.time() - start))\n")
+
+
+    @check_file_exists
+    def create_file_uninstall_modules(self, file):
+        """
+        Create the skeleton of uninstall_modules.py.
+        """
+        with open(file, 'w') as f:
+            f.write("# -*- coding: utf-8 -*-\n\n")
+            f.write("import sys\n")
+            f.write("import time\n")
+            f.write("import odoolib\n")
+            f.write("from prefix import *\n")
+            f.write("from files import *\n")
+            f.write("from odoo_csv_tools.lib import conf_lib\n")
+            f.write("from files import config_file\n\n")
+            f.write("connection = conf_lib.get_server_connection(config_file)\n\n")
+            f.write("model_module = connection.get_model('ir.module.module')\n")
+            f.write("start = time.time()\n")
+            f.write("model_module.update_list()\n")
+            f.write("print('Update module list: %.1fs' % (time.time() - start))\n\n")
+            f.write("# Set the modules to uninstall\n")
+            f.write("module_names = []\n\n")
+            f.write("modules = model_module.search_read([['name', 'in', module_names]], ['name', 'state'])\n")
+            f.write("missing = set(module_names) - set(m['name'] for m in modules)\n")
+            f.write("if missing:\n")
+            f.write("    sys.stderr.write('Modules not found: %s\\n' % ', '.join(sorted(missing)))\n\n")
+            f.write("# All modules are uninstalled by a single call, so that the registry is reloaded once.\n")
+            f.write("to_uninstall = [m['id'] for m in modules if m['state'] == 'installed']\n\n")
+            f.write("if to_uninstall:\n")
+            f.write("    start = time.time()\n")
+            f.write("    model_module.button_immediate_uninstall(to_uninstall)\n")
+            f.write("    print('Uninstall %s module(s): %.1fs' % (len(to_uninstall), time.time() - start))\n")
+
+
+    @check_file_exists
+    def create_file_init_map(self, file):
+        """
+        Create the skeleton of init_map.py.
+        """
+        with open(file, 'w') as f:
+            f.write("# -*- coding: utf-8 -*-\n\n")
+            f.write("import odoolib\n")
+            f.write("from prefix import *\n")
+            f.write("from files import *\n")
+            f.write("from odoo_csv_tools.lib import conf_lib\n")
+            f.write("import json\n")
+            f.write("import io\n\n")
+            f.write("connection = conf_lib.get_server_connection(config_file)\n\n")
+            f.write("def build_map_product_category_id(filename=''):\n")
+            f.write("    # Build a dictionary {product_category : xml_id} of all existing product_category.\n")
+            f.write("    model_data = connection.get_model('ir.model.data')\n")
+            f.write("    model_product_category = connection.get_model('product.category')\n")
+            f.write("    recs = model_product_category.search_read([], ['id', 'name'])\n\n")
+            f.write("    res_map = {}\n")
+            f.write("    for rec in recs:\n")
+            f.write("        data = model_data.search_read([('res_id', '=', rec['id']), ('model', '=', 'product.category')], ['module', 'name'])\n")
+            f.write("        if len(data):\n")
+            f.write("            key = rec['name'].strip()\n")
+            f.write("            val = '.'.join([data[0]['module'], data[0]['name'] ])\n")
+            f.write("            res_map[key] = val.strip()\n")
+            f.write("        # else:\n")
+            f.write("        #     print 'Product category %s has no XML_ID (id: %s)' % (rec['name'], rec['id'])\n\n")
+            f.write("    if filename:\n")
+            f.write("        with open(filename, 'w') as fp:\n")
+            f.write("            json.dump(res_map, fp)\n\n")
+            f.write("    return res_map\n\n")
+            f.write("# Execute mapping\n")
+            f.write("# dummy = build_map_product_category_id(work_map_product_category_id)\n\n")
+            f.write("# Add in files.py\n")
+            f.write("# work_map_product_category_id = os.path.join(data_src_dir, 'work_map_product_category_id.json')\n\n")
+            f.write("# Add in transformation script\n")
+            f.write("# map_product_category_id = {}\n")
+            f.write("# with io.open(work_map_product_category_id, 'r') as fp:\n")
+            f.write("#     map_product_category_id = json.load(fp, encoding='utf-8')\n\n")
+            f.write("# Add in transformation script to map 'id' column. REVIEW COLUNM NAME and PREFIX\n")
+            f.write("# def handle_product_category_id(line):\n")
+            f.write("#     categ_name = line['Product Category']\n")
+            f.write("#     try:\n")
+            f.write("#         categ_xml_id = map_product_category_id[categ_name]\n")
+            f.write("#     except:\n")
+            f.write("#         categ_xml_id = mapper.m2o(PREFIX_PRODUCT_CATEGORY, 'Product Category')(line)\n")
+            f.write("#     return categ_xml_id\n\n")
+            f.write("##################################################################################################\n\n")
+            f.write("def build_account_map(company_id, filename=''):\n")
+            f.write("    # Build a dictionary {account_code : xml_id} of all existing accounts of a company.\n")
+            f.write("    model_data = connection.get_model('ir.model.data')\n")
+            f.write("    model_account = connection.get_model('account.account')\n")
+            f.write("    recs = model_account.search_read([('company_id', '=', company_id)], ['id', 'code'])\n\n")
+            f.write("    res_map = {}\n")
+            f.write("    for rec in recs:\n")
+            f.write("        data = model_data.search_read([('res_id', '=', rec['id']), ('model', '=', 'account.account')], ['module', 'name'])\n")
+            f.write("        if len(data):\n")
+            f.write("            key = rec['code'].strip()\n")
+            f.write("            val = '.'.join([data[0]['module'], data[0]['name'] ])\n")
+            f.write("            res_map[key] = val.strip()\n")
+            f.write("        # else:\n")
+            f.write("        #     print 'Account %s has no XML_ID' % rec['code']\n\n")
+            f.write("    if filename:\n")
+            f.write("        with open(filename, 'w') as fp:\n")
+            f.write("            json.dump(res_map, fp)\n\n")
+            f.write("    return res_map\n\n")
+            f.write("# Execute mapping\n")
+            f.write("# dummy = build_account_map(1, work_map_account_code_id)\n\n")
+            f.write("# Add in files.py\n")
+            f.write("# work_map_account_code_id = os.path.join(data_src_dir, 'work_map_account_code_id.json')\n\n")
+            f.write("# Add in transformation script\n")
+            f.write("# map_account_code_id = {}\n")
+            f.write("# with io.open(work_map_account_code_id, 'r') as fp:\n")
+            f.write("#     map_account_code_id = json.load(fp, encoding='utf-8')\n\n")
+            f.write("# Add in transformation script to map 'id' column. REVIEW COLUNM NAME and PREFIX\n")
+            f.write("# def handle_account_account_id_map(line):\n")
+            f.write("#     code = line['Accounts']\n")
+            f.write("#     try:\n")
+            f.write("#         val = map_account_code_id[code]\n")
+            f.write("#     except:\n")
+            f.write("#         val = mapper.m2o(PREFIX_ACCOUNT_ACCOUNT, 'Accounts')(line)\n")
+            f.write("#     return val\n\n")
+            f.write("##################################################################################################\n\n")
+
+
+    @check_file_exists
+    def create_file_pre_load(self, file):
+        """
+        Create the skeleton of pre_load.py.
+        """
+        with open(file, 'w') as f:
+            f.write("# -*- coding: utf-8 -*-\n\n")
+            f.write("# This script disables the server features slowing down the load.\n")
+            f.write("# Their state is saved in a file and restored by post_load.py.\n\n")
+            f.write("import os\n")
+            f.write("import json\n")
+            f.write("import odoolib\n")
+            f.write("from prefix import *\n")
+            f.write("from files import *\n")
+            f.write("from funclib import uncompressed_name\n")
+            f.write("from odoo_csv_tools.lib import conf_lib\n\n")
+            f.write("connection = conf_lib.get_server_connection(config_file)\n\n")
+            f.write("state_file = os.path.join(conf_dir, 'load_state.json')\n\n")
+            f.write("# The models of the project: the import files of files.py (dest_*) are named after them\n")
+            f.write("project_models = sorted(set(os.path.splitext(os.path.basename(uncompressed_name(filename)))[0]\n")
+            f.write("                            for name, filename in list(globals().items()) if name.startswith('dest_') and not name.endswith('_hierarchy')))\n\n")
+            f.write("# Keep the state of a previous run not restored yet\n")
+            f.write("state = {'deactivated': {}, 'last_mail_id': 0}\n")
+            f.write("if os.path.isfile(state_file):\n")
+            f.write("    with open(state_file, 'r') as fp:\n")
+            f.write("        state = json.load(fp)\n\n\n")
+            f.write("def model_exists(model):\n")
+            f.write("    return connection.get_model('ir.model').search_count([('model', '=', model)]) > 0\n\n\n")
+            f.write("def xml_id_ids(model, xml_ids):\n")
+            f.write("    ids = []\n")
+            f.write("    for xml_id in xml_ids:\n")
+            f.write("        module, name = xml_id.split('.', 1)\n")
+            f.write("        ids += [d['res_id'] for d in connection.get_model('ir.model.data').search_read([('model', '=', model), ('module', '=', module), ('name', '=', name)], ['res_id'])]\n")
+            f.write("    return ids\n\n\n")
+            f.write("def deactivate(model, domain):\n")
+            f.write("    model_model = connection.get_model(model)\n")
+            f.write("    record_ids = model_model.search([('active', '=', True)] + domain)\n")
+            f.write("    if record_ids:\n")
+            f.write("        model_model.write(record_ids, {'active': False})\n")
+            f.write("    state['deactivated'][model] = sorted(set(state['deactivated'].get(model, []) + record_ids))\n")
+            f.write("    print('Deactivate %s records of %s' % (len(record_ids), model))\n\n\n")
+            f.write("# Scheduled actions on the models of the project and the mail queue, not all the crons of the database:\n")
+            f.write("# they stay disabled until post_load.py runs.\n")
+            f.write("mail_cron_ids = xml_id_ids('ir.cron', ['mail.ir_cron_mail_scheduler_action'])\n")
+            f.write("deactivate('ir.cron', ['|', ('model_id.model', 'in', project_models), ('id', 'in', mail_cron_ids)])\n\n")
+            f.write("# Automated actions triggered by each created or updated record of the models of the project\n")
+            f.write("if model_exists('base.automation'):\n")
+            f.write("    deactivate('base.automation', [('model_id.model', 'in', project_models)])\n\n")
+            f.write("# Mails queued from now are not sent because the mail queue cron is disabled.\n")
+            f.write("# post_load.py can cancel them.\n")
+            f.write("if model_exists('mail.mail') and not state['last_mail_id']:\n")
+            f.write("    last_mail = connection.get_model('mail.mail').search([], order='id desc', limit=1)\n")
+            f.write("    state['last_mail_id'] = last_mail[0] if last_mail else 0\n\n")
+            f.write("with open(state_file, 'w') as fp:\n")
+            f.write("    json.dump(state, fp)\n")
+
+
+    @check_file_exists
+    def create_file_post_load(self, file):
+        """
+        Create the skeleton of post_load.py.
+        """
+        with open(file, 'w') as f:
+            f.write("# -*- coding: utf-8 -*-\n\n")
+            f.write("# This script restores the server features disabled by pre_load.py.\n\n")
+            f.write("import os\n")
+            f.write("import json\n")
+            f.write("import odoolib\n")
+            f.write("from prefix import *\n")
+            f.write("from files import *\n")
+            f.write("from odoo_csv_tools.lib import conf_lib\n\n")
+            f.write("connection = conf_lib.get_server_connection(config_file)\n\n")
+            f.write("state_file = os.path.join(conf_dir, 'load_state.json')\n\n")
+            f.write("# Set to False to send the mails queued during the load\n")
+            f.write("cancel_load_mails = True\n\n")
+            f.write("if not os.path.isfile(state_file):\n")
+            f.write("    print('Nothing to restore')\n")
+            f.write("    raise SystemExit(0)\n\n")
+            f.write("with open(state_file, 'r') as fp:\n")
+            f.write("    state = json.load(fp)\n\n")
+            f.write("if cancel_load_mails and state['last_mail_id']:\n")
+            f.write("    model_mail = connection.get_model('mail.mail')\n")
+            f.write("    mail_ids = model_mail.search([('id', '>', state['last_mail_id']), ('state', '=', 'outgoing')])\n")
+            f.write("    if mail_ids:\n")
+            f.write("        model_mail.write(mail_ids, {'state': 'cancel'})\n")
+            f.write("    print('Cancel %s mails queued during the load' % len(mail_ids))\n\n")
+            f.write("for model, record_ids in state['deactivated'].items():\n")
+            f.write("    if record_ids:\n")
+            f.write("        connection.get_model(model).write(record_ids, {'active': True})\n")
+            f.write("    print('Reactivate %s records of %s' % (len(record_ids), model))\n\n")
+            f.write("os.remove(state_file)\n")
+
+
+    @check_file_exists
+    def create_file_recompute(self, file):
+        """
+        Create the skeleton of recompute.py.
+        """
+        with open(file, 'w') as f:
+            f.write("# -*- coding: utf-8 -*-\n\n")
+            f.write("# This script computes the stored fields whose computation was deferred during the load\n")
+            f.write("# (context key 'defer_fields_computation'). The records are processed by chunks of ids\n")
+            f.write("# on a pool of workers. The finished chunks are saved so that an interrupted run can be resumed.\n\n")
+            f.write("import os\n")
+            f.write("import re\n")
+            f.write("import sys\n")
+            f.write("import json\n")
+            f.write("import time\n")
+            f.write("import threading\n")
+            f.write("from multiprocessing.pool import ThreadPool\n")
+            f.write("import odoolib\n")
+            f.write("from prefix import *\n")
+            f.write("from files import *\n")
+            f.write("from odoo_csv_tools.lib import conf_lib\n\n")
+            f.write("connection = conf_lib.get_server_connection(config_file)\n\n")
+            f.write("CHUNK_SIZE = 1000\n")
+            f.write("MAX_WORKER = 4\n\n")
+            f.write("state_file = os.path.join(conf_dir, 'recompute_state.json')\n")
+            f.write("lock = threading.Lock()\n\n")
+            f.write("# Code of the server action recomputing fields on the records of a domain, by version of the server:\n")
+            f.write("# the fields are marked to compute with _recompute_todo before Odoo 13, add_to_compute since,\n")
+            f.write("# and computed by recompute() before Odoo 16, flush_recordset() since.\n")
+            f.write("action_code = \"\"\"\n")
+            f.write("records = model.search(env.context['recompute_domain'])\n")
+            f.write("for fname in env.context['recompute_fields']:\n")
+            f.write("    %s(model._fields[fname]%s)\n")
+            f.write("%s\n")
+            f.write("\"\"\"\n\n\n")
+            f.write("def server_version():\n")
+            f.write("    # Major version of the server, from the version of the module base (ex: 16.0.1.3)\n")
+            f.write("    base = connection.get_model('ir.module.module').search_read([('name', '=', 'base')], ['latest_version'])\n")
+            f.write("    return int(re.search(r'\\d+', base[0]['latest_version']).group())\n\n\n")
+            f.write("def version_action_code(version):\n")
+            f.write("    if version < 13:\n")
+            f.write("        return action_code % ('records._recompute_todo', '', 'records.recompute()')\n")
+            f.write("    if version < 16:\n")
+            f.write("        return action_code % ('env.add_to_compute', ', records', 'records.recompute()')\n")
+            f.write("    return action_code % ('env.add_to_compute', ', records', 'records.flush_recordset()')\n\n\n")
+            f.write("# Models to recompute in the load order: [(model, {field: depends})]\n")
+            f.write("models = []\n\n\n")
+            f.write("def register(model, fields):\n")
+            f.write("    models.append((model, fields))\n\n\n")
+            f.write("def field_levels(fields):\n")
+            f.write("    # Group the fields by level: a field is computed after the fields of the same model it depends on.\n")
+            f.write("    deps = {}\n")
+            f.write("    for fname, depends in fields.items():\n")
+            f.write("        paths = [d.strip().split('.')[0] for d in (depends or '').split(',')]\n")
+            f.write("        deps[fname] = set(d for d in paths if d in fields and d != fname)\n")
+            f.write("    levels, done = [], set()\n")
+            f.write("    while len(done) < len(fields):\n")
+            f.write("        level = sorted(f for f in fields if f not in done and deps[f] <= done)\n")
+            f.write("        if not level:\n")
+            f.write("            # Circular dependencies: compute the remaining fields together\n")
+            f.write("            level = sorted(f for f in fields if f not in done)\n")
+            f.write("        levels.append(level)\n")
+            f.write("        done.update(level)\n")
+            f.write("    return levels\n\n\n")
+            f.write("def id_chunks(model):\n")
+            f.write("    # Split the id range of a model in chunks of CHUNK_SIZE ids.\n")
+            f.write("    model_model = connection.get_model(model)\n")
+            f.write("    ctx = {'active_test': False}\n")
+            f.write("    first = model_model.search([], order='id asc', limit=1, context=ctx)\n")
+            f.write("    last = model_model.search([], order='id desc', limit=1, context=ctx)\n")
+            f.write("    if not first:\n")
+            f.write("        return []\n")
+            f.write("    return [(lo, lo + CHUNK_SIZE) for lo in range(first[0], last[0] + 1, CHUNK_SIZE)]\n\n\n")
+            f.write("def get_action(model, code):\n")
+            f.write("    model_action = connection.get_model('ir.actions.server')\n")
+            f.write("    model_id = connection.get_model('ir.model').search([('model', '=', model)])[0]\n")
+            f.write("    name = 'Import: recompute %s' % model\n")
+            f.write("    action_ids = model_action.search([('name', '=', name)])\n")
+            f.write("    if action_ids:\n")
+            f.write("        model_action.write(action_ids, {'code': code})\n")
+            f.write("        return action_ids[0]\n")
+            f.write("    return model_action.create({'name': name, 'model_id': model_id, 'state': 'code', 'code': code})\n\n\n")
+            f.write("def save_state(done):\n")
+            f.write("    with open(state_file, 'w') as fp:\n")
+            f.write("        json.dump(sorted(done), fp)\n\n\n")
+            f.write("def recompute_all():\n")
+            f.write("    done = set()\n")
+            f.write("    if os.path.isfile(state_file):\n")
+            f.write("        with open(state_file, 'r') as fp:\n")
+            f.write("            done = set(json.load(fp))\n")
+            f.write("        print('Resume from %s: %s chunks already done' % (state_file, len(done)))\n\n")
+            f.write("    model_action = connection.get_model('ir.actions.server')\n")
+            f.write("    code = version_action_code(server_version())\n")
+            f.write("    pool = ThreadPool(MAX_WORKER)\n")
+            f.write("    failed = 0\n")
+            f.write("    for model, fields in models:\n")
+            f.write("        chunks = id_chunks(model)\n")
+            f.write("        action_id = get_action(model, code)\n")
+            f.write("        for level in field_levels(fields):\n")
+            f.write("            key = '%s|%s|%%s' % (model, ','.join(level))\n")
+            f.write("            tasks = [(lo, hi) for lo, hi in chunks if key % lo not in done]\n")
+            f.write("            count = len(chunks) - len(tasks)\n")
+            f.write("            start = time.time()\n\n")
+            f.write("            def run(chunk):\n")
+            f.write("                ctx = {'active_test': False, 'recompute_fields': level, 'recompute_domain': [('id', '>=', chunk[0]), ('id', '<', chunk[1])]}\n")
+            f.write("                try:\n")
+            f.write("                    model_action.run([action_id], context=ctx)\n")
+            f.write("                except Exception as e:\n")
+            f.write("                    return chunk, e\n")
+            f.write("                return chunk, None\n\n")
+            f.write("            for (lo, hi), error in pool.imap_unordered(run, tasks):\n")
+            f.write("                if error:\n")
+            f.write("                    failed += 1\n")
+            f.write("                    sys.stderr.write('%s ids %s-%s: %s\\n' % (model, lo, hi - 1, error))\n")
+            f.write("                    continue\n")
+            f.write("                done.add(key % lo)\n")
+            f.write("                save_state(done)\n")
+            f.write("                count += 1\n")
+            f.write("                sys.stdout.write('\\r%s [%s] %s/%s chunks (%.0fs)' % (model, ', '.join(level), count, len(chunks), time.time() - start))\n")
+            f.write("                sys.stdout.flush()\n")
+            f.write("            sys.stdout.write('\\n')\n")
+            f.write("        model_action.unlink([action_id])\n")
+            f.write("    pool.close()\n")
+            f.write("    pool.join()\n")
+            f.write("    if failed:\n")
+            f.write("        print('%s chunks failed. Run this script again to retry them.' % failed)\n")
+            f.write("    elif os.path.isfile(state_file):\n")
+            f.write("        os.remove(state_file)\n\n\n")
+            f.write("# Add here the models to recompute (odoo_import_scaffold -a adds them).\n")
+            f.write("# register('my.model', {'field': 'depends'})\n")
+            f.write("recompute_all()\n")
+
+
+    @check_file_exists
+    def create_file_loadlib(self, file):
+        """
+        Create loadlib.py, the wrapper of odoo_import_thread.py used with the option --with-loadlib.
+        """
+        with open(file, 'w') as f:
+            f.write("# -*- coding: utf-8 -*-\n\n")
+            f.write("# This script runs odoo_import_thread.py with the method 'load' of the models instrumented.\n")
+            f.write("# Usage: python loadlib.py odoo_import_thread.py [odoo_import_thread.py arguments]\n")
+            f.write("# The batches are cut by serialized size (DEFAULT_BATCH_BYTES and BATCH_BYTES in prefix.py): odoo_import_thread.py\n")
+            f.write("# reads batches of DEFAULT_BATCH_MAX_ROWS rows, which are split in parts of at most DEFAULT_BATCH_BYTES bytes.\n")
+            f.write("# Each part is committed on its own: only the rows of the failed parts are written in the fail file.\n")
+            f.write("# The number of concurrent batches adapts to the server: it starts at DEFAULT_WORKER (--worker), increases by one\n")
+            f.write("# after a round of successful batches up to DEFAULT_MAX_WORKER (prefix.py) and is halved when the server is saturated.\n")
+            f.write("# The batches rejected because of the saturation are retried after a random (jittered) delay.\n")
+            f.write("# Each batch sent to the server appends a JSON line to log/metrics_<model>.jsonl\n")
+            f.write("# with its rows, bytes, duration, failures, retries and concurrency. Run load_report.py to summarize them.\n\n")
+            f.write("import sys\n")
+            f.write("import os\n")
+            f.write("import json\n")
+            f.write("import time\n")
+            f.write("import errno\n")
+            f.write("import runpy\n")
+            f.write("import random\n")
+            f.write("import socket\n")
+            f.write("import threading\n")
+            f.write("from odoolib import main as odoolib_main\n")
+            f.write("from odoo_csv_tools import import_threaded\n")
+            f.write("import prefix\n\n")
+            f.write("LOG_DIR = 'log'\n")
+            f.write("# Retries of a batch rejected by a saturated server, after a random delay of at most\n")
+            f.write("# BACKOFF_DELAY * 2 ^ retry seconds (BACKOFF_MAX_DELAY at most)\n")
+            f.write("MAX_RETRIES = 5\n")
+            f.write("BACKOFF_DELAY = 1.0\n")
+            f.write("BACKOFF_MAX_DELAY = 60.0\n")
+            f.write("# Errors of a saturated server: HTTP status codes of overloaded proxies, exceptions of PostgreSQL for\n")
+            f.write("# concurrent transactions in the faults of the server and their messages returned by the load\n")
+            f.write("SATURATION_STATUS = (429, 502, 503, 504)\n")
+            f.write("SATURATION_EXCEPTIONS = ('TransactionRollbackError', 'SerializationFailure', 'DeadlockDetected')\n")
+            f.write("SATURATION_MESSAGES = ('could not serialize access', 'deadlock detected')\n")
+            f.write("# Timeouts and connections dropped by the server (by errno on Python 2)\n")
+            f.write("try:\n")
+            f.write("    TRANSPORT_ERRORS = (socket.timeout, ConnectionResetError, BrokenPipeError)\n")
+            f.write("except NameError:\n")
+            f.write("    TRANSPORT_ERRORS = (socket.timeout,)\n")
+            f.write("TRANSPORT_ERRNOS = (errno.ECONNRESET, errno.EPIPE)\n\n\n")
+            f.write("def find_script(name):\n")
+            f.write("    # Locate a script installed with odoo_csv_tools\n")
+            f.write("    if os.path.isfile(name):\n")
+            f.write("        return name\n")
+            f.write("    for path in os.environ.get('PATH', '').split(os.pathsep):\n")
+            f.write("        script = os.path.join(path, name)\n")
+            f.write("        if os.path.isfile(script):\n")
+            f.write("            return script\n")
+            f.write("    sys.stderr.write('%s not found in the PATH\\n' % name)\n")
+            f.write("    sys.exit(1)\n\n\n")
+            f.write("def get_option(argv, name, default=''):\n")
+            f.write("    for arg in argv:\n")
+            f.write("        if arg.startswith('%s=' % name):\n")
+            f.write("            return arg.split('=', 1)[1]\n")
+            f.write("    return default\n\n\n")
+            f.write("def set_option(argv, name, value):\n")
+            f.write("    return ['%s=%s' % (name, value) if arg.startswith('%s=' % name) else arg for arg in argv]\n\n\n")
+            f.write("def load_error(result):\n")
+            f.write("    # The load of a batch is all or nothing: return the first error message, if any\n")
+            f.write("    for message in result.get('messages', []):\n")
+            f.write("        if message.get('type') == 'error':\n")
+            f.write("            return message.get('message', 'error')\n")
+            f.write("    return None if result.get('ids') is not False else 'no record loaded'\n\n\n")
+            f.write("def saturated_exception(exception):\n")
+            f.write("    # Timeouts and connections dropped by the server, HTTP status codes and concurrent transactions.\n")
+            f.write("    # The other errors (connection refused, unknown host, ...) fail at once.\n")
+            f.write("    if isinstance(exception, TRANSPORT_ERRORS) or getattr(exception, 'errno', None) in TRANSPORT_ERRNOS:\n")
+            f.write("        return True\n")
+            f.write("    response = getattr(exception, 'response', None)\n")
+            f.write("    status = getattr(exception, 'errcode', None) or getattr(exception, 'code', None) or getattr(response, 'status_code', None)\n")
+            f.write("    if status in SATURATION_STATUS:\n")
+            f.write("        return True\n")
+            f.write("    return any(e in str(getattr(exception, 'faultString', exception)) for e in SATURATION_EXCEPTIONS)\n\n\n")
+            f.write("def saturated_result(result):\n")
+            f.write("    # Only the errors of PostgreSQL, never the validation messages, which contain the values of the records\n")
+            f.write("    return any(message.get('type') == 'error' and message.get('message', '').startswith(SATURATION_MESSAGES)\n")
+            f.write("               for message in result.get('messages', []))\n\n\n")
+            f.write("class ConcurrencyLimiter(object):\n")
+            f.write("    \"\"\"\n")
+            f.write("    Limit the number of concurrent batches: additive increase, multiplicative decrease.\n")
+            f.write("    \"\"\"\n")
+            f.write("    def __init__(self, initial, maximum):\n")
+            f.write("        self.maximum = max(1, initial, maximum)\n")
+            f.write("        self.limit = float(max(1, initial))\n")
+            f.write("        self.active = 0\n")
+            f.write("        self.condition = threading.Condition()\n\n")
+            f.write("    def acquire(self):\n")
+            f.write("        with self.condition:\n")
+            f.write("            while self.active >= int(self.limit):\n")
+            f.write("                self.condition.wait()\n")
+            f.write("            self.active += 1\n")
+            f.write("            return int(self.limit)\n\n")
+            f.write("    def release(self, saturated):\n")
+            f.write("        with self.condition:\n")
+            f.write("            self.active -= 1\n")
+            f.write("            before = int(self.limit)\n")
+            f.write("            if saturated:\n")
+            f.write("                self.limit = max(1.0, self.limit / 2)\n")
+            f.write("            else:\n")
+            f.write("                # One more worker after as many successful batches as the current limit\n")
+            f.write("                self.limit = min(float(self.maximum), self.limit + 1.0 / self.limit)\n")
+            f.write("            if int(self.limit) != before:\n")
+            f.write("                sys.stdout.write('Concurrency %s -> %s%s\\n' % (before, int(self.limit), ' (server saturated)' if saturated else ''))\n")
+            f.write("                sys.stdout.flush()\n")
+            f.write("            self.condition.notify_all()\n\n\n")
+            f.write("class Loader(object):\n")
+            f.write("    \"\"\"\n")
+            f.write("    Send the batches of odoo_import_thread.py to the server and record their metrics.\n")
+            f.write("    \"\"\"\n")
+            f.write("    def __init__(self, argv):\n")
+            f.write("        self.model = get_option(argv, '--model')\n")
+            f.write("        self.file = get_option(argv, '--file')\n")
+            f.write("        self.phase = 'fail' if '--fail' in argv else 'load'\n")
+            f.write("        self.metrics_file = os.path.join(LOG_DIR, 'metrics_%s.jsonl' % self.model)\n")
+            f.write("        self.lock = threading.Lock()\n")
+            f.write("        # The fail pass keeps its workers, the load adapts up to DEFAULT_MAX_WORKER\n")
+            f.write("        workers = int(get_option(argv, '--worker', '1') or 1)\n")
+            f.write("        maximum = getattr(prefix, 'DEFAULT_MAX_WORKER', workers) if self.phase == 'load' else workers\n")
+            f.write("        self.limiter = ConcurrencyLimiter(workers, maximum)\n")
+            f.write("        # The rows of the batches partly loaded, by batch: {id(batch): (batch, ids of the loaded rows)}\n")
+            f.write("        self.loaded = {}\n")
+            f.write("        defaults = (getattr(prefix, 'DEFAULT_BATCH_BYTES', 0), getattr(prefix, 'DEFAULT_BATCH_MIN_ROWS', 1),\n")
+            f.write("                    getattr(prefix, 'DEFAULT_BATCH_MAX_ROWS', 0))\n")
+            f.write("        limits = tuple(getattr(prefix, 'BATCH_BYTES', {}).get(self.model, ()))\n")
+            f.write("        self.max_bytes, self.min_rows, self.max_rows = limits + defaults[len(limits):]\n\n")
+            f.write("    def arguments(self, argv):\n")
+            f.write("        # Start enough threads in odoo_import_thread.py to reach the maximum concurrency\n")
+            f.write("        # and let it read batches of max_rows rows, split by size afterwards\n")
+            f.write("        argv = set_option(argv, '--worker', self.limiter.maximum)\n")
+            f.write("        if self.phase == 'load' and self.max_bytes and self.max_rows:\n")
+            f.write("            argv = set_option(argv, '--size', self.max_rows)\n")
+            f.write("        return argv\n\n")
+            f.write("    def split(self, fields, data):\n")
+            f.write("        # Cut a batch in parts of at most max_bytes serialized bytes and at least min_rows rows.\n")
+            f.write("        # A part never starts by a line without id, which belongs to the record of the previous line.\n")
+            f.write("        index = fields.index('id') if 'id' in fields else None\n")
+            f.write("        parts = []\n")
+            f.write("        part, size = [], 0\n")
+            f.write("        for row in data:\n")
+            f.write("            row_size = len(json.dumps(row))\n")
+            f.write("            if part and self.max_bytes and size + row_size > self.max_bytes and len(part) >= self.min_rows and (index is None or row[index]):\n")
+            f.write("                parts.append((part, size))\n")
+            f.write("                part, size = [], 0\n")
+            f.write("            part.append(row)\n")
+            f.write("            size += row_size\n")
+            f.write("        if part:\n")
+            f.write("            parts.append((part, size))\n")
+            f.write("        return parts\n\n")
+            f.write("    def record(self, start, rows, size, error, retries, concurrency):\n")
+            f.write("        metrics = {\n")
+            f.write("            'model': self.model,\n")
+            f.write("            'file': self.file,\n")
+            f.write("            'phase': self.phase,\n")
+            f.write("            'start': start,\n")
+            f.write("            'duration': time.time() - start,\n")
+            f.write("            'rows': rows,\n")
+            f.write("            'bytes': size,\n")
+            f.write("            'failures': rows if error else 0,\n")
+            f.write("            'retries': retries,\n")
+            f.write("            'concurrency': concurrency,\n")
+            f.write("        }\n")
+            f.write("        if error:\n")
+            f.write("            metrics['error'] = error[:200]\n")
+            f.write("        with self.lock:\n")
+            f.write("            with open(self.metrics_file, 'a') as f:\n")
+            f.write("                f.write(json.dumps(metrics) + '\\n')\n\n")
+            f.write("    def load_part(self, proxy, fields, data, size, *args, **kwargs):\n")
+            f.write("        retries = 0\n")
+            f.write("        while True:\n")
+            f.write("            concurrency = self.limiter.acquire()\n")
+            f.write("            start = time.time()\n")
+            f.write("            result, exception = None, None\n")
+            f.write("            try:\n")
+            f.write("                result = proxy(fields, data, *args, **kwargs)\n")
+            f.write("                error = load_error(result)\n")
+            f.write("                saturated = bool(error) and saturated_result(result)\n")
+            f.write("            except Exception as e:\n")
+            f.write("                exception = e\n")
+            f.write("                error = str(e) or e.__class__.__name__\n")
+            f.write("                saturated = saturated_exception(e)\n")
+            f.write("            self.limiter.release(saturated)\n")
+            f.write("            if not saturated or retries >= MAX_RETRIES:\n")
+            f.write("                break\n")
+            f.write("            retries += 1\n")
+            f.write("            time.sleep(random.uniform(0, min(BACKOFF_MAX_DELAY, BACKOFF_DELAY * 2 ** retries)))\n")
+            f.write("        self.record(start, len(data), size, error, retries, concurrency)\n")
+            f.write("        if exception is not None:\n")
+            f.write("            raise exception\n")
+            f.write("        return result\n\n")
+            f.write("    def load(self, proxy, fields, data, *args, **kwargs):\n")
+            f.write("        # Load the parts of the batch and merge their results as if the batch was loaded at once.\n")
+            f.write("        # The parts loaded before or after a failed part are committed: they are kept in self.loaded\n")
+            f.write("        # so that only the rows of the failed parts are written in the fail file.\n")
+            f.write("        parts = self.split(fields, data)\n")
+            f.write("        if len(parts) == 1:\n")
+            f.write("            return self.load_part(proxy, fields, data, parts[0][1], *args, **kwargs)\n")
+            f.write("        result = {'ids': [], 'messages': []}\n")
+            f.write("        loaded = set()\n")
+            f.write("        offset = 0\n")
+            f.write("        for part, size in parts:\n")
+            f.write("            try:\n")
+            f.write("                part_result = self.load_part(proxy, fields, part, size, *args, **kwargs)\n")
+            f.write("            except Exception as e:\n")
+            f.write("                part_result = {'ids': False, 'messages': [{'type': 'error', 'message': str(e) or e.__class__.__name__, 'record': 0}]}\n")
+            f.write("            if load_error(part_result) or result['ids'] is False:\n")
+            f.write("                result['ids'] = False\n")
+            f.write("            else:\n")
+            f.write("                result['ids'].extend(part_result.get('ids') or [])\n")
+            f.write("            if not load_error(part_result):\n")
+            f.write("                loaded.update(id(row) for row in part)\n")
+            f.write("            for message in part_result.get('messages', []):\n")
+            f.write("                message = dict(message)\n")
+            f.write("                if isinstance(message.get('record'), int):\n")
+            f.write("                    message['record'] += offset\n")
+            f.write("                if isinstance(message.get('rows'), dict):\n")
+            f.write("                    message['rows'] = dict((k, v + offset) for k, v in message['rows'].items())\n")
+            f.write("                result['messages'].append(message)\n")
+            f.write("            offset += len(part)\n")
+            f.write("        if result['ids'] is False and loaded:\n")
+            f.write("            with self.lock:\n")
+            f.write("                self.loaded[id(data)] = (data, loaded)\n")
+            f.write("        return result\n\n")
+            f.write("    def failed_rows(self, rows):\n")
+            f.write("        # The rows of a failed batch that were not committed by one of its parts\n")
+            f.write("        with self.lock:\n")
+            f.write("            batch, loaded = self.loaded.pop(id(rows), (None, None))\n")
+            f.write("        if batch is not rows:\n")
+            f.write("            return rows\n")
+            f.write("        return [row for row in rows if id(row) not in loaded]\n\n\n")
+            f.write("class FailWriter(object):\n")
+            f.write("    \"\"\"\n")
+            f.write("    Writer of the fail file of odoo_import_thread.py that skips the rows already loaded.\n")
+            f.write("    \"\"\"\n")
+            f.write("    def __init__(self, writer, loader):\n")
+            f.write("        self.writer = writer\n")
+            f.write("        self.loader = loader\n\n")
+            f.write("    def writerow(self, row):\n")
+            f.write("        return self.writer.writerow(row)\n\n")
+            f.write("    def writerows(self, rows):\n")
+            f.write("        return self.writer.writerows(self.loader.failed_rows(rows))\n\n\n")
+            f.write("def instrument(loader):\n")
+            f.write("    # Route the calls of the method 'load' of all models through the loader\n")
+            f.write("    model_getattr = odoolib_main.Model.__getattr__\n\n")
+            f.write("    def __getattr__(self, method):\n")
+            f.write("        proxy = model_getattr(self, method)\n")
+            f.write("        if method != 'load':\n")
+            f.write("            return proxy\n")
+            f.write("        return lambda fields, data, *args, **kwargs: loader.load(proxy, fields, data, *args, **kwargs)\n\n")
+            f.write("    odoolib_main.Model.__getattr__ = __getattr__\n\n")
+            f.write("    # Filter the rows written in the fail file by the import threads\n")
+            f.write("    thread_init = import_threaded.RPCThreadImport.__init__\n\n")
+            f.write("    def __init__(self, *args, **kwargs):\n")
+            f.write("        thread_init(self, *args, **kwargs)\n")
+            f.write("        if getattr(self, 'writer', None) is not None:\n")
+            f.write("            self.writer = FailWriter(self.writer, loader)\n\n")
+            f.write("    import_threaded.RPCThreadImport.__init__ = __init__\n\n\n")
+            f.write("if __name__ == '__main__':\n")
+            f.write("    if len(sys.argv) < 2:\n")
+            f.write("        sys.stderr.write('Usage: python loadlib.py odoo_import_thread.py [arguments]\\n')\n")
+            f.write("        sys.exit(1)\n")
+            f.write("    script = find_script(sys.argv[1])\n")
+            f.write("    loader = Loader([script] + sys.argv[2:])\n")
+            f.write("    sys.argv = loader.arguments([script] + sys.argv[2:])\n")
+            f.write("    instrument(loader)\n")
+            f.write("    runpy.run_path(script, run_name='__main__')\n")
+
+
+    @check_file_exists
+    def create_file_load_report(self, file):
+        """
+        Create the skeleton of load_report.py.
+        """
+        with open(file, 'w') as f:
+            f.write("# -*- coding: utf-8 -*-\n\n")
+            f.write("# This script summarizes the load metrics recorded by loadlib.py in log/metrics_<model>.jsonl.\n")
+            f.write("# Usage: python load_report.py [model ...]\n")
+            f.write("# The report is printed and saved in log/load_report.json.\n\n")
+            f.write("import sys\n")
+            f.write("import os\n")
+            f.write("import glob\n")
+            f.write("import json\n")
+            f.write("import math\n\n")
+            f.write("LOG_DIR = '%s'\n\n\n" % log_dir_name)
+            f.write("def percentile(values, p):\n")
+            f.write("    # Nearest-rank percentile of sorted values\n")
+            f.write("    if not values:\n")
+            f.write("        return 0.0\n")
+            f.write("    return values[max(0, int(math.ceil(p / 100.0 * len(values))) - 1)]\n\n\n")
+            f.write("def summarize(batches):\n")
+            f.write("    loads = [b for b in batches if b['phase'] == 'load']\n")
+            f.write("    fails = [b for b in batches if b['phase'] == 'fail']\n")
+            f.write("    durations = sorted(b['duration'] for b in loads)\n")
+            f.write("    rows = sum(b['rows'] for b in loads)\n")
+            f.write("    failures = sum(b['failures'] for b in loads)\n")
+            f.write("    total_time = max(b['start'] + b['duration'] for b in loads) - min(b['start'] for b in loads) if loads else 0.0\n")
+            f.write("    return {\n")
+            f.write("        'batches': len(loads),\n")
+            f.write("        'avg_batch_bytes': sum(b.get('bytes', 0) for b in loads) / len(loads) if loads else 0,\n")
+            f.write("        'rows': rows,\n")
+            f.write("        'rows_per_second': rows / total_time if total_time else 0.0,\n")
+            f.write("        'p50': percentile(durations, 50),\n")
+            f.write("        'p95': percentile(durations, 95),\n")
+            f.write("        'p99': percentile(durations, 99),\n")
+            f.write("        'failures': failures,\n")
+            f.write("        'failure_rate': float(failures) / rows if rows else 0.0,\n")
+            f.write("        'retries': sum(b.get('retries', 0) for b in batches),\n")
+            f.write("        'avg_concurrency': sum(b.get('concurrency', 1) for b in loads) / float(len(loads)) if loads else 0.0,\n")
+            f.write("        'total_time': total_time,\n")
+            f.write("        'fail_pass_rows': sum(b['rows'] for b in fails),\n")
+            f.write("        'fail_pass_failures': sum(b['failures'] for b in fails),\n")
+            f.write("    }\n\n\n")
+            f.write("def load_report(models=None):\n")
+            f.write("    report = {}\n")
+            f.write("    for filename in sorted(glob.glob(os.path.join(LOG_DIR, 'metrics_*.jsonl'))):\n")
+            f.write("        model = os.path.basename(filename)[len('metrics_'):-len('.jsonl')]\n")
+            f.write("        if models and model not in models:\n")
+            f.write("            continue\n")
+            f.write("        with open(filename, 'r') as f:\n")
+            f.write("            batches = [json.loads(line) for line in f if line.strip()]\n")
+            f.write("        if batches:\n")
+            f.write("            report[model] = summarize(batches)\n")
+            f.write("    return report\n\n\n")
+            f.write("def print_report(report):\n")
+            f.write("    print('%-30s %10s %9s %8s %8s %8s %8s %8s %8s %8s %10s %10s' % ('Model', 'Rows', 'Rows/s', 'p50 (s)', 'p95 (s)', 'p99 (s)', 'Batch KB', 'Workers', 'Failed', 'Retries', 'Time (s)', 'Fail pass'))\n")
+            f.write("    for model, s in sorted(report.items()):\n")
+            f.write("        print('%-30s %10s %9.1f %8.2f %8.2f %8.2f %8.1f %8.1f %7.1f%% %8s %10.1f %10s' % (\n")
+            f.write("            model, s['rows'], s['rows_per_second'], s['p50'], s['p95'], s['p99'], s['avg_batch_bytes'] / 1024.0, s['avg_concurrency'], 100 * s['failure_rate'],\n")
+            f.write("            s['retries'], s['total_time'], '%s/%s' % (s['fail_pass_failures'], s['fail_pass_rows']) if s['fail_pass_rows'] else '-'))\n\n\n")
+            f.write("if __name__ == '__main__':\n")
+            f.write("    report = load_report(sys.argv[1:])\n")
+            f.write("    if not report:\n")
+            f.write("        print('No load metrics found in %s' % LOG_DIR)\n")
+            f.write("        sys.exit(0)\n")
+            f.write("    print_report(report)\n")
+            f.write("    with open(os.path.join(LOG_DIR, 'load_report.json'), 'w') as f:\n")
+            f.write("        json.dump(report, f, indent=4, sort_keys=True)\n")
+            f.write("    print('Report saved in %s' % os.path.join(LOG_DIR, 'load_report.json'))\n")
+
+
+    @check_file_exists
+    def create_file_check_duplicates(self, file):
+        """
+        Create the skeleton of check_duplicates.py.
+        """
+        with open(file, 'w') as f:
+            f.write("# -*- coding: utf-8 -*-\n\n")
+            f.write("# This script finds the duplicate xml_ids of the import files before the load.\n")
+            f.write("# Usage: python check_duplicates.py [--mode fail|keep-first|keep-last] [file ...]\n")
+            f.write("# Without file, all the import files of files.py (dest_*) are checked.\n")
+            f.write("# The xml_ids are spilled to disk by hash partitions, so that files larger than the memory are handled.\n")
+            f.write("# The duplicates are reported in log/duplicates_<file>.csv. Then, according to the mode:\n")
+            f.write("# - fail: exit with an error,\n")
+            f.write("# - keep-first / keep-last: rewrite the file with only the first / last record of each xml_id. A record is\n")
+            f.write("#   the row with the xml_id followed by its rows without id (one2many lines), removed together.\n\n")
+            f.write("import sys\n")
+            f.write("import os\n")
+            f.write("import io\n")
+            f.write("import csv\n")
+            f.write("import zlib\n")
+            f.write("import shutil\n")
+            f.write("import tempfile\n")
+            f.write("import files\n")
+            f.write("from funclib import open_data_file, uncompressed_name\n\n")
+            f.write("LOG_DIR = 'log'\n")
+            f.write("MODE = 'fail'\n")
+            f.write("DELIMITER = ';'\n")
+            f.write("# Number of spill files: each one must fit in memory\n")
+            f.write("PARTITIONS = 64\n\n")
+            f.write("csv.field_size_limit(2 ** 31 - 1)\n\n\n")
+            f.write("def read_rows(filename):\n")
+            f.write("    with io.TextIOWrapper(open_data_file(filename, 'rb'), encoding='utf-8', newline='') as f:\n")
+            f.write("        reader = csv.reader(f, delimiter=DELIMITER)\n")
+            f.write("        header = next(reader)\n")
+            f.write("        yield header\n")
+            f.write("        for row in reader:\n")
+            f.write("            yield row\n\n\n")
+            f.write("def find_duplicates(filename, tmp_dir):\n")
+            f.write("    # Return {xml_id: [row numbers]} of the duplicate xml_ids of a file\n")
+            f.write("    rows = read_rows(filename)\n")
+            f.write("    header = next(rows)\n")
+            f.write("    if 'id' not in header:\n")
+            f.write("        return {}\n")
+            f.write("    index = header.index('id')\n")
+            f.write("    spills = [io.open(os.path.join(tmp_dir, str(i)), 'w', encoding='utf-8') for i in range(PARTITIONS)]\n")
+            f.write("    for number, row in enumerate(rows, 1):\n")
+            f.write("        xml_id = row[index] if index < len(row) else ''\n")
+            f.write("        if xml_id:\n")
+            f.write("            spills[zlib.crc32(xml_id.encode('utf-8')) % PARTITIONS].write(u'%s\\t%s\\n' % (number, xml_id))\n")
+            f.write("    for spill in spills:\n")
+            f.write("        spill.close()\n\n")
+            f.write("    duplicates = {}\n")
+            f.write("    for i in range(PARTITIONS):\n")
+            f.write("        numbers = {}\n")
+            f.write("        with io.open(os.path.join(tmp_dir, str(i)), 'r', encoding='utf-8') as spill:\n")
+            f.write("            for line in spill:\n")
+            f.write("                number, xml_id = line.rstrip('\\n').split('\\t', 1)\n")
+            f.write("                numbers.setdefault(xml_id, []).append(int(number))\n")
+            f.write("        duplicates.update((xml_id, n) for xml_id, n in numbers.items() if len(n) > 1)\n")
+            f.write("    return duplicates\n\n\n")
+            f.write("def write_report(filename, duplicates):\n")
+            f.write("    report = os.path.join(LOG_DIR, 'duplicates_%s' % os.path.basename(uncompressed_name(filename)))\n")
+            f.write("    with io.open(report, 'w', encoding='utf-8') as f:\n")
+            f.write("        f.write(u'xml_id;rows\\n')\n")
+            f.write("        for xml_id, numbers in sorted(duplicates.items(), key=lambda d: d[1][0]):\n")
+            f.write("            f.write(u'%s;%s\\n' % (xml_id, ','.join(str(n) for n in numbers)))\n")
+            f.write("    return report\n\n\n")
+            f.write("def keep_rows(filename, duplicates, mode):\n")
+            f.write("    # Rewrite the file without the other records of the duplicate xml_ids. Return the number of removed rows.\n")
+            f.write("    drop = set()\n")
+            f.write("    for numbers in duplicates.values():\n")
+            f.write("        drop.update(numbers[1:] if mode == 'keep-first' else numbers[:-1])\n")
+            f.write("    tmp_file = os.path.join(os.path.dirname(filename), 'tmp_%s' % os.path.basename(filename))\n")
+            f.write("    rows = read_rows(filename)\n")
+            f.write("    header = next(rows)\n")
+            f.write("    index = header.index('id')\n")
+            f.write("    removed = 0\n")
+            f.write("    with io.TextIOWrapper(open_data_file(tmp_file, 'wb'), encoding='utf-8', newline='') as f:\n")
+            f.write("        writer = csv.writer(f, delimiter=DELIMITER, quoting=csv.QUOTE_ALL)\n")
+            f.write("        writer.writerow(header)\n")
+            f.write("        skip = False\n")
+            f.write("        for number, row in enumerate(rows, 1):\n")
+            f.write("            # The rows without id belong to the record of the previous row\n")
+            f.write("            if index < len(row) and row[index]:\n")
+            f.write("                skip = number in drop\n")
+            f.write("            if skip:\n")
+            f.write("                removed += 1\n")
+            f.write("            else:\n")
+            f.write("                writer.writerow(row)\n")
+            f.write("    os.remove(filename)\n")
+            f.write("    os.rename(tmp_file, filename)\n")
+            f.write("    return removed\n\n\n")
+            f.write("def check_duplicates(filenames, mode):\n")
+            f.write("    found = False\n")
+            f.write("    for filename in filenames:\n")
+            f.write("        tmp_dir = tempfile.mkdtemp()\n")
+            f.write("        try:\n")
+            f.write("            duplicates = find_duplicates(filename, tmp_dir)\n")
+            f.write("        finally:\n")
+            f.write("            shutil.rmtree(tmp_dir)\n")
+            f.write("        if not duplicates:\n")
+            f.write("            continue\n")
+            f.write("        found = True\n")
+            f.write("        report = write_report(filename, duplicates)\n")
+            f.write("        sys.stderr.write('%s: %s duplicate xml_ids in %s rows, see %s\\n' % (filename, len(duplicates), sum(len(n) for n in duplicates.values()), report))\n")
+            f.write("        if mode in ('keep-first', 'keep-last'):\n")
+            f.write("            removed = keep_rows(filename, duplicates, mode)\n")
+            f.write("            sys.stderr.write('%s: %s records (%s rows) removed (%s)\\n' % (filename, sum(len(n) - 1 for n in duplicates.values()), removed, mode))\n")
+            f.write("    return not found or mode != 'fail'\n\n\n")
+            f.write("if __name__ == '__main__':\n")
+            f.write("    args = sys.argv[1:]\n")
+            f.write("    mode = MODE\n")
+            f.write("    if len(args) > 1 and args[0] == '--mode':\n")
+            f.write("        mode, args = args[1], args[2:]\n")
+            f.write("    if mode not in ('fail', 'keep-first', 'keep-last'):\n")
+            f.write("        sys.stderr.write('Unknown mode %s\\n' % mode)\n")
+            f.write("        sys.exit(2)\n")
+            f.write("    filenames = args or [v for k, v in sorted(vars(files).items()) if k.startswith('dest_') and os.path.isfile(v)]\n")
+            f.write("    sys.exit(0 if check_duplicates(filenames, mode) else 1)\n")
+
+
+    @check_file_exists
+    def create_file_reconcile(self, file):
+        """
+        Create the skeleton of reconcile.py.
+        """
+        with open(file, 'w') as f:
+            f.write("# -*- coding: utf-8 -*-\n\n")
+            f.write("# This script checks that all the records of the import files are in the database after the load.\n")
+            f.write("# Usage: python reconcile.py [model ...]\n")
+            f.write("# For each import file of files.py (dest_*), the distinct xml_ids of the file are searched among the\n")
+            f.write("# xml_ids of the model in the database, by module (prefix) and by pages of PAGE_SIZE names, so that the\n")
+            f.write("# xml_ids of other files or earlier loads are not counted. The missing ones are listed in\n")
+            f.write("# log/missing_<model>.csv.\n\n")
+            f.write("import sys\n")
+            f.write("import os\n")
+            f.write("import io\n")
+            f.write("import csv\n")
+            f.write("import odoolib\n")
+            f.write("import files\n")
+            f.write("from odoo_csv_tools.lib import conf_lib\n")
+            f.write("from funclib import open_data_file, uncompressed_name\n\n")
+            f.write("LOG_DIR = 'log'\n")
+            f.write("DELIMITER = ';'\n")
+            f.write("PAGE_SIZE = 10000\n\n")
+            f.write("csv.field_size_limit(2 ** 31 - 1)\n\n")
+            f.write("connection = conf_lib.get_server_connection(files.config_file)\n")
+            f.write("model_data = connection.get_model('ir.model.data')\n\n\n")
+            f.write("def import_files(models=None):\n")
+            f.write("    # Return [(model, import file)] of files.py. The import file of a model is named after it.\n")
+            f.write("    result = []\n")
+            f.write("    for name, filename in sorted(vars(files).items()):\n")
+            f.write("        if not name.startswith('dest_') or name.endswith('_hierarchy') or not os.path.isfile(filename):\n")
+            f.write("            continue\n")
+            f.write("        model = os.path.splitext(os.path.basename(uncompressed_name(filename)))[0]\n")
+            f.write("        if not models or model in models:\n")
+            f.write("            result.append((model, filename))\n")
+            f.write("    return result\n\n\n")
+            f.write("def read_ids(filename):\n")
+            f.write("    # Return the number of rows and the distinct xml_ids of an import file by module\n")
+            f.write("    rows = 0\n")
+            f.write("    ids = {}\n")
+            f.write("    with io.TextIOWrapper(open_data_file(filename, 'rb'), encoding='utf-8', newline='') as f:\n")
+            f.write("        reader = csv.reader(f, delimiter=DELIMITER)\n")
+            f.write("        header = next(reader)\n")
+            f.write("        index = header.index('id') if 'id' in header else None\n")
+            f.write("        for row in reader:\n")
+            f.write("            rows += 1\n")
+            f.write("            if index is None or index >= len(row) or not row[index]:\n")
+            f.write("                continue\n")
+            f.write("            # Odoo puts the xml_ids without module in the module __import__\n")
+            f.write("            module, name = row[index].split('.', 1) if '.' in row[index] else ('__import__', row[index])\n")
+            f.write("            ids.setdefault(module, set()).add(name)\n")
+            f.write("    return rows, ids\n\n\n")
+            f.write("def loaded_ids(model, module, names):\n")
+            f.write("    # Return the names of the file that are xml_ids of the model in the database, page by page\n")
+            f.write("    names = sorted(names)\n")
+            f.write("    loaded = set()\n")
+            f.write("    for start in range(0, len(names), PAGE_SIZE):\n")
+            f.write("        page = names[start:start + PAGE_SIZE]\n")
+            f.write("        domain = [('model', '=', model), ('module', '=', module), ('name', 'in', page)]\n")
+            f.write("        loaded.update(d['name'] for d in model_data.search_read(domain, ['name']))\n")
+            f.write("    return loaded\n\n\n")
+            f.write("def reconcile(model, filename):\n")
+            f.write("    rows, ids = read_ids(filename)\n")
+            f.write("    distinct = sum(len(names) for names in ids.values())\n")
+            f.write("    loaded = 0\n")
+            f.write("    missing = []\n")
+            f.write("    for module, names in sorted(ids.items()):\n")
+            f.write("        found = loaded_ids(model, module, names)\n")
+            f.write("        loaded += len(found)\n")
+            f.write("        missing.extend('%s.%s' % (module, name) for name in sorted(names - found))\n")
+            f.write("    if missing:\n")
+            f.write("        with io.open(os.path.join(LOG_DIR, 'missing_%s.csv' % model), 'w', encoding='utf-8') as f:\n")
+            f.write("            f.write(u'id\\n')\n")
+            f.write("            for xml_id in missing:\n")
+            f.write("                f.write(u'%s\\n' % xml_id)\n")
+            f.write("    return rows, distinct, loaded, len(missing)\n\n\n")
+            f.write("if __name__ == '__main__':\n")
+            f.write("    complete = True\n")
+            f.write("    print('%-30s %10s %10s %10s %10s' % ('Model', 'Rows', 'Distinct', 'Loaded', 'Missing'))\n")
+            f.write("    for model, filename in import_files(sys.argv[1:]):\n")
+            f.write("        rows, distinct, loaded, missing = reconcile(model, filename)\n")
+            f.write("        complete = complete and not missing\n")
+            f.write("        print('%-30s %10s %10s %10s %10s%s' % (model, rows, distinct, loaded, missing, ' see %s' % os.path.join(LOG_DIR, 'missing_%s.csv' % model) if missing else ''))\n")
+            f.write("    sys.exit(0 if complete else 1)\n")
+
+
+    @check_file_exists
+    def create_file_partition_load(self, file):
+        """
+        Create the skeleton of partition_load.py.
+        """
+        with open(file, 'w') as f:
+            f.write("# -*- coding: utf-8 -*-\n\n")
+            f.write("# This script loads a very large model from several machines (nodes).\n")
+            f.write("# Usage:\n")
+            f.write("#   python partition_load.py plan my.model NODES [--groupby COLUMN]\n")
+            f.write("#       Split the import file of the model (dest_my_model in files.py, my.model.hierarchy for dest_my_model_hierarchy)\n")
+            f.write("#       into NODES shards\n")
+            f.write("#       in partition/my.model/node_<n>/, each one with its connection file and load script.\n")
+            f.write("#       The lines with the same groupby value (by default the one of the load script of the model)\n")
+            f.write("#       are in the same shard, so that no two nodes update the same parent record. Without groupby in the\n")
+            f.write("#       load script, set it: the parent many2one of the lines (ex: move_id/id), or id if the records are independent.\n")
+            f.write("#       Copy each node folder on a load machine, set its conf/connection.conf and launch its load.sh.\n")
+            f.write("#   python partition_load.py run-local my.model\n")
+            f.write("#       Launch the load scripts of all the nodes as local processes.\n")
+            f.write("#   python partition_load.py merge my.model\n")
+            f.write("#       Merge the .fail and .fail.bis files of the nodes into the data folder of the project.\n\n")
+            f.write("import sys\n")
+            f.write("import os\n")
+            f.write("import io\n")
+            f.write("import re\n")
+            f.write("import csv\n")
+            f.write("import zlib\n")
+            f.write("import glob\n")
+            f.write("import shutil\n")
+            f.write("import argparse\n")
+            f.write("import subprocess\n")
+            f.write("import files\n")
+            f.write("from funclib import open_data_file, uncompressed_name, imports_file\n\n")
+            f.write("PARTITION_DIR = 'partition'\n")
+            f.write("DELIMITER = ';'\n\n")
+            f.write("csv.field_size_limit(2 ** 31 - 1)\n\n\n")
+            f.write("def import_file(model):\n")
+            f.write("    # Return the import file of a model (or of its hierarchy: my.model.hierarchy)\n")
+            f.write("    name = model.replace('.', '_')\n")
+            f.write("    dest = getattr(files, 'dest_%s' % name, None)\n")
+            f.write("    if not dest:\n")
+            f.write("        sys.stderr.write('No import file dest_%s in files.py\\n' % name)\n")
+            f.write("        sys.exit(1)\n")
+            f.write("    return dest\n\n\n")
+            f.write("def load_commands(dest):\n")
+            f.write("    # Return the odoo_import_thread.py commands of the import file in the load scripts of the project\n")
+            f.write("    for script in sorted(glob.glob('*.sh') + glob.glob('*.cmd')):\n")
+            f.write("        with open(script, 'r') as f:\n")
+            f.write("            commands = [line.strip() for line in f if 'odoo_import_thread.py' in line and imports_file(line, dest)]\n")
+            f.write("        if commands:\n")
+            f.write("            return commands\n")
+            f.write("    sys.stderr.write('No load command of %s found in the load scripts\\n' % dest)\n")
+            f.write("    sys.exit(1)\n\n\n")
+            f.write("def node_dirs(model):\n")
+            f.write("    return sorted(glob.glob(os.path.join(PARTITION_DIR, model, 'node_*')), key=lambda d: int(d.rsplit('_', 1)[1]))\n\n\n")
+            f.write("def csv_writer(f):\n")
+            f.write("    return csv.writer(f, delimiter=DELIMITER, quoting=csv.QUOTE_ALL)\n\n\n")
+            f.write("def plan(model, nodes, groupby=None):\n")
+            f.write("    dest = import_file(model)\n")
+            f.write("    commands = load_commands(dest)\n")
+            f.write("    if groupby is None:\n")
+            f.write("        groupby = re.search(r'--groupby=(\\S*)', commands[0]).group(1)\n")
+            f.write("    if not groupby:\n")
+            f.write("        sys.stderr.write('No groupby column in the load script of %s: set --groupby to the parent many2one of the lines '\n")
+            f.write("                         '(ex: move_id/id), or to id if the records are independent\\n' % model)\n")
+            f.write("        sys.exit(1)\n")
+            f.write("    with io.TextIOWrapper(open_data_file(dest, 'rb'), encoding='utf-8', newline='') as f:\n")
+            f.write("        if groupby not in next(csv.reader(f, delimiter=DELIMITER), []):\n")
+            f.write("            sys.stderr.write('Column %s not found in %s\\n' % (groupby, dest))\n")
+            f.write("            sys.exit(1)\n")
+            f.write("    model_dir = os.path.join(PARTITION_DIR, model)\n")
+            f.write("    shutil.rmtree(model_dir, ignore_errors=True)\n")
+            f.write("    data_file = os.path.basename(uncompressed_name(dest))\n\n")
+            f.write("    outputs = []\n")
+            f.write("    for n in range(nodes):\n")
+            f.write("        node_dir = os.path.join(model_dir, 'node_%s' % n)\n")
+            f.write("        for folder in ('conf', 'data', 'log'):\n")
+            f.write("            os.makedirs(os.path.join(node_dir, folder))\n")
+            f.write("        shutil.copy(files.config_file, os.path.join(node_dir, 'conf', 'connection.conf'))\n")
+            f.write("        if any('loadlib.py' in c for c in commands):\n")
+            f.write("            for lib in ('loadlib.py', 'prefix.py'):\n")
+            f.write("                shutil.copy(lib, node_dir)\n")
+            f.write("        script_file = os.path.join(node_dir, 'load.sh')\n")
+            f.write("        with open(script_file, 'w') as f:\n")
+            f.write("            f.write('#!/usr/bin/env bash\\n\\n')\n")
+            f.write("            f.write('# Load of the shard %s/%s of %s (generated by partition_load.py)\\n' % (n + 1, nodes, model))\n")
+            f.write("            f.write('cd \"$(dirname \"$0\")\"\\n')\n")
+            f.write("            for command in commands:\n")
+            f.write("                f.write('%s\\n' % re.sub(r'--file=\\S+', '--file=%s' % os.path.join('data', data_file), command))\n")
+            f.write("        os.chmod(script_file, 0o755)\n")
+            f.write("        outputs.append(io.open(os.path.join(node_dir, 'data', data_file), 'w', encoding='utf-8', newline=''))\n\n")
+            f.write("    writers = [csv_writer(f) for f in outputs]\n")
+            f.write("    counts = [0] * nodes\n")
+            f.write("    with io.TextIOWrapper(open_data_file(dest, 'rb'), encoding='utf-8', newline='') as f:\n")
+            f.write("        reader = csv.reader(f, delimiter=DELIMITER)\n")
+            f.write("        header = next(reader)\n")
+            f.write("        for w in writers:\n")
+            f.write("            w.writerow(header)\n")
+            f.write("        id_index = header.index('id') if 'id' in header else None\n")
+            f.write("        key_index = header.index(groupby)\n")
+            f.write("        node = 0\n")
+            f.write("        for row in reader:\n")
+            f.write("            # The lines without id belong to the record of the previous line\n")
+            f.write("            if id_index is None or row[id_index]:\n")
+            f.write("                key = row[key_index] or (row[id_index] if id_index is not None else '')\n")
+            f.write("                node = zlib.crc32(key.encode('utf-8')) % nodes if key else (node + 1) % nodes\n")
+            f.write("            writers[node].writerow(row)\n")
+            f.write("            counts[node] += 1\n")
+            f.write("    for f in outputs:\n")
+            f.write("        f.close()\n")
+            f.write("    print('%s lines of %s split by %s into %s nodes in %s' % (sum(counts), dest, groupby, nodes, model_dir))\n")
+            f.write("    for n, count in enumerate(counts):\n")
+            f.write("        print('    node_%s: %s lines' % (n, count))\n\n\n")
+            f.write("def run_local(model):\n")
+            f.write("    # Launch the nodes as local processes, in parallel\n")
+            f.write("    processes = []\n")
+            f.write("    for node_dir in node_dirs(model):\n")
+            f.write("        out = open(os.path.join(node_dir, 'log', 'load_out.log'), 'w')\n")
+            f.write("        err = open(os.path.join(node_dir, 'log', 'load_err.log'), 'w')\n")
+            f.write("        processes.append((node_dir, subprocess.Popen(['bash', os.path.join(node_dir, 'load.sh')], stdout=out, stderr=err), out, err))\n")
+            f.write("    failed = 0\n")
+            f.write("    for node_dir, process, out, err in processes:\n")
+            f.write("        code = process.wait()\n")
+            f.write("        out.close()\n")
+            f.write("        err.close()\n")
+            f.write("        failed += code != 0\n")
+            f.write("        print('%s: %s' % (node_dir, 'done' if code == 0 else 'exit code %s, see %s' % (code, os.path.join(node_dir, 'log'))))\n")
+            f.write("    return failed == 0\n\n\n")
+            f.write("def merge(model):\n")
+            f.write("    # Concatenate the fail files of the nodes into the data folder of the project\n")
+            f.write("    dest = uncompressed_name(import_file(model))\n")
+            f.write("    for suffix in ('.fail', '.fail.bis'):\n")
+            f.write("        node_files = [os.path.join(d, 'data', os.path.basename(dest) + suffix) for d in node_dirs(model)]\n")
+            f.write("        node_files = [nf for nf in node_files if os.path.isfile(nf)]\n")
+            f.write("        if not node_files:\n")
+            f.write("            continue\n")
+            f.write("        header, count = None, 0\n")
+            f.write("        with io.open(dest + suffix, 'w', encoding='utf-8', newline='') as f:\n")
+            f.write("            writer = csv_writer(f)\n")
+            f.write("            for node_file in node_files:\n")
+            f.write("                with io.open(node_file, 'r', encoding='utf-8', newline='') as nf:\n")
+            f.write("                    reader = csv.reader(nf, delimiter=DELIMITER)\n")
+            f.write("                    node_header = next(reader, None)\n")
+            f.write("                    if node_header and header is None:\n")
+            f.write("                        header = node_header\n")
+            f.write("                        writer.writerow(header)\n")
+            f.write("                    for row in reader:\n")
+            f.write("                        writer.writerow(row)\n")
+            f.write("                        count += 1\n")
+            f.write("        print('%s: %s lines from %s nodes' % (dest + suffix, count, len(node_files)))\n\n")
+            f.write("if __name__ == '__main__':\n")
+            f.write("    parser = argparse.ArgumentParser(description='Partitioned load of a model on several nodes')\n")
+            f.write("    subparsers = parser.add_subparsers(dest='action')\n")
+            f.write("    plan_parser = subparsers.add_parser('plan', help='split the import file into one folder per node')\n")
+            f.write("    plan_parser.add_argument('model')\n")
+            f.write("    plan_parser.add_argument('nodes', type=int)\n")
+            f.write("    plan_parser.add_argument('--groupby', help='column keeping its lines on the same node (default: groupby of the load script, required without it)')\n")
+            f.write("    subparsers.add_parser('run-local', help='launch all the nodes as local processes').add_argument('model')\n")
+            f.write("    subparsers.add_parser('merge', help='merge the fail files of the nodes').add_argument('model')\n")
+            f.write("    args = parser.parse_args()\n")
+            f.write("    if args.action == 'plan':\n")
+            f.write("        plan(args.model, args.nodes, args.groupby)\n")
+            f.write("    elif args.action == 'run-local':\n")
+            f.write("        sys.exit(0 if run_local(args.model) else 1)\n")
+            f.write("    elif args.action == 'merge':\n")
+            f.write("        merge(args.model)\n")
+            f.write("    else:\n")
+            f.write("        parser.print_help()\n")
+
+
+    @check_file_exists
+    def create_file_build(self, file):
+        """
+        Create the skeleton of build.py.
+        """
+        with open(file, 'w') as f:
+            f.write("# -*- coding: utf-8 -*-\n\n")
+            f.write("# This script keeps the state of the incremental transformations and loads (option --incremental\n")
+            f.write("# of the transform and load scripts).\n")
+            f.write("# Usage: python build.py check|record transform|load|translations my_model\n")
+            f.write("#   check: exit with 0 if the step of the model is up to date, else with 1.\n")
+            f.write("#   record: save the step of the model as done.\n")
+            f.write("# A transformation is up to date when the client file, the script of the model, files.py, prefix.py,\n")
+            f.write("# mapping.py, funclib.py and map_my_model.py have not changed since the last one and its import file exists.\n")
+            f.write("# The transformations with lines not transformed or skipped (see log/transform_my_model_err.log) are not recorded,\n")
+            f.write("# and the ones reading the database (RPC libraries or build_name_map in the script or in a module of the project\n")
+            f.write("# it imports) are never up to date, as their result depends on it.\n")
+            f.write("# A load is up to date when the model has not been transformed again since the last load and its load\n")
+            f.write("# script has not changed. The loads with rejected records (.fail.bis) are not recorded.\n")
+            f.write("# The content hashes are saved in data/build_state.json, so that the state is reset with the data folder.\n\n")
+            f.write("import sys\n")
+            f.write("import os\n")
+            f.write("import re\n")
+            f.write("import json\n")
+            f.write("import glob\n")
+            f.write("import hashlib\n")
+            f.write("import files\n")
+            f.write("from funclib import uncompressed_name\n\n")
+            f.write("LOG_DIR = 'log'\n")
+            f.write("STATE_FILE = os.path.join(files.data_dest_dir, 'build_state.json')\n")
+            f.write("COMMON_FILES = ['files.py', 'prefix.py', 'mapping.py', 'funclib.py']\n")
+            f.write("STEPS = ['transform', 'load', 'translations']\n")
+            f.write("# Code reading the database: the RPC libraries and the name maps of funclib.py (option --m2o-by-name)\n")
+            f.write("DATABASE_CODE = re.compile(r'^[^#\\n]*(\\bodoolib\\b|\\bconf_lib\\b|\\bbuild_name_map\\()', re.M)\n")
+            f.write("MODULE_IMPORTS = re.compile(r'^\\s*(?:from|import)\\s+(\\w+)', re.M)\n\n\n")
+            f.write("def load_state():\n")
+            f.write("    state = {}\n")
+            f.write("    if os.path.isfile(STATE_FILE):\n")
+            f.write("        with open(STATE_FILE, 'r') as f:\n")
+            f.write("            state = json.load(f)\n")
+            f.write("    for key in ['files'] + STEPS:\n")
+            f.write("        state.setdefault(key, {})\n")
+            f.write("    return state\n\n\n")
+            f.write("def save_state(state):\n")
+            f.write("    with open(STATE_FILE, 'w') as f:\n")
+            f.write("        json.dump(state, f, indent=4, sort_keys=True)\n\n\n")
+            f.write("def file_hash(state, filename):\n")
+            f.write("    # Content hash of a file, computed again only when its size or modification time changed\n")
+            f.write("    if not os.path.isfile(filename):\n")
+            f.write("        return ''\n")
+            f.write("    stat = os.stat(filename)\n")
+            f.write("    cached = state['files'].get(filename)\n")
+            f.write("    if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime:\n")
+            f.write("        return cached[2]\n")
+            f.write("    h = hashlib.sha1()\n")
+            f.write("    with open(filename, 'rb') as f:\n")
+            f.write("        for chunk in iter(lambda: f.read(1 << 20), b''):\n")
+            f.write("            h.update(chunk)\n")
+            f.write("    state['files'][filename] = [stat.st_size, stat.st_mtime, h.hexdigest()]\n")
+            f.write("    return h.hexdigest()\n\n\n")
+            f.write("def step_scripts(step, name):\n")
+            f.write("    if step == 'transform':\n")
+            f.write("        return []\n")
+            f.write("    return ['%s.sh' % name] if step == 'load' else sorted(glob.glob('%s.*.sh' % name))\n\n\n")
+            f.write("def step_hash(state, step, name):\n")
+            f.write("    # Hash of the inputs of a step: the files of a transformation, the transformation and the scripts of a load\n")
+            f.write("    if step == 'transform':\n")
+            f.write("        inputs = [getattr(files, 'src_%s' % name, None), '%s.py' % name, 'map_%s.py' % name] + COMMON_FILES\n")
+            f.write("        inputs = [i for i in inputs if i]\n")
+            f.write("    else:\n")
+            f.write("        inputs = step_scripts(step, name)\n")
+            f.write("    h = hashlib.sha1(state['transform'].get(name, '').encode('utf-8') if step != 'transform' else b'')\n")
+            f.write("    for filename in inputs:\n")
+            f.write("        h.update(('%s:%s\\n' % (filename, file_hash(state, filename))).encode('utf-8'))\n")
+            f.write("    return h.hexdigest()\n\n\n")
+            f.write("def rejected_rows(step, name):\n")
+            f.write("    # Number of rejected records of the import files loaded by the scripts of a step\n")
+            f.write("    count = 0\n")
+            f.write("    for script in step_scripts(step, name):\n")
+            f.write("        with open(script, 'r') as f:\n")
+            f.write("            import_files = set(re.findall(r'--file=(\\S+)', f.read()))\n")
+            f.write("        for filename in import_files:\n")
+            f.write("            fail_file = '%s.fail.bis' % uncompressed_name(filename)\n")
+            f.write("            if os.path.isfile(fail_file):\n")
+            f.write("                with open(fail_file, 'rb') as f:\n")
+            f.write("                    count += max(0, sum(1 for line in f) - 1)\n")
+            f.write("    return count\n\n\n")
+            f.write("def failed_lines(step, name):\n")
+            f.write("    # Number of lines of the client file not transformed, reported by the transformation\n")
+            f.write("    log_file = os.path.join(LOG_DIR, 'transform_%s_err.log' % name)\n")
+            f.write("    if step != 'transform' or not os.path.isfile(log_file):\n")
+            f.write("        return 0\n")
+            f.write("    with open(log_file, 'r') as f:\n")
+            f.write("        return sum(int(count) for count in re.findall(r'^(\\d+) line\\(s\\) of .* not transformed', f.read(), re.M))\n\n\n")
+            f.write("def reads_database(name, seen=None):\n")
+            f.write("    # True if the script, or a module of the project it imports, uses the RPC libraries or builds name maps.\n")
+            f.write("    # funclib.py only defines build_name_map, called with the connection of the script.\n")
+            f.write("    seen = set() if seen is None else seen\n")
+            f.write("    if name in seen or not os.path.isfile('%s.py' % name):\n")
+            f.write("        return False\n")
+            f.write("    seen.add(name)\n")
+            f.write("    with open('%s.py' % name, 'r') as f:\n")
+            f.write("        code = f.read()\n")
+            f.write("    if DATABASE_CODE.search(code):\n")
+            f.write("        return True\n")
+            f.write("    return any(reads_database(module, seen) for module in MODULE_IMPORTS.findall(code) if module != 'funclib')\n\n\n")
+            f.write("def is_up_to_date(state, step, name):\n")
+            f.write("    if state[step].get(name) != step_hash(state, step, name):\n")
+            f.write("        return False\n")
+            f.write("    if step == 'transform':\n")
+            f.write("        dest = getattr(files, 'dest_%s' % name, None)\n")
+            f.write("        return (not dest or os.path.isfile(dest)) and os.path.isfile('%s.sh' % name) and not reads_database(name)\n")
+            f.write("    return True\n\n\n")
+            f.write("if __name__ == '__main__':\n")
+            f.write("    if len(sys.argv) != 4 or sys.argv[1] not in ('check', 'record') or sys.argv[2] not in STEPS:\n")
+            f.write("        sys.stderr.write('Usage: python build.py check|record %s my_model\\n' % '|'.join(STEPS))\n")
+            f.write("        sys.exit(2)\n")
+            f.write("    action, step, name = sys.argv[1:]\n")
+            f.write("    state = load_state()\n")
+            f.write("    if action == 'check':\n")
+            f.write("        up_to_date = is_up_to_date(state, step, name)\n")
+            f.write("        save_state(state)\n")
+            f.write("        sys.exit(0 if up_to_date else 1)\n")
+            f.write("    rejected = rejected_rows(step, name)\n")
+            f.write("    failed = failed_lines(step, name)\n")
+            f.write("    if rejected:\n")
+            f.write("        sys.stdout.write('%s of %s not recorded: %s rejected records\\n' % (step.capitalize(), name, rejected))\n")
+            f.write("    elif failed:\n")
+            f.write("        sys.stdout.write('%s of %s not recorded: %s lines not transformed\\n' % (step.capitalize(), name, failed))\n")
+            f.write("    else:\n")
+            f.write("        state[step][name] = step_hash(state, step, name)\n")
+            f.write("    save_state(state)\n")
+
+
+    @check_file_exists
+    def create_file_smoke_load(self, file):
+        """
+        Create the skeleton of smoke_load.py.
+        """
+        with open(file, 'w') as f:
+            f.write("# -*- coding: utf-8 -*-\n\n")
+            f.write("# This script tests the load of a sample of the import files before the full load.\n")
+            f.write("# Usage: python smoke_load.py [-c CONFIG] [--size SIZE] [--max-values MAX_VALUES] [model ...]\n")
+            f.write("# For each import file of files.py (dest_*), a stratified sample is taken: the first record with each\n")
+            f.write("# column filled, the first record with each distinct value of the relational and selection columns,\n")
+            f.write("# the first record with each format of the values of the other columns (letters and digits collapsed:\n")
+            f.write("# 2020-01-31 and 31/01/2020 have the formats 9-9-9 and 9/9/9), up to MAX_VALUES values or formats\n")
+            f.write("# per column, and SIZE random records. The sample is imported by the import\n")
+            f.write("# wizard of Odoo (module base_import) in test mode, so that it is rolled back by the server, in the\n")
+            f.write("# database of CONFIG (by default the one of files.py, set a scratch database to be safe).\n")
+            f.write("# The errors are grouped by field and cause in log/smoke_report.json and the samples are kept in\n")
+            f.write("# log/smoke_<model>.csv. The relations to records of other import files are only found if these files\n")
+            f.write("# are already loaded.\n\n")
+            f.write("import sys\n")
+            f.write("import os\n")
+            f.write("import io\n")
+            f.write("import re\n")
+            f.write("import ast\n")
+            f.write("import csv\n")
+            f.write("import glob\n")
+            f.write("import json\n")
+            f.write("import random\n")
+            f.write("import argparse\n")
+            f.write("import odoolib\n")
+            f.write("import files\n")
+            f.write("from odoo_csv_tools.lib import conf_lib\n")
+            f.write("from funclib import open_data_file, uncompressed_name, imports_file\n\n")
+            f.write("LOG_DIR = 'log'\n")
+            f.write("DELIMITER = ';'\n")
+            f.write("SAMPLE_SIZE = 100\n")
+            f.write("MAX_VALUES = 100\n")
+            f.write("RELATIONAL_TYPES = ('many2one', 'many2many', 'one2many', 'selection', 'reference')\n\n")
+            f.write("csv.field_size_limit(2 ** 31 - 1)\n\n\n")
+            f.write("def import_files(models=None):\n")
+            f.write("    # Return [(model, import file)] of files.py. The import file of a model is named after it.\n")
+            f.write("    result = []\n")
+            f.write("    for name, filename in sorted(vars(files).items()):\n")
+            f.write("        if not name.startswith('dest_') or name.endswith('_hierarchy') or not os.path.isfile(filename):\n")
+            f.write("            continue\n")
+            f.write("        model = os.path.splitext(os.path.basename(uncompressed_name(filename)))[0]\n")
+            f.write("        if not models or model in models:\n")
+            f.write("            result.append((model, filename))\n")
+            f.write("    return result\n\n\n")
+            f.write("def load_options(filename):\n")
+            f.write("    # Return the ignored columns and the context of the first load command of an import file\n")
+            f.write("    for script in sorted(glob.glob('*.sh') + glob.glob('*.cmd')):\n")
+            f.write("        with open(script, 'r') as f:\n")
+            f.write("            for line in f:\n")
+            f.write("                if 'odoo_import_thread.py' in line and imports_file(line, filename):\n")
+            f.write("                    ignore = re.search(r'--ignore=(\\S*)', line)\n")
+            f.write("                    context = re.search(r'--context=\"([^\"]*)\"', line)\n")
+            f.write("                    return (ignore.group(1).split(',') if ignore and ignore.group(1) else [],\n")
+            f.write("                            ast.literal_eval(context.group(1)) if context else {})\n")
+            f.write("    return [], {}\n\n\n")
+            f.write("def records(reader, id_index):\n")
+            f.write("    # The lines without id belong to the record of the previous line\n")
+            f.write("    record = []\n")
+            f.write("    for row in reader:\n")
+            f.write("        if record and (id_index is None or (id_index < len(row) and row[id_index])):\n")
+            f.write("            yield record\n")
+            f.write("            record = []\n")
+            f.write("        record.append(row)\n")
+            f.write("    if record:\n")
+            f.write("        yield record\n\n\n")
+            f.write("def value_format(value):\n")
+            f.write("    return re.sub(r'[^\\W\\d_]+', 'a', re.sub(r'\\d+', '9', value))\n\n\n")
+            f.write("def sample_records(filename, stratify, size=SAMPLE_SIZE, max_values=MAX_VALUES):\n")
+            f.write("    # Return the header, the sampled records, the number of records and the columns with too many values.\n")
+            f.write("    # stratify(header) returns the indexes of the columns whose distinct values are sampled.\n")
+            f.write("    rng = random.Random(0)\n")
+            f.write("    covered = set()\n")
+            f.write("    values = {}\n")
+            f.write("    picked = []\n")
+            f.write("    reservoir = []\n")
+            f.write("    seen = 0\n")
+            f.write("    with io.TextIOWrapper(open_data_file(filename, 'rb'), encoding='utf-8', newline='') as f:\n")
+            f.write("        reader = csv.reader(f, delimiter=DELIMITER)\n")
+            f.write("        header = next(reader)\n")
+            f.write("        id_index = header.index('id') if 'id' in header else None\n")
+            f.write("        stratified = stratify(header)\n")
+            f.write("        count = 0\n")
+            f.write("        for index, record in enumerate(records(reader, id_index)):\n")
+            f.write("            count += 1\n")
+            f.write("            keys = set()\n")
+            f.write("            for row in record:\n")
+            f.write("                for column, value in enumerate(row):\n")
+            f.write("                    if value:\n")
+            f.write("                        keys.add((column, None))\n")
+            f.write("                        keys.add((column, value if column in stratified else value_format(value)))\n")
+            f.write("            new = set(k for k in keys if k not in covered and (k[1] is None or values.get(k[0], 0) < max_values))\n")
+            f.write("            if new:\n")
+            f.write("                covered.update(new)\n")
+            f.write("                for column, value in new:\n")
+            f.write("                    if value is not None:\n")
+            f.write("                        values[column] = values.get(column, 0) + 1\n")
+            f.write("                picked.append((index, record))\n")
+            f.write("                continue\n")
+            f.write("            # Reservoir sampling of the other records\n")
+            f.write("            seen += 1\n")
+            f.write("            if len(reservoir) < size:\n")
+            f.write("                reservoir.append((index, record))\n")
+            f.write("            else:\n")
+            f.write("                j = rng.randint(0, seen - 1)\n")
+            f.write("                if j < size:\n")
+            f.write("                    reservoir[j] = (index, record)\n")
+            f.write("    capped = [header[column] for column, count_values in sorted(values.items()) if count_values >= max_values]\n")
+            f.write("    return header, [record for index, record in sorted(picked + reservoir, key=lambda r: r[0])], count, capped\n\n\n")
+            f.write("def stratified_columns(connection, model, header):\n")
+            f.write("    # Relational and selection columns, whose distinct values are all sampled\n")
+            f.write("    field_types = connection.get_model(model).fields_get([], ['type'])\n")
+            f.write("    return set(i for i, column in enumerate(header)\n")
+            f.write("               if '/' in column or field_types.get(column, {}).get('type') in RELATIONAL_TYPES)\n\n\n")
+            f.write("def dryrun(connection, model, header, rows, ignore, context):\n")
+            f.write("    # Import the rows in test mode, rolled back by the server, and return the messages\n")
+            f.write("    data = io.StringIO()\n")
+            f.write("    writer = csv.writer(data, delimiter=DELIMITER, quoting=csv.QUOTE_ALL)\n")
+            f.write("    writer.writerow(header)\n")
+            f.write("    writer.writerows(rows)\n")
+            f.write("    wizard = connection.get_model('base_import.import')\n")
+            f.write("    wizard_id = wizard.create({'res_model': model, 'file': data.getvalue(), 'file_name': '%s.csv' % model, 'file_type': 'text/csv'})\n")
+            f.write("    fields = [False if column in ignore else column for column in header]\n")
+            f.write("    options = {'headers': True, 'has_headers': True, 'separator': DELIMITER, 'quoting': '\"', 'encoding': 'utf-8',\n")
+            f.write("               'date_format': '', 'datetime_format': '', 'float_thousand_separator': '', 'float_decimal_separator': '.',\n")
+            f.write("               'advanced': True, 'keep_matches': False, 'name_create_enabled_fields': {},\n")
+            f.write("               'import_set_empty_fields': [], 'import_skip_records': []}\n")
+            f.write("    try:\n")
+            f.write("        result = wizard.execute_import([wizard_id], fields, header, options, dryrun=True, context=context)\n")
+            f.write("    except Exception as e:\n")
+            f.write("        if 'execute_import' not in str(e):\n")
+            f.write("            raise\n")
+            f.write("        # Before Odoo 13\n")
+            f.write("        result = wizard.do([wizard_id], fields, header, options, dryrun=True, context=context)\n")
+            f.write("    return result.get('messages', []) if isinstance(result, dict) else result\n\n\n")
+            f.write("def cause(message):\n")
+            f.write("    # Message without its values, to group the errors of the same cause\n")
+            f.write("    return re.sub(r'\\d+', 'N', re.sub(r\"'[^']*'|\\\"[^\\\"]*\\\"\", \"'...'\", message))\n\n\n")
+            f.write("def group_errors(messages, rows, id_index):\n")
+            f.write("    groups = {}\n")
+            f.write("    for message in messages:\n")
+            f.write("        text = message.get('message', '')\n")
+            f.write("        row = (message.get('rows') or {}).get('from', message.get('record'))\n")
+            f.write("        record_id = rows[row][id_index] if id_index is not None and row is not None and 0 <= row < len(rows) else ''\n")
+            f.write("        key = (message.get('type', 'error'), message.get('field') or '', cause(text))\n")
+            f.write("        group = groups.setdefault(key, {'type': key[0], 'field': key[1], 'cause': key[2], 'count': 0, 'example': text, 'ids': []})\n")
+            f.write("        group['count'] += 1\n")
+            f.write("        if record_id and len(group['ids']) < 10:\n")
+            f.write("            group['ids'].append(record_id)\n")
+            f.write("    return sorted(groups.values(), key=lambda g: (g['type'] != 'error', -g['count']))\n\n\n")
+            f.write("def smoke(connection, model, filename, size=SAMPLE_SIZE, max_values=MAX_VALUES):\n")
+            f.write("    stratify = lambda header: stratified_columns(connection, model, header)\n")
+            f.write("    header, sample, count, capped = sample_records(filename, stratify, size, max_values)\n")
+            f.write("    rows = [row for record in sample for row in record]\n")
+            f.write("    with io.open(os.path.join(LOG_DIR, 'smoke_%s.csv' % model), 'w', encoding='utf-8', newline='') as f:\n")
+            f.write("        writer = csv.writer(f, delimiter=DELIMITER, quoting=csv.QUOTE_ALL)\n")
+            f.write("        writer.writerow(header)\n")
+            f.write("        writer.writerows(rows)\n")
+            f.write("    ignore, context = load_options(filename)\n")
+            f.write("    messages = dryrun(connection, model, header, rows, ignore, context) if rows else []\n")
+            f.write("    errors = group_errors(messages, rows, header.index('id') if 'id' in header else None)\n")
+            f.write("    return {'records': count, 'sampled': len(sample), 'rows': len(rows), 'capped_columns': capped, 'errors': errors}\n\n\n")
+            f.write("def print_report(model, result):\n")
+            f.write("    print('%s: %s of %s records sampled (%s lines), %s' % (model, result['sampled'], result['records'], result['rows'],\n")
+            f.write("          '%s error causes' % len(result['errors']) if result['errors'] else 'no error'))\n")
+            f.write("    if result['capped_columns']:\n")
+            f.write("        print('    Not all the values or formats sampled in %s' % ', '.join(result['capped_columns']))\n")
+            f.write("    for group in result['errors']:\n")
+            f.write("        print('    %6s %-7s %-25s %s' % (group['count'], group['type'], group['field'], group['cause']))\n")
+            f.write("        print('           e.g. %s%s' % (group['example'], ' (%s)' % ', '.join(group['ids'][:3]) if group['ids'] else ''))\n\n\n")
+            f.write("if __name__ == '__main__':\n")
+            f.write("    parser = argparse.ArgumentParser(description='Test the load of a sample of the import files, rolled back by the server')\n")
+            f.write("    parser.add_argument('models', nargs='*', help='models to test (default: all the import files of files.py)')\n")
+            f.write("    parser.add_argument('-c', '--config', default=files.config_file, help='connection file of the test database (default: %s)' % files.config_file)\n")
+            f.write("    parser.add_argument('--size', type=int, default=SAMPLE_SIZE, help='random records added to the sample (default: %s)' % SAMPLE_SIZE)\n")
+            f.write("    parser.add_argument('--max-values', type=int, default=MAX_VALUES, help='distinct values sampled per relational or selection column (default: %s)' % MAX_VALUES)\n")
+            f.write("    args = parser.parse_args()\n")
+            f.write("    connection = conf_lib.get_server_connection(args.config)\n")
+            f.write("    report = {}\n")
+            f.write("    for model, filename in import_files(args.models):\n")
+            f.write("        report[model] = smoke(connection, model, filename, args.size, args.max_values)\n")
+            f.write("        print_report(model, report[model])\n")
+            f.write("    if not report:\n")
+            f.write("        print('No import file found')\n")
+            f.write("        sys.exit(0)\n")
+            f.write("    with open(os.path.join(LOG_DIR, 'smoke_report.json'), 'w') as f:\n")
+            f.write("        json.dump(report, f, indent=4, sort_keys=True)\n")
+            f.write("    print('Report saved in %s' % os.path.join(LOG_DIR, 'smoke_report.json'))\n")
+            f.write("    sys.exit(1 if any(g['type'] == 'error' for r in report.values() for g in r['errors']) else 0)\n")
+
+
+    def scaffold_dir(self):
+        """
+        Create the whole directory structure and the basic project files.
+        """
+        self.create_folder(self.conf_dir)
+        self.create_folder(self.orig_dir)
+        self.create_folder(self.orig_raw_dir)
+        self.create_folder(self.data_dir)
+        self.create_folder(self.log_dir)
+
+        self.create_connection_file_local(os.path.join(self.conf_dir, 'connection.conf'))
+        self.create_connection_file_local(os.path.join(self.conf_dir, 'connection.local'))
+        self.create_connection_file_local(os.path.join(self.conf_dir, 'connection.source'))
+        self.create_connection_file_remote(os.path.join(self.conf_dir, 'connection.staging'), '.dev.odoo.com')
+        self.create_connection_file_remote(os.path.join(self.conf_dir, 'connection.master'), '.odoo.com')
+
+        self.create_cleanup_script(os.path.join(self.base_dir, '%s%s' % ('cleanup_data_dir', self.script_extension)))
+        self.create_transform_script(os.path.join(self.base_dir, '%s%s' % ('transform', self.script_extension)))
+        self.create_load_script(os.path.join(self.base_dir, '%s%s' % ('load', self.script_extension)))
+        self.create_file_prefix(os.path.join(self.base_dir, 'prefix.py'))
+        self.create_file_mapping(os.path.join(self.base_dir, 'mapping.py'))
+        self.create_file_files(os.path.join(self.base_dir, 'files.py'))
+        self.create_file_lib(os.path.join(self.base_dir, 'funclib.py'))
+        self.create_file_clean_data(os.path.join(self.base_dir, 'clean_data.py'))
+        self.create_file_install_lang(os.path.join(self.base_dir, 'install_lang.py'))
+        self.create_file_install_modules(os.path.join(self.base_dir, 'install_modules.py'))
+        self.create_file_uninstall_modules(os.path.join(self.base_dir, 'uninstall_modules.py'))
+        self.create_file_init_map(os.path.join(self.base_dir, 'init_map.py'))
+        self.create_file_pre_load(os.path.join(self.base_dir, 'pre_load.py'))
+        self.create_file_post_load(os.path.join(self.base_dir, 'post_load.py'))
+        self.create_file_recompute(os.path.join(self.base_dir, 'recompute.py'))
+        self.create_file_loadlib(os.path.join(self.base_dir, 'loadlib.py'))
+        self.create_file_load_report(os.path.join(self.base_dir, 'load_report.py'))
+        self.create_file_check_duplicates(os.path.join(self.base_dir, 'check_duplicates.py'))
+        self.create_file_reconcile(os.path.join(self.base_dir, 'reconcile.py'))
+        self.create_file_partition_load(os.path.join(self.base_dir, 'partition_load.py'))
+        self.create_file_build(os.path.join(self.base_dir, 'build.py'))
+        self.create_file_smoke_load(os.path.join(self.base_dir, 'smoke_load.py'))
+
+        sys.stdout.write("Project created in %s\n" % os.path.abspath(self.base_dir))
+
+    ##############################################################################
+    # FUNCTIONS FOR MODEL SKELETON CODE
+    ##############################################################################
+
+
+    def load_fields(self):
+        """
+        Build the model fields list, fetched as defined in the target database.
+        """
+        self.has_tracked_fields, self.has_computed_fields =  False, False
+        self.self_ref_fields = []
+        self.computed_fields = []
+        self.translated_fields = []
+        connection = conf_lib.get_server_connection(self.config)
+        model_fields = connection.get_model('ir.model.fields')
+
+        # Apply the fields selection options on the server side
+        domain = [('model', '=', self.model), ('name', '!=', '__last_update')]
+        if self.wstored:
+            domain.append(('store', '=', True))
+        if not self.wo2m or self.split_o2m:
+            domain.append(('ttype', '!=', 'one2many'))
+        if not self.wmetadata:
+            domain.append(('name', 'not in', metadata_fields))
+
+        # Only read the attributes used by ModelField and known by this Odoo version
+        available = model_fields.fields_get([], ['type'])
+        attributes = [a for a in model_field_attributes if a in available]
+
+        fields = model_fields.search_read(domain, attributes)
+
+        # Detect the inherited features by their fields, whatever the selection options
+        markers = [marker for marker, ctx_keys in load_context_features]
+        self.inherited_features = set(f['name'] for f in model_fields.search_read([('model', '=', self.model), ('name', 'in', markers)], ['name']))
+
+        # One2many fields to generate as separate models (option --split-o2m)
+        self.o2m_children = []
+        if self.split_o2m and not self.parent_link:
+            o2m_fields = model_fields.search_read([('model', '=', self.model), ('ttype', '=', 'one2many')], ['name', 'relation', 'relation_field'])
+            for field in sorted(o2m_fields, key=lambda f: f['name']):
+                if not field['relation_field'] or field['relation'] == self.model or field['relation'] in split_o2m_excluded:
+                    continue
+                if field['relation'] not in [c[1] for c in self.o2m_children]:
+                    self.o2m_children.append((field['name'], field['relation'], field['relation_field']))
+
+        ret = []
+        for field in fields:
+            f = ModelField(self, connection, field)
+            self.has_tracked_fields = self.has_tracked_fields or f.track_visibility
+            self.has_computed_fields = self.has_computed_fields or len(f.compute) > 1
+            if f.type == 'many2one' and f.relation == self.model and f.store:
+                self.self_ref_fields.append(f)
+            if len(f.compute) > 1 and f.store:
+                self.computed_fields.append(f)
+            if f.translate and f.store and f.type in ('char', 'text', 'html') and not f.related:
+                self.translated_fields.append(f)
+            ret.append(f)
+        return ret
+
+
+    def write_begin(self, file):
+        """
+        Write the beginning of the generated python script.
+        """
+        file.write("# -*- coding: utf-8 -*-\n")
+        file.write("\n")
+        file.write("from odoo_csv_tools.lib import mapper\n")
+        file.write("from odoo_csv_tools.lib.transform import Processor\n")
+        file.write("from prefix import *\n")
+        file.write("from mapping import *\n")
+        if self.mapsel and self.dbname and not self.offline:
+            file.write("from %s import *\n" % self.mapsel_module())
+        file.write("from files import *\n")
+        file.write("from funclib import *\n")
+        file.write("from datetime import datetime\n")
+        if self.sharded:
+            file.write("from multiprocessing import cpu_count\n")
+        file.write("\n")
+        file.write("# Needed for RPC calls\n")
+        if self.m2o_by_name and self.dbname and not self.offline:
+            file.write("import odoolib\n")
+            file.write("from odoo_csv_tools.lib import conf_lib\n")
+            file.write("connection = conf_lib.get_server_connection(config_file)\n")
+        else:
+            file.write("# import odoolib\n")
+            file.write("# from odoo_csv_tools.lib import conf_lib\n")
+            file.write("# connection = conf_lib.get_server_connection(config_file)\n")
+        file.write("\n")
+        file.write("def preprocess_%s(header, data):\n" % self.model_class_name)
+        file.write("    # Do nothing\n")
+        file.write("    return header, data\n")
+        file.write("    #\n")
+        file.write("    # Add a column\n")
+        file.write("    # header.append('NEW_COLUMN')\n")
+        file.write("    # for i, j in enumerate(data):\n")
+        file.write("    #     data[i].append(NEW_VALUE)\n")
+        file.write("    #\n")
+        file.write("    # Keep lines that match a criteria\n")
+        file.write("    # data_new = []\n")
+        file.write("    # for i, j in enumerate(data):\n")
+        file.write("    #     line = dict(zip(header, j))\n")
+        file.write("    #     if line['CSV_COLUMN'].....\n")
+        file.write("    #         data_new.append(j)\n")
+        file.write("    # return header, data_new\n")
+        file.write("\n")
+
+
+    def write_end(self, file):
+        """
+        Write the end of the generated python script.
+        """
+        ctx = ''
+        ctx_opt = []
+
+        if self.dbname and not self.offline:
+            if self.has_tracked_fields:
+                ctx_opt.append("'tracking_disable': True")
+            if self.has_computed_fields:
+                ctx_opt.append("'defer_fields_computation': True")
+            if self.wmetadata:
+                ctx_opt.append("'write_metadata': True")
+            for marker, ctx_keys in load_context_features:
+                if marker in self.inherited_features:
+                    ctx_opt.extend(k for k in ctx_keys if k not in ctx_opt)
+            ctx_opt.extend(k for k in load_context_models.get(self.model, []) if k not in ctx_opt)
+
+        if len(ctx_opt):
+            ctx = "'context': \"{%s}\", " % ', '.join(ctx_opt)
+
+        import_args = "{'model': '%s', %s'groupby': '', 'worker': DEFAULT_WORKER, 'batch_size': DEFAULT_BATCH_SIZE}" % (self.model, ctx)
+
+        # Self-referencing fields are loaded in a second pass grouped by parent
+        hierarchy = [f.get_mapping_name() for f in self.self_ref_fields] if self.dbname and not self.offline else []
+        hierarchy_args = "{'model': '%s', %s'groupby': %%s, 'worker': DEFAULT_WORKER, 'batch_size': DEFAULT_BATCH_SIZE}" % (self.model, ctx)
+        hierarchy_comment = "# Self-referencing fields are loaded in a second pass, when all records exist, only for the records\n" \
+                            "# having a value in them, grouped by parent (the first of these fields) so that no two workers\n" \
+                            "# update the same branch of the hierarchy.\n"
+
+        # file.write("processor.process(%s, dest_%s, {'model': '%s', %s'groupby': '', 'ignore': '', 'worker': %s, 'batch_size': %s}, 'set', verbose=False)\n\n" % (model_mapping_name, model_mapped_name, model, ctx, default_worker, default_batch_size))
+        if self.sharded:
+            file.write("if __name__ == '__main__':\n")
+            file.write("    # Transform the client file by shards of lines on a pool of processes.\n")
+            file.write("    # Each process imports this script to get the mapping: keep the code above free of side effects.\n")
+            file.write("    header, data = transform_sharded(src_%s, os.path.splitext(os.path.basename(__file__))[0], '%s', 'preprocess_%s', delimiter='%s', shards=cpu_count())\n" % (self.model_mapped_name, self.model_mapping_name, self.model_class_name, self.csv_delimiter))
+            if hierarchy:
+                file.write("    %s" % hierarchy_comment.replace('\n#', '\n    #'))
+                file.write("    (header, data), hierarchy = split_columns(header, data, %s)\n" % hierarchy)
+            file.write("    processor = new_processor(header, data)\n")
+            file.write("    processor._add_data(header, data, uncompressed_name(dest_%s), %s)\n" % (self.model_mapped_name, import_args))
+            if hierarchy:
+                file.write("    if hierarchy:\n")
+                file.write("        processor._add_data(hierarchy[0], hierarchy[1], uncompressed_name(dest_%s_hierarchy), %s)\n" % (self.model_mapped_name, hierarchy_args % 'hierarchy[0][1]'))
+            file.write("    write_import_files(processor, '%s%s', %s, python_exe='%s', path='%s')\n" % (self.model_mapped_name, self.script_extension, self.import_files(hierarchy), self.default_python_exe, self.default_path))
+            file.write("\n")
+            if self.translated_fields and self.wtranslations:
+                file.write("    # Translations\n")
+                file.write("    processor = open_processor(src_%s, delimiter='%s', preprocess=preprocess_%s, projection=%s)\n" % (self.model_mapped_name, self.csv_delimiter, self.model_class_name, self.processor_projection()))
+                self.write_translations(file, ctx_opt, '    ')
+            return
+
+        if self.skeleton == 'row' and self.dbname and not self.offline:
+            file.write("# Verify the flat transformation against the mapping dictionary on the first lines\n")
+            file.write("check_transform_row(processor, %s, header_%s, transform_row_%s)\n\n" % (self.model_mapping_name, self.model_mapped_name, self.model_mapped_name))
+            if hierarchy:
+                file.write(hierarchy_comment)
+                file.write("(header, data), hierarchy = split_columns(header_%s, transform_rows(processor.data, transform_row_%s, header_%s), %s)\n" % (self.model_mapped_name, self.model_mapped_name, self.model_mapped_name, hierarchy))
+                file.write("processor._add_data(header, data, uncompressed_name(dest_%s), %s)\n" % (self.model_mapped_name, import_args))
+                file.write("if hierarchy:\n")
+                file.write("    processor._add_data(hierarchy[0], hierarchy[1], uncompressed_name(dest_%s_hierarchy), %s)\n\n" % (self.model_mapped_name, hierarchy_args % 'hierarchy[0][1]'))
+            else:
+                file.write("processor._add_data(header_%s, transform_rows(processor.data, transform_row_%s, header_%s), uncompressed_name(dest_%s), %s)\n\n" % (self.model_mapped_name, self.model_mapped_name, self.model_mapped_name, self.model_mapped_name, import_args))
+        else:
+            if hierarchy:
+                file.write(hierarchy_comment)
+                file.write("hierarchy_%s = [k for k in %s if k in %s]\n" % (self.model_mapped_name, hierarchy, self.model_mapping_name))
+                file.write("%s_hierarchy = dict([('id', %s['id'])] + [(k, %s.pop(k)) for k in hierarchy_%s])\n\n" % (self.model_mapping_name, self.model_mapping_name, self.model_mapping_name, self.model_mapped_name))
+            file.write("process_ordered(processor, %s, uncompressed_name(dest_%s), %s)\n" % (self.model_mapping_name, self.model_mapped_name, import_args))
+            if hierarchy:
+                file.write("if hierarchy_%s:\n" % self.model_mapped_name)
+                file.write("    process_ordered(processor, %s_hierarchy, uncompressed_name(dest_%s_hierarchy), %s, required=hierarchy_%s)\n" % (self.model_mapping_name, self.model_mapped_name, hierarchy_args % ('hierarchy_%s[0]' % self.model_mapped_name), self.model_mapped_name))
+            file.write("\n")
+        file.write("write_import_files(processor, '%s%s', %s, python_exe='%s', path='%s')\n" % (self.model_mapped_name, self.script_extension, self.import_files(hierarchy), self.default_python_exe, self.default_path))
+        file.write("\n")
+        if self.translated_fields and self.wtranslations:
+            self.write_translations(file, ctx_opt)
+
+
+    def import_files(self, hierarchy):
+        """
+        Return the list of the import files of the model written by the generated script.
+        """
+        if hierarchy:
+            condition = 'hierarchy' if self.sharded or self.skeleton == 'row' else 'hierarchy_%s' % self.model_mapped_name
+            return '[dest_%s] + ([dest_%s_hierarchy] if %s else [])' % (self.model_mapped_name, self.model_mapped_name, condition)
+        return '[dest_%s]' % self.model_mapped_name
+
+
+    def processor_projection(self):
+        """
+        Return the list of the mappings and functions whose referenced columns are read in the client file.
+        """
+        projection = "[%s, preprocess_%s]" % (self.model_mapping_name, self.model_class_name)
+        if self.translated_fields and self.wtranslations:
+            projection += " + [translation_%s(lang_key) for lang_key in res_lang_map]" % self.model_mapping_name
+        return projection
+
+
+    def write_processor(self, file):
+        """
+        Write the creation of the processor, reading only the client file columns used by the mapping.
+        """
+        file.write("# Only the client file columns referenced by the mapping and the preprocess function are read.\n")
+        file.write("# Remove the projection to read all of them, e.g. if a column name is built at runtime.\n")
+        file.write("processor = open_processor(src_%s, delimiter='%s', preprocess=preprocess_%s, projection=%s)\n\n" % (self.model_mapped_name, self.csv_delimiter, self.model_class_name, self.processor_projection()))
+
+
+    def write_translation_mapping(self, file):
+        """
+        Write the function returning the mapping of the translatable fields for a language.
+        """
+        translation_mapping_name = 'translation_%s' % self.model_mapping_name
+        file.write("# Translations of the translatable fields, loaded after the main file by the language in the context.\n")
+        file.write("# The translated values are read in the client file columns <column>_<language key of res_lang_map>.\n")
+        file.write("# One load script per language of res_lang_map, loading one import file per field with the xml_ids of the\n")
+        file.write("# main file whose translated value is filled, so that the empty cells never blank the existing values.\n")
+        file.write("# The fields whose column is missing in the client file are not translated in this language.\n")
+        file.write("def %s(lang_key):\n" % translation_mapping_name)
+        file.write("    return {\n")
+        for f in sorted(self.translated_fields, key=lambda f: f.name):
+            line_start = '# ' if f.is_commented() else ''
+            file.write("        # %s\n" % f.get_info().replace('\n    #', '\n        #'))
+            file.write("        %s'%s': '%s_%%s' %% lang_key,\n" % (line_start, f.name, f.get_columns()[0]))
+        file.write("    }\n\n")
+
+
+    def write_translations(self, file, ctx_opt, indent=''):
+        """
+        Write the transformation of the translatable fields into one import file and one load script per language.
+        """
+        translation_mapping_name = 'translation_%s' % self.model_mapping_name
+        ctx = ', '.join(["'lang': '%s'"] + [k for k in ctx_opt if 'defer_fields_computation' not in k])
+        import_args = "{'model': '%s', 'context': \"{%s}\" %% lang, 'groupby': '', 'worker': DEFAULT_WORKER, 'batch_size': DEFAULT_BATCH_SIZE}" % (self.model, ctx)
+        script = "'%s%s'" % (self.model_mapped_name, self.script_extension)
+        file.write("%sfor lang_key, lang in res_lang_map.items():\n" % indent)
+        file.write("%s    translation = new_processor(processor.header, processor.data)\n" % indent)
+        file.write("%s    columns = dict((field, column) for field, column in %s(lang_key).items() if column in processor.header)\n" % (indent, translation_mapping_name))
+        file.write("%s    for field, column in columns.items():\n" % indent)
+        file.write("%s        mapping = {'id': %s['id'], field: mapper.val(column, skip=True)}\n" % (indent, self.model_mapping_name))
+        file.write("%s        translation.process(mapping, uncompressed_name(translation_file(dest_%s, lang, field)), %s, 'set', verbose=False)\n" % (indent, self.model_mapped_name, import_args))
+        file.write("%s    if columns:\n" % indent)
+        file.write("%s        write_import_files(translation, translation_file(%s, lang), [translation_file(dest_%s, lang, field) for field in columns], python_exe='%s', path='%s')\n" % (indent, script, self.model_mapped_name, self.default_python_exe, self.default_path))
+        file.write("\n")
+
+
+    def skeleton_fields(self):
+        """
+        Return the model fields in the order of the skeleton code: id, required fields, other fields.
+        """
+        return sorted(self.load_fields(), key=lambda f: ((f.name != 'id'), not f.is_required(), f.name))
+
+
+    def write_mapping(self, file):
+        """
+        Write the fields mapping of the generated python script. Return the fields of the mapping.
+        """
+        if not self.dbname or self.offline:
+            file.write("%s = {\n    'id': ,\n}\n\n" % self.model_mapping_name)
+            if not self.sharded:
+                self.write_processor(file)
+            return None
+
+        fields = self.skeleton_fields()
+
+        if self.m2o_by_name:
+            self.write_name_maps(file, fields)
+
+        if self.skeleton in ('dict', 'row'):
+            file.write('%s = {\n' % self.model_mapping_name)
+            for f in fields:
+                if self.verbose: sys.stdout.write('Write field %s\n' % f.name)
+                line_start = '# ' if f.is_commented() else ''
+                file.write ("    # %s\n" % f.get_info())
+                file.write("    %s'%s': %s,\n" % (line_start,f.get_mapping_name(), f.get_mapper_command().replace('OBJECT_XMLID_PREFIX', 'PREFIX_%s' % self.model_mapped_name.upper())))
+            file.write('}\n\n')
+
+        elif self.skeleton == 'map':
+            function_prefix = 'handle_%s_' % self.model_mapped_name
+            for f in fields:
+                if self.verbose: sys.stdout.write('Write map function of field %s\n' % f.name)
+                line_start = '# ' if f.is_commented() else ''
+                file.write ("%sdef %s%s(line):\n" % (line_start, function_prefix, f.name))
+                file.write ("%s    return %s(line)\n\n" % (line_start,f.get_mapper_command().replace('OBJECT_XMLID_PREFIX', 'PREFIX_%s' % self.model_mapped_name.upper())))
+
+            file.write('%s = {\n' % self.model_mapping_name)
+            for f in fields:
+                if self.verbose: sys.stdout.write('Write field %s\n' % f.name)
+                line_start = '# ' if f.is_commented() else ''
+                file.write ("    # %s\n" % f.get_info())
+                file.write ("    %s'%s': %s,\n" % (line_start,f.get_mapping_name(), '%s%s' % (function_prefix, f.name)))
+            file.write('}\n\n')
+
+        if self.translated_fields and self.wtranslations:
+            self.write_translation_mapping(file)
+
+        if not self.sharded:
+            self.write_processor(file)
+
+        if self.skeleton == 'row':
+            self.write_row_function(file, fields)
+
+
+        return fields
+
+
+    def write_mapsel(self, file, fields):
+        """
+        Write the mapping module of the selection fields, imported by the python script (option --map-selection).
+        """
+        file.write("# -*- coding: utf-8 -*-\n\n")
+        file.write("# Mapping dictionaries of the selection fields of the model %s.\n" % self.model)
+        file.write("# Only imported by its transformation script.\n\n")
+        for f in filter(lambda x: x.type == 'selection', fields):
+            if self.verbose: sys.stdout.write('Write mapping of selection field %s\n' % f.name)
+            line_start = '# ' if f.is_commented() else ''
+            file.write("%s%s_%s_map = {\n" % (line_start, self.model_mapped_name, f.name))
+            for sel in f.selection:
+                key, val = sel.split(selection_sep)
+                file.write('%s    "%s": %s,\n' % (line_start, val.strip(), key.strip()))
+            file.write("%s}\n\n" % line_start)
+
+
+    def write_name_maps(self, file, fields):
+        """
+        Write one prefetch of the existing records per model related to the many2one fields (option --m2o-by-name).
+        """
+        relations = {}
+        for f in filter(lambda x: x.uses_name_map(), fields):
+            relations.setdefault(f.relation, []).append(f)
+        if not relations:
+            return
+        connection = conf_lib.get_server_connection(self.config)
+        model_fields = connection.get_model('ir.model.fields')
+        named = set(f['model'] for f in model_fields.search_read([('model', 'in', sorted(relations)), ('name', '=', 'name')], ['model']))
+
+        file.write("# Existing records referenced by name in the client file: {name: xml_id}. REVIEW THE NAME FIELDS\n")
+        file.write("# The names not found are mapped to the xml_id built with the prefix of the model.\n")
+        for relation, rel_fields in sorted(relations.items()):
+            if self.verbose: sys.stdout.write('Write name map of model %s\n' % relation)
+            line_start = '# ' if all(f.is_commented() for f in rel_fields) else ''
+            file.write("%s%s = build_name_map(connection, '%s', '%s')\n" % (line_start, rel_fields[0].get_name_map(), relation, 'name' if relation in named else 'display_name'))
+        file.write("\n")
+
+
+    def mapsel_module(self):
+        """
+        Return the name of the module holding the mapping dictionaries of the selection fields of the model.
+        """
+        return 'map_%s' % self.model_mapped_name
+
+
+    def write_row_function(self, file, fields):
+        """
+        Write a flat function computing a whole output line of the generated python script.
+        It gives the same result as the mapping dictionary without calling one mapper per field.
+        """
+        object_prefix = 'PREFIX_%s' % self.model_mapped_name.upper()
+        file.write("# Flat transformation of a client file line. It must give the same result as %s.\n" % self.model_mapping_name)
+        file.write("# Review it the same way. Each line below matches a field of the mapping dictionary.\n")
+        file.write("# Only the columns referenced by the mapping dictionary are read (see the projection of the processor).\n")
+        file.write("# Column positions in the client file (missing columns point to an empty cell)\n")
         for f in fields:
-            if verbose: sys.stdout.write('Write field %s\n' % f.name)
-            line_start = '# ' if (required and not f.is_required() and f.name != 'id') or f.import_warn_msg else ''
-            file.write ("    # %s\n" % f.get_info())
-            file.write("    %s'%s': %s,\n" % (line_start,f.get_mapping_name(), f.get_mapper_command().replace('OBJECT_XMLID_PREFIX', 'PREFIX_%s' % model_mapped_name.upper())))
-        file.write('}\n\n')
-            
-    elif skeleton == 'map':
-        function_prefix = 'handle_%s_' % model_mapped_name
+            line_start = '# ' if f.is_commented() else ''
+            for var, column in zip(f.get_column_vars(), f.get_columns()):
+                file.write("%s%s = column_index(processor.header, '%s')\n" % (line_start, var, column))
+        file.write("\n")
+
+        # Fields without inlined expression are computed by their mapper
         for f in fields:
-            if verbose: sys.stdout.write('Write map function of field %s\n' % f.name)
-            line_start = '# ' if (required and not f.is_required()) or f.import_warn_msg else ''
-            file.write ("%sdef %s%s(line):\n" % (line_start, function_prefix, f.name))
-            file.write ("%s    return %s(line)\n\n" % (line_start,f.get_mapper_command().replace('OBJECT_XMLID_PREFIX', 'PREFIX_%s' % model_mapped_name.upper())))
-        
-        file.write('%s = {\n' % model_mapping_name)
+            if f.get_row_command() is None:
+                line_start = '# ' if f.is_commented() else ''
+                file.write("%smapper_%s_%s = %s\n" % (line_start, self.model_mapped_name, f.name, f.get_mapper_command()))
+        file.write("\n")
+
+        file.write("header_%s = [\n" % self.model_mapped_name)
+        for f in fields:
+            line_start = '# ' if f.is_commented() else ''
+            file.write("    %s'%s',\n" % (line_start, f.get_mapping_name()))
+        file.write("]\n\n")
+
+        file.write("def transform_row_%s(line):\n" % self.model_mapped_name)
+        file.write("    return (\n")
+        for f in fields:
+            line_start = '# ' if f.is_commented() else ''
+            command = f.get_row_command()
+            if command is None:
+                columns = ', '.join("'%s': line[%s]" % (c, v) for c, v in zip(f.get_columns(), f.get_column_vars()))
+                command = "mapper_%s_%s({%s})" % (self.model_mapped_name, f.name, columns)
+            file.write("        %s%s,\n" % (line_start, command.replace('OBJECT_XMLID_PREFIX', object_prefix)))
+        file.write("    )\n\n")
+
+
+    def write_extractor(self, file, fields):
+        """
+        Write the script extracting the model from the source database into its client file (option --with-extractor).
+        """
+        file.write("# -*- coding: utf-8 -*-\n\n")
+        file.write("# This script extracts the model %s from the source database (conf/connection.source)\n" % self.model)
+        file.write("# into its client file, in the column layout of %s (option --with-xmlid).\n" % os.path.basename(self.outfile))
+        file.write("# The records are read by ranges of ids on a pool of workers and written in the order of their ids.\n\n")
+        file.write("import os\n")
+        file.write("import io\n")
+        file.write("import sys\n")
+        file.write("import csv\n")
+        file.write("import time\n")
+        file.write("import base64\n")
+        file.write("from multiprocessing.pool import ThreadPool\n")
+        file.write("import odoolib\n")
+        file.write("from odoo_csv_tools.lib import conf_lib\n")
+        file.write("from files import *\n")
+        file.write("from funclib import open_data_file\n\n")
+        file.write("source_config_file = os.path.join(conf_dir, 'connection.source')\n")
+        file.write("output_file = globals().get('src_%s', os.path.join(data_src_dir, '%s.csv'))\n\n" % (self.model_mapped_name, self.model_mapped_name))
+        file.write("MODEL = '%s'\n" % self.model)
+        file.write("# Number of ids read by a worker at once\n")
+        file.write("PARTITION_SIZE = 1000\n")
+        file.write("MAX_WORKER = 4\n")
+        file.write("DELIMITER = '%s'\n" % self.csv_delimiter)
+        file.write("# Records to extract\n")
+        file.write("DOMAIN = []\n")
+        file.write("CONTEXT = {'active_test': False}\n")
+        file.write("# Write the labels of the selection fields instead of their keys (option --map-selection)\n")
+        file.write("SELECTION_LABELS = %s\n\n" % bool(self.mapsel))
+        file.write("# (field, column, type, relation) in the column layout of the skeleton\n")
+        file.write("FIELDS = [\n")
         for f in fields:
-            if verbose: sys.stdout.write('Write field %s\n' % f.name)
-            line_start = '# ' if (required and not f.is_required() and f.name != 'id') or f.import_warn_msg else ''
-            file.write ("    # %s\n" % f.get_info())
-            file.write ("    %s'%s': %s,\n" % (line_start,f.get_mapping_name(), '%s%s' % (function_prefix, f.name)))
-        file.write('}\n\n')
-
-    # Add selection dictionaries if --map-selection
-    if mapsel:
-        if verbose: sys.stdout.write('Write mapping of selection fields\n')
+            if f.is_commented() or f.type == 'one2many':
+                continue
+            file.write("    ('%s', '%s', '%s', %s),\n" % (f.name, f.get_columns()[0], f.type, "'%s'" % f.relation if f.relation else False))
+        file.write("]\n\n")
+        file.write("connection = conf_lib.get_server_connection(source_config_file)\n")
+        file.write("model = connection.get_model(MODEL)\n")
+        file.write("model_data = connection.get_model('ir.model.data')\n")
+        file.write("selection_labels = {}\n\n\n")
+        file.write("def xml_ids(relation, ids):\n")
+        file.write("    # Return the xml_ids of records by chunks of ids. The records without xml_id get\n")
+        file.write("    # the name that an export of the source database would give them.\n")
+        file.write("    result = {}\n")
+        file.write("    ids = list(set(ids))\n")
+        file.write("    for i in range(0, len(ids), 1000):\n")
+        file.write("        for data in model_data.search_read([('model', '=', relation), ('res_id', 'in', ids[i:i + 1000])], ['module', 'name', 'res_id'], order='id'):\n")
+        file.write("            result.setdefault(data['res_id'], '%s.%s' % (data['module'], data['name']))\n")
+        file.write("    for i in ids:\n")
+        file.write("        result.setdefault(i, '__export__.%s_%s' % (relation.replace('.', '_'), i))\n")
+        file.write("    return result\n\n\n")
+        file.write("def format_value(record, name, ttype, relation, refs):\n")
+        file.write("    value = record[name]\n")
+        file.write("    if name == 'id':\n")
+        file.write("        return refs[MODEL][value]\n")
+        file.write("    if ttype == 'boolean':\n")
+        file.write("        return 'True' if value else 'False'\n")
+        file.write("    if value is False or value is None:\n")
+        file.write("        return ''\n")
+        file.write("    if ttype == 'many2one':\n")
+        file.write("        return refs[relation][value[0]]\n")
+        file.write("    if ttype == 'many2many':\n")
+        file.write("        return ','.join(refs[relation][i] for i in value)\n")
+        file.write("    if ttype == 'selection':\n")
+        file.write("        return selection_labels.get(name, {}).get(value, value)\n")
+        file.write("    if ttype == 'binary':\n")
+        file.write("        filename = '%s_%s_%s' % (MODEL.replace('.', '_'), name, record['id'])\n")
+        file.write("        with open(os.path.join(data_raw_dir, filename), 'wb') as f:\n")
+        file.write("            f.write(base64.b64decode(value))\n")
+        file.write("        return filename\n")
+        file.write("    return u'%s' % value\n\n\n")
+        file.write("def extract_partition(bounds):\n")
+        file.write("    # Read the records of a range of ids and resolve all their xml_ids in bulk\n")
+        file.write("    records = model.search_read(DOMAIN + [('id', '>=', bounds[0]), ('id', '<', bounds[1])], [f[0] for f in FIELDS], order='id', context=CONTEXT)\n")
+        file.write("    ids = {MODEL: [r['id'] for r in records]}\n")
+        file.write("    for name, column, ttype, relation in FIELDS:\n")
+        file.write("        if ttype == 'many2one':\n")
+        file.write("            ids.setdefault(relation, []).extend(r[name][0] for r in records if r[name])\n")
+        file.write("        elif ttype == 'many2many':\n")
+        file.write("            ids.setdefault(relation, []).extend(i for r in records for i in r[name])\n")
+        file.write("    refs = dict((relation, xml_ids(relation, relation_ids)) for relation, relation_ids in ids.items())\n")
+        file.write("    return [[format_value(r, name, ttype, relation, refs) for name, column, ttype, relation in FIELDS] for r in records]\n\n\n")
+        file.write("def partitions():\n")
+        file.write("    first = model.search_read(DOMAIN, ['id'], order='id', limit=1, context=CONTEXT)\n")
+        file.write("    last = model.search_read(DOMAIN, ['id'], order='id desc', limit=1, context=CONTEXT)\n")
+        file.write("    if not first:\n")
+        file.write("        return []\n")
+        file.write("    return [(lo, lo + PARTITION_SIZE) for lo in range(first[0]['id'], last[0]['id'] + 1, PARTITION_SIZE)]\n\n\n")
+        file.write("if __name__ == '__main__':\n")
+        file.write("    if SELECTION_LABELS:\n")
+        file.write("        for name, field in model.fields_get([f[0] for f in FIELDS if f[2] == 'selection'], ['selection']).items():\n")
+        file.write("            selection_labels[name] = dict(field['selection'])\n")
+        file.write("    bounds = partitions()\n")
+        file.write("    count = 0\n")
+        file.write("    start = time.time()\n")
+        file.write("    pool = ThreadPool(MAX_WORKER)\n")
+        file.write("    with io.TextIOWrapper(open_data_file(output_file, 'wb'), encoding='utf-8', newline='') as f:\n")
+        file.write("        writer = csv.writer(f, delimiter=DELIMITER)\n")
+        file.write("        writer.writerow([f[1] for f in FIELDS])\n")
+        file.write("        # The partitions are written in the order of their ids while the next ones are read\n")
+        file.write("        for i, rows in enumerate(pool.imap(extract_partition, bounds)):\n")
+        file.write("            writer.writerows(rows)\n")
+        file.write("            count += len(rows)\n")
+        file.write("            sys.stdout.write('\\r%s: %s records, %s/%s partitions (%.0fs)' % (MODEL, count, i + 1, len(bounds), time.time() - start))\n")
+        file.write("            sys.stdout.flush()\n")
+        file.write("    pool.close()\n")
+        file.write("    pool.join()\n")
+        file.write("    sys.stdout.write('\\n%s records extracted in %s\\n' % (count, output_file))\n")
+
+
+    def set_model(self, name, file=None):
+        """
+        Set the model to skeleton and the names derived from it.
+        """
+        self.model = name
+        self.model_mapped_name = self.model.replace('.', '_')
+        self.model_class_name = self.model.title().replace('.', '')
+        self.model_mapping_name = '_'.join(('mapping', self.model_mapped_name))
+        self.outfile = os.path.join(self.base_dir, file or '.'.join((self.model_mapped_name, 'py')))
+
+
+    def scaffold_children(self):
+        """
+        Create the python scripts of the one2many comodels, loaded after their parent (option --split-o2m).
+        """
+        parent = (self.model, self.model_mapped_name, self.model_class_name, self.model_mapping_name, self.outfile)
+        for name, relation, relation_field in self.o2m_children:
+            sys.stdout.write("Split one2many field %s of %s into model %s\n" % (name, parent[0], relation))
+            self.parent_link = (relation_field, parent[0])
+            self.set_model(relation)
+            self.scaffold_model()
+        self.parent_link = None
+        self.set_model(parent[0])
+        self.model_mapped_name, self.model_class_name, self.model_mapping_name, self.outfile = parent[1:]
+
+
+    def model_exists(self, model):
+        """
+        Return True if 'model' is scaffoldable.
+        """
+        connection = conf_lib.get_server_connection(self.config)
+        model_model = connection.get_model('ir.model')
+        res = model_model.search_count([('model', '=', model), ('transient', '=', False)])
+        return res != 0
+
+
+    def read_config(self):
+        """
+        Read the target database and host from the configuration file. Return the login and uid.
+        """
         if sys.version_info >= (3, 0, 0):
-            with open(os.path.join(base_dir, 'mapping.py'), 'a') as pf:
-                pf.write("# Selection fields in model %s\n\n" % model)
-                for f in filter(lambda x: x.type == 'selection', fields):
-                    sys.stdout.write('Write mapping of selection field %s\n' % f.name)
-                    line_start = '# ' if (required and not f.is_required()) else ''
-                    pf.write("%s%s_%s_map = {\n" % (line_start, model_mapped_name, f.name))
-                    for sel in f.selection:
-                        key, val = sel.split(selection_sep)
-                        pf.write('%s    "%s": %s,\n' % (line_start, val.strip(), key.strip()))
-                    pf.write("%s}\n\n" % line_start)
+            import configparser as ConfigParser
         else:
-            with io.open(os.path.join(base_dir, 'mapping.py'), 'a', encoding='utf-8') as pf:
-                pf.write("# Selection fields in model %s\n\n" % unicode(model, 'utf-8'))
-                for f in filter(lambda x: x.type == 'selection', fields):
-                    sys.stdout.write('Write mapping of selection field %s\n' % f.name)
-                    line_start = '# ' if (required and not f.is_required()) else ''
-                    pf.write("%s%s_%s_map = {\n" % (line_start, model_mapped_name, f.name))
-                    for sel in f.selection:
-                        key, val = sel.split(selection_sep)
-                        pf.write('%s    "%s": %s,\n' % (line_start, val.strip(), key.strip()))
-                    pf.write("%s}\n\n" % unicode(line_start, 'utf-8'))
-
-
-def model_exists(model):
-    """
-    Return True if 'model' is scaffoldable.
-    """
-    connection = conf_lib.get_server_connection(config)
-    model_model = connection.get_model('ir.model')
-    res = model_model.search_count([('model', '=', model), ('transient', '=', False)])
-    return res != 0
+            import ConfigParser
+        cfg = ConfigParser.RawConfigParser({'protocol': 'xmlrpc', 'port': 8069})
+        cfg.read(self.config)
+        self.host = cfg.get('Connection', 'hostname')
+        self.dbname = cfg.get('Connection', 'database')
+        return cfg.get('Connection', 'login'), cfg.get('Connection', 'uid')
 
 
-def scaffold_model():
-    """
-    Create the python script.
-    """
-    global offline
-    global dbname
-    global host
-    if sys.version_info >= (3, 0, 0):
-        import configparser as ConfigParser
-    else:
-        import ConfigParser
-    cfg = ConfigParser.RawConfigParser({'protocol': 'xmlrpc', 'port': 8069})
-    cfg.read(config)
-    host = cfg.get('Connection', 'hostname')
-    dbname = cfg.get('Connection', 'database')
-    login = cfg.get('Connection', 'login')
-    uid = cfg.get('Connection', 'uid')
-
-    sys.stdout.write("Using connection file: %s (db: %s, host: %s, login: %s, uid: %s)\n" % (config, dbname, host, login, uid))
-
-    if not dbname:
-        offline = True
-    elif not model_exists(model):
-        sys.stderr.write("Model %s not found\n" % model)
-        return
-    
-    do_file = skeleton or offline
+    def scaffold_model(self):
+        """
+        Create the python script.
+        """
+        login, uid = self.read_config()
 
-    if os.path.isfile(outfile):
-        if force:
-            if verbose: sys.stdout.write("Output file %s already exists and will be overwritten.\n" % outfile)
-        else:
-            sys.stderr.write("The file %s already exists.\n" % outfile)
-            do_file = False
-
-    if do_file:
-        # Write the file
-        with open(outfile, 'w') as of:
-            write_begin(of)
-            write_mapping(of)
-            write_end(of)
-
-        if offline:
-            sys.stdout.write("Minimal skeleton code generated in %s%s\n" % (outfile, ' because no database is defined' if not dbname else ''))
-        else:
-            sys.stdout.write("Skeleton code generated in %s\n" % outfile)
-    else:
-        sys.stdout.write("Skeleton code not generated. Use option -k|--skeleton or -n|--offline or -f|--force to generate the python script.\n")
+        sys.stdout.write("Using connection file: %s (db: %s, host: %s, login: %s, uid: %s)\n" % (self.config, self.dbname, self.host, login, uid))
 
-    dirname = os.path.dirname(outfile)
+        if not self.dbname:
+            self.offline = True
+        elif not self.model_exists(self.model):
+            sys.stderr.write("Model %s not found\n" % self.model)
+            return
 
-    if append:
-        #Add command to transform script
-        script = os.path.join(dirname, 'transform%s' % script_extension)
-        if platform.system() == 'Windows':
-            line = "echo Transform %s\npython %s.py > %s\\transform_%s_out.log 2> %s\\transform_%s_err.log\n" % (model_mapped_name, model_mapped_name, '%LOGDIR%', model_mapped_name, '%LOGDIR%', model_mapped_name)
-        else:
-            os.system('sed -i "$ d" %s' % script)
-            line = 'load_script %s\nchmod +x *.sh\n' % model_mapped_name
-        with open (script, 'a') as f:
-            f.write(line)
-        sys.stdout.write('Script %s.py added in %s\n' % (model_mapped_name, script))
-
-        #Add command to load script
-        script = os.path.join(dirname, 'load%s' % script_extension)
-        if platform.system() == 'Windows':
-            line = "echo Load %s\ncall %s%s > %s\\load_%s_out.log 2> %s\\load_%s_err.log\n" % (model_mapped_name, model_mapped_name, script_extension, '%LOGDIR%', model_mapped_name, '%LOGDIR%', model_mapped_name)
+        do_file = self.skeleton or self.offline
+        model_fields = None
+
+        if os.path.isfile(self.outfile):
+            if self.force:
+                if self.verbose: sys.stdout.write("Output file %s already exists and will be overwritten.\n" % self.outfile)
+            else:
+                sys.stderr.write("The file %s already exists.\n" % self.outfile)
+                do_file = False
+
+        if do_file:
+            # Write the file
+            with open(self.outfile, 'w') as of:
+                self.write_begin(of)
+                model_fields = self.write_mapping(of)
+                self.write_end(of)
+
+            # Add selection dictionaries in the mapping module of the model if --map-selection
+            if self.mapsel and model_fields is not None:
+                mapsel_file = os.path.join(self.base_dir, '%s.py' % self.mapsel_module())
+                with open(mapsel_file, 'w') as pf:
+                    self.write_mapsel(pf, model_fields)
+                sys.stdout.write('Mapping of selection fields generated in %s\n' % mapsel_file)
+
+            if self.offline:
+                sys.stdout.write("Minimal skeleton code generated in %s%s\n" % (self.outfile, ' because no database is defined' if not self.dbname else ''))
+            else:
+                sys.stdout.write("Skeleton code generated in %s\n" % self.outfile)
         else:
-            line = 'load_script %s\n' % (model_mapped_name)
-        with open (script, 'a') as f:
-            f.write(line)
-        sys.stdout.write('Script %s%s added in %s\n' % (model, script_extension, script))
-
-        # Add model to prefix.py
-        if not wxmlid:
-            script = os.path.join(dirname, 'prefix.py')
-            line = "PREFIX_%s = '%s_%s' %s project_name\n" % (model_mapped_name.upper(), '%s', model_mapped_name, '%')
+            sys.stdout.write("Skeleton code not generated. Use option -k|--skeleton or -n|--offline or -f|--force to generate the python script.\n")
+
+        dirname = os.path.dirname(self.outfile)
+
+        if self.append:
+            #Add command to transform script
+            script = os.path.join(dirname, 'transform%s' % self.script_extension)
+            if platform.system() == 'Windows':
+                line = "echo Transform %s\npython %s.py > %s\\transform_%s_out.log 2> %s\\transform_%s_err.log\n" % (self.model_mapped_name, self.model_mapped_name, '%LOGDIR%', self.model_mapped_name, '%LOGDIR%', self.model_mapped_name)
+            else:
+                os.system('sed -i "$ d" %s' % script)
+                line = 'load_script %s\npython check_duplicates.py; chmod +x *.sh\n' % self.model_mapped_name
             with open (script, 'a') as f:
                 f.write(line)
-            sys.stdout.write('Prefix PREFIX_%s added in %s\n' % (model_mapped_name.upper(), script))
+            sys.stdout.write('Script %s.py added in %s\n' % (self.model_mapped_name, script))
+
+            #Add command to load script
+            script = os.path.join(dirname, 'load%s' % self.script_extension)
+            if platform.system() == 'Windows':
+                line = "echo Load %s\ncall %s%s > %s\\load_%s_out.log 2> %s\\load_%s_err.log\n" % (self.model_mapped_name, self.model_mapped_name, self.script_extension, '%LOGDIR%', self.model_mapped_name, '%LOGDIR%', self.model_mapped_name)
+            else:
+                line = 'load_script %s\n' % (self.model_mapped_name)
+            if self.translated_fields and self.wtranslations:
+                if platform.system() == 'Windows':
+                    line += "echo Load %s translations\nfor %%%%s in (%s.*%s) do call %%%%s > %s\\load_%%%%~ns_out.log 2> %s\\load_%%%%~ns_err.log\n" % (self.model_mapped_name, self.model_mapped_name, self.script_extension, '%LOGDIR%', '%LOGDIR%')
+                else:
+                    line += 'load_translations %s\n' % self.model_mapped_name
+            with open(script, 'r') as f:
+                lines = f.readlines()
+            # The Windows script ends by the restore of the features disabled by pre_load.py
+            if lines and lines[-1].strip() == 'python post_load.py':
+                lines.insert(len(lines) - 1, line)
+            else:
+                lines.append(line)
+            with open(script, 'w') as f:
+                f.writelines(lines)
+            sys.stdout.write('Script %s%s added in %s\n' % (self.model, self.script_extension, script))
+
+            # Add model to prefix.py
+            if not self.wxmlid:
+                script = os.path.join(dirname, 'prefix.py')
+                line = "PREFIX_%s = '%s_%s' %s project_name\n" % (self.model_mapped_name.upper(), '%s', self.model_mapped_name, '%')
+                with open (script, 'a') as f:
+                    f.write(line)
+                sys.stdout.write('Prefix PREFIX_%s added in %s\n' % (self.model_mapped_name.upper(), script))
+            else:
+                if self.verbose: sys.stdout.write('XML_ID prefix not added because of option --with-xmlid\n')
+
+            # Add model to files.py
+            script = os.path.join(dirname, 'files.py')
+            with open (script, 'a') as f:
+                f.write("# Model %s\n" % self.model)
+                f.write("src_%s = os.path.join(data_src_dir, '%s.csv%s')\n" % (self.model_mapped_name , self.model_mapped_name, self.compression))
+                f.write("dest_%s = os.path.join(data_dest_dir, '%s.csv%s')\n" % (self.model_mapped_name , self.model, self.compression))
+                if self.self_ref_fields:
+                    f.write("dest_%s_hierarchy = os.path.join(data_dest_dir, '%s.hierarchy.csv%s')\n" % (self.model_mapped_name , self.model, self.compression))
+            sys.stdout.write('%s files added in %s\n' % (self.model, script))
+
+            # Add model to clean_data.py
+            script = os.path.join(dirname, 'clean_data.py')
+            # line = "PREFIX_%s = '%s_%s' %s project_name\n" % (model_mapped_name.upper(), '%s', model_mapped_name, '%')
+            # line = "delete_xml_id(connection, '%s', '%s_%s' %s (demo, project_name))\n" % (model, '%s', model_mapped_name, '%')
+            with open(script, 'a') as f:
+                f.write("delete_xml_id(connection, '%s', '%s_%s' %s project_name, demo)\n" % (self.model, '%s', self.model_mapped_name, '%'))
+            sys.stdout.write('Model %s added in %s\n' % (self.model, script))
+
+            # Add model to recompute.py
+            script = os.path.join(dirname, 'recompute.py')
+            if self.computed_fields and os.path.isfile(script):
+                fields = ', '.join("'%s': '%s'" % (f.name, f.depends or '') for f in sorted(self.computed_fields, key=lambda f: f.name))
+                insert_before_last_line(script, "register('%s', {%s})\n" % (self.model, fields))
+                sys.stdout.write('Model %s added in %s\n' % (self.model, script))
         else:
-            if verbose: sys.stdout.write('XML_ID prefix not added because of option --with-xmlid\n')
-        
-        # Add model to files.py
-        script = os.path.join(dirname, 'files.py')
-        with open (script, 'a') as f:
-            f.write("# Model %s\n" % model)
-            f.write("src_%s = os.path.join(data_src_dir, '%s.csv')\n" % (model_mapped_name , model_mapped_name))
-            f.write("dest_%s = os.path.join(data_dest_dir, '%s.csv')\n" % (model_mapped_name , model))
-        sys.stdout.write('%s files added in %s\n' % (model, script))
-
-        # Add model to clean_data.py
-        script = os.path.join(dirname, 'clean_data.py')
-        # line = "PREFIX_%s = '%s_%s' %s project_name\n" % (model_mapped_name.upper(), '%s', model_mapped_name, '%')
-        # line = "delete_xml_id(connection, '%s', '%s_%s' %s (demo, project_name))\n" % (model, '%s', model_mapped_name, '%')
-        with open(script, 'a') as f:
-            f.write("delete_xml_id(connection, '%s', '%s_%s' %s project_name, demo)\n" % (model, '%s', model_mapped_name, '%'))
-        sys.stdout.write('Model %s added in %s\n' % (model, script))
-    else:
-        sys.stdout.write("You should probably add this model in files.py, prefix.py, clean_data.py, transform%s and load%s with -a|--append\n" % (script_extension, script_extension))
+            sys.stdout.write("You should probably add this model in files.py, prefix.py, clean_data.py, recompute.py, transform%s and load%s with -a|--append\n" % (self.script_extension, self.script_extension))
 
+        if self.wextractor and self.dbname and not self.offline:
+            extractor = os.path.join(dirname, 'extract_%s.py' % self.model_mapped_name)
+            if os.path.isfile(extractor) and not self.force:
+                sys.stderr.write("The file %s already exists.\n" % extractor)
+            else:
+                with open(extractor, 'w') as ef:
+                    self.write_extractor(ef, model_fields if model_fields is not None else self.skeleton_fields())
+                sys.stdout.write("Extractor generated in %s\n" % extractor)
+
+        if self.o2m_children and not self.parent_link:
+            self.scaffold_children()
 
-##############################################################################
-# OTHER ACTIONS
-##############################################################################
 
-def list_models():
-    connection = conf_lib.get_server_connection(config)
-    model_model = connection.get_model('ir.model')
+    ##############################################################################
+    # OTHER ACTIONS
+    ##############################################################################
 
-    models = model_model.search_read([('transient', '=', False), ('model', '!=', '_unknown')], ['model', 'name'])
+    def list_models(self):
+        connection = conf_lib.get_server_connection(self.config)
+        model_model = connection.get_model('ir.model')
 
-    if not models:
-        sys.stdout.write('No model found !')
-        return
+        models = model_model.search_read([('transient', '=', False), ('model', '!=', '_unknown')], ['model', 'name'])
 
-    for m in sorted(models, key=lambda f: f['model']):
-        sys.stdout.write('%s (%s)\n' % (m['model'], m['name']))
+        if not models:
+            sys.stdout.write('No model found !')
+            return
+
+        for m in sorted(models, key=lambda f: f['model']):
+            sys.stdout.write('%s (%s)\n' % (m['model'], m['name']))
 
 
 def show_version():
     sys.stdout.write("%s %s\n" % (module_name, module_version))
 
+
 ##############################################################################
 # MAIN
 ##############################################################################
 
 if __name__ == '__main__':
-    module_name = os.path.basename(sys.argv[0])
-    # f = is_remote_host('pcodoo')
-    conf_dir_name = 'conf'
-    orig_dir_name = 'origin'
-    orig_raw_dir_name = os.path.join(orig_dir_name, 'binary')
-    data_dir_name = 'data'
-    log_dir_name = 'log'
-    selection_sep = ': '
-    default_base_dir = os.path.join('.','')
-
-
     module_descr = """Version: %s
     Create the structure of an import project and model skeleton codes working 
     with odoo_csv_tools (https://github.com/tfrancoi/odoo_csv_import).
@@ -1087,8 +3512,8 @@ if __name__ == '__main__':
     %s -s -p PATH [-d DBNAME] [-t HOST] [-u USERID] [-f] [-v]
 
     - Skeleton a model:
-    %s -m MODEL [-a] [--map-selection] [--with-xmlid] [-r] [-k map | -n]
-                            [--with-one2many] [--with-metadata] [--stored] [-v]
+    %s -m MODEL [-a] [--map-selection] [--with-xmlid | --m2o-by-name] [-r] [-k map|row | -n]
+                            [--with-one2many | --split-o2m] [--with-metadata] [--stored] [--sharded] [--with-translations] [--with-loadlib] [--with-extractor] [--compression gz|zst] [-v]
                             [--max-descr MAXDESCR] [-f] [-o OUTFILE] [-c CONFIG]
 
     - Show available models:
@@ -1108,14 +3533,21 @@ if __name__ == '__main__':
     parser.add_argument('-m', '--model', dest='model', required=False, help='technical name of the model to skeleton (ex: res.partner)')
     parser.add_argument('-c', '--config', dest='config', default=os.path.join(conf_dir_name,'connection.conf'), required=False, help='configuration file (relative to --path) defining the RPC connections parameters (default: %s)' % os.path.join(conf_dir_name, 'connection.conf'))
     parser.add_argument('-o', '--outfile', dest='outfile', required=False, help='python script of the model skeleton code (default: model name with dots replaced by underscores)')
-    parser.add_argument('-k', '--skeleton', dest='skeleton', choices=['dict','map'], default='dict', required = False, help='skeleton code type. dict: generate mapping as a simple dictionary. map: create the same dictionary with map functions for each field (default: dict)')
+    parser.add_argument('-k', '--skeleton', dest='skeleton', choices=['dict','map','row'], default='dict', required = False, help='skeleton code type. dict: generate mapping as a simple dictionary. map: create the same dictionary with map functions for each field. row: add to the dictionary a flat function transforming a whole line (default: dict)')
     parser.add_argument('-r', '--required', dest='required',  action='store_true', help='keep only the required fields without default value (comment the optional fields')
     parser.add_argument('--field-name', dest='fieldname', choices=['tech','user'], default='user', required = False, help='Field name in import file. tech=technical name, user=User name (default: user). Generates the mapping accordingly.')
     parser.add_argument('--stored', dest='wstored', action='store_true', help="include only stored fields")
     parser.add_argument('--with-o2m', dest='wo2m', action='store_true', help="include one2many fields")
+    parser.add_argument('--split-o2m', dest='split_o2m', action='store_true', help="generate the comodels of one2many fields as separate models loaded after this one")
     parser.add_argument('--with-metadata', dest='wmetadata', action='store_true', help="include metadata fields")
     parser.add_argument('--map-selection', dest='mapsel', action='store_true', help="generate inverse mapping dictionaries (visible value -> technical value) of selection fields in mapping.py")
     parser.add_argument('--with-xmlid', dest='wxmlid', action='store_true', help="assume the client file contains XML_IDs in identifier fields")
+    parser.add_argument('--m2o-by-name', dest='m2o_by_name', action='store_true', help="assume the many2one fields of the client file contain the names of existing records, resolved by a prefetch of each related model")
+    parser.add_argument('--sharded', dest='sharded', action='store_true', help="transform the client file by shards on a pool of processes (not available with -k row)")
+    parser.add_argument('--with-translations', dest='wtranslations', action='store_true', help="transform the translatable fields into one import file and load script per language of res_lang_map")
+    parser.add_argument('--with-extractor', dest='wextractor', action='store_true', help="with --with-xmlid, generate extract_MODEL.py to extract the model from a source Odoo database into its client file")
+    parser.add_argument('--with-loadlib', dest='wloadlib', action='store_true', help="load through loadlib.py, recording the metrics of each batch in the log folder")
+    parser.add_argument('--compression', dest='compression', choices=['gz', 'zst'], required=False, help="with -a, declare compressed client and import files in files.py")
     parser.add_argument('--max-descr', dest='maxdescr', default=10, help="limit long descriptions of default value and compute method to MAXDESCR lines (default: 10)")
     parser.add_argument('-n', '--offline', dest='offline', action='store_true', help="don't fetch fields from model. Create a minimal skeleton")
     parser.add_argument('-a', '--append', dest='append', action='store_true', help="add model references to files.py, prefix.py and action scripts")
@@ -1126,85 +3558,63 @@ if __name__ == '__main__':
     
     args = parser.parse_args()
 
+
     # Manage params
     scaffold = args.scaffold
-    base_dir = args.path
-    dbname = args.dbname
-    host = args.host
     model = args.model
-    userid = args.userid
-    config = args.config
-    outfile = args.outfile
-    required = args.required
-    skeleton = args.skeleton
-    wstored = args.wstored
-    wo2m = args.wo2m
-    wmetadata = args.wmetadata
-    mapsel = args.mapsel
-    wxmlid = args.wxmlid
-    maxdescr = int(args.maxdescr)
-    offline = args.offline
-    append = args.append
     list = args.list
-    force = args.force
-    verbose = args.verbose
     version = args.version
-    fieldname = args.fieldname
 
     # Do unit actions
     if version:
         show_version()
         sys.exit(0)
     if list:
-        list_models()
+        # The configuration file is relative to the current dir
+        Scaffold(config=args.config).list_models()
         sys.exit(0)
 
     # If no action set, prompt for scaffolding
     action_args = [scaffold, model]
     if not any(action_args):
         if sys.version_info >= (3, 0, 0):
-            response = input("Do you want the create the folder structure in %s ? (y|N): " % base_dir)
+            response = input("Do you want the create the folder structure in %s ? (y|N): " % args.path)
         else:
-            response = raw_input("Do you want the create the folder structure in %s ? (y|N): " % base_dir)
+            response = raw_input("Do you want the create the folder structure in %s ? (y|N): " % args.path)
         scaffold = ('Y' == response.upper())
 
+    if args.wextractor and not args.wxmlid:
+        sys.stderr.write('The option --with-extractor needs the option --with-xmlid\n')
+        sys.exit(1)
+
+    if args.m2o_by_name and args.wxmlid:
+        sys.stderr.write('The option --m2o-by-name is not available with the option --with-xmlid\n')
+        sys.exit(1)
+
+    if args.sharded and args.skeleton == 'row':
+        sys.stderr.write('The option --sharded is not available with the skeleton type row\n')
+        sys.exit(1)
+
+    if args.sharded and args.compression:
+        sys.stderr.write('The option --sharded is not available with the option --compression: the shards are read from an uncompressed client file\n')
+        sys.exit(1)
+
     if not scaffold and not model:
         sys.stderr.write('You need to set an action with -s|--scaffold or -m|--model or -l|--list\n')
         sys.stderr.write('Type %s -h|--help for help\n' % module_name)
         sys.exit(1)
 
-    script_extension = '.cmd' if platform.system() == 'Windows' else '.sh'
+    session = Scaffold(base_dir=args.path, dbname=args.dbname, host=args.host, userid=args.userid, config=args.config,
+                       outfile=args.outfile, required=args.required, skeleton=args.skeleton, fieldname=args.fieldname,
+                       wstored=args.wstored, wo2m=args.wo2m, split_o2m=args.split_o2m, wmetadata=args.wmetadata,
+                       mapsel=args.mapsel, wxmlid=args.wxmlid, m2o_by_name=args.m2o_by_name, sharded=args.sharded,
+                       wtranslations=args.wtranslations, wextractor=args.wextractor, wloadlib=args.wloadlib,
+                       compression=args.compression, maxdescr=args.maxdescr, offline=args.offline,
+                       append=args.append, force=args.force, verbose=args.verbose)
 
     # Do cascaded actions
     if scaffold:
-        if base_dir == default_base_dir:
-            project_name = os.path.basename(os.path.normpath(os.getcwd()))
-        else:
-            project_name = os.path.basename(os.path.normpath(base_dir))
-        
-        conf_dir = os.path.join(base_dir, conf_dir_name)
-        orig_dir = os.path.join(base_dir, orig_dir_name)
-        orig_raw_dir = os.path.join(base_dir, orig_raw_dir_name)
-        data_dir = os.path.join(base_dir, data_dir_name)
-        log_dir = os.path.join(base_dir, log_dir_name)
-
-        # If database is omitted, get the first part of the hostname
-        if is_remote_host(host) and not dbname:
-            dbname = host.split('.')[:1][0]
-            sys.stdout.write('Database is set by default to %s.\n' % dbname)
-
-        scaffold_dir()
+        session.scaffold_project()
 
     if model:
-        model_mapped_name = model.replace('.', '_')
-        model_class_name = model.title().replace('.', '')
-        model_mapping_name = '_'.join(('mapping', model_mapped_name))
-        if not outfile:
-            outfile = '.'.join((model_mapped_name, 'py'))
-        outfile = os.path.join(base_dir,outfile)
-        config = os.path.join(base_dir, config)
-        csv_delimiter = ';'
-        default_python_exe = ''
-        default_path = ''
-        
-        scaffold_model()
+        session.create_model(model)